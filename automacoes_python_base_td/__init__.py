@@ -15,6 +15,7 @@ from .core import (
     DatabaseException,
     DatabaseConnectionError,
     DatabaseQueryError,
+    DatabaseTimeoutError,
     ModelNotFoundError,
     # AWS
     AWSException,
@@ -48,11 +49,19 @@ from .settings import (
 from .database import (
     # PostgreSQL (psycopg2)
     get_connection,
+    transaction,
     execute_query,
     execute_many,
+    execute_batch_values,
     fetch_all,
     fetch_one,
+    fetch_iter,
+    fetch_columns,
+    copy_rows,
+    export_query,
     DatabaseConnection,
+    ConnectionPool,
+    close_all_pools,
     # SQLAlchemy - Base
     Base,
     BaseModel,
@@ -151,6 +160,7 @@ __all__ = [
     "DatabaseException",
     "DatabaseConnectionError",
     "DatabaseQueryError",
+    "DatabaseTimeoutError",
     "ModelNotFoundError",
     "AWSException",
     "S3Exception",
@@ -169,11 +179,19 @@ __all__ = [
     "settings",
     # Database - PostgreSQL
     "get_connection",
+    "transaction",
     "execute_query",
     "execute_many",
+    "execute_batch_values",
     "fetch_all",
     "fetch_one",
+    "fetch_iter",
+    "fetch_columns",
+    "copy_rows",
+    "export_query",
     "DatabaseConnection",
+    "ConnectionPool",
+    "close_all_pools",
     # Database - SQLAlchemy Base
     "Base",
     "BaseModel",
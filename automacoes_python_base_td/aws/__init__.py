@@ -2,12 +2,13 @@
 Módulo AWS - S3 e CloudWatch
 """
 from .client import AWSClient
-from .s3 import S3Client, upload_to_s3, download_from_s3
+from .s3 import S3Client, S3MultipartWriter, upload_to_s3, download_from_s3
 from .cloudwatch import CloudWatchClient, send_logs_to_cloudwatch
 
 __all__ = [
     "AWSClient",
     "S3Client",
+    "S3MultipartWriter",
     "CloudWatchClient",
     "upload_to_s3",
     "download_from_s3",
@@ -1,12 +1,146 @@
 """
 Cliente S3
 """
-from typing import Optional, Dict, List
+from typing import Any, Optional, Dict, List
 from botocore.exceptions import ClientError
 from .client import AWSClient
 from ..core.exceptions import S3Exception
 
 
+# Tamanho mínimo de cada parte do multipart upload (exceto a última)
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+class S3MultipartWriter:
+    """
+    Arquivo somente-escrita que envia os dados ao S3 em partes (multipart upload).
+    
+    Mantém em memória no máximo uma parte (part_size bytes). Se o total couber
+    em uma parte, faz um único put_object. Ao sair do bloco com exceção, o
+    upload é abortado e nenhuma parte fica cobrada no bucket.
+    
+    Limite do S3: 10.000 partes (~80 GB com o part_size padrão de 8 MB).
+    
+    Exemplo:
+        s3 = S3Client()
+        with s3.open_multipart_writer("my-bucket", "exports/dados.csv") as writer:
+            for chunk in gerar_chunks():
+                writer.write(chunk)
+    """
+    
+    def __init__(
+        self,
+        client: Any,
+        bucket: str,
+        key: str,
+        part_size: int = DEFAULT_PART_SIZE,
+        content_type: Optional[str] = None,
+    ):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size deve ser >= {MIN_PART_SIZE} bytes")
+        self._client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self._extra_args = {"ContentType": content_type} if content_type else {}
+        self._buffer = bytearray()
+        self._parts: List[Dict[str, Any]] = []
+        self._upload_id: Optional[str] = None
+        self.bytes_written = 0
+        self.closed = False
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data: bytes) -> int:
+        """Acumula os bytes e envia uma parte a cada part_size bytes"""
+        if self.closed:
+            raise ValueError("S3MultipartWriter já foi fechado")
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+    
+    def flush(self) -> None:
+        """As partes são enviadas ao atingir part_size; o restante vai no close()"""
+    
+    def close(self) -> None:
+        """Envia o restante e conclui o upload"""
+        if self.closed:
+            return
+        try:
+            if self._upload_id is None:
+                self._client.put_object(
+                    Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), **self._extra_args
+                )
+            else:
+                if self._buffer:
+                    self._upload_part(bytes(self._buffer))
+                self._client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._parts},
+                )
+        except ClientError as e:
+            self.abort()
+            raise S3Exception(
+                "Erro ao concluir upload para S3",
+                details={"bucket": self.bucket, "key": self.key, "error": str(e)}
+            ) from e
+        self._buffer = bytearray()
+        self.closed = True
+    
+    def abort(self) -> None:
+        """Cancela o upload e descarta as partes já enviadas"""
+        self.closed = True
+        self._buffer = bytearray()
+        if self._upload_id is None:
+            return
+        try:
+            self._client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id
+            )
+        except ClientError as e:
+            print(f"Erro ao abortar multipart upload: {e}")
+        self._upload_id = None
+    
+    def __enter__(self) -> "S3MultipartWriter":
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+    
+    def _upload_part(self, data: bytes) -> None:
+        try:
+            if self._upload_id is None:
+                response = self._client.create_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, **self._extra_args
+                )
+                self._upload_id = response["UploadId"]
+            number = len(self._parts) + 1
+            response = self._client.upload_part(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self._upload_id,
+                PartNumber=number,
+                Body=data,
+            )
+            self._parts.append({"ETag": response["ETag"], "PartNumber": number})
+        except ClientError as e:
+            self.abort()
+            raise S3Exception(
+                "Erro ao enviar parte para S3",
+                details={"bucket": self.bucket, "key": self.key, "error": str(e)}
+            ) from e
+
+
 class S3Client(AWSClient):
     """
     Cliente para operações com AWS S3
@@ -140,6 +274,31 @@ class S3Client(AWSClient):
             print(f"Erro ao listar arquivos: {e}")
             return []
     
+    def open_multipart_writer(
+        self,
+        bucket: str,
+        key: str,
+        part_size: Optional[int] = None,
+        content_type: Optional[str] = None,
+    ) -> S3MultipartWriter:
+        """
+        Abre um arquivo somente-escrita que faz streaming para o S3 (multipart upload).
+        
+        Args:
+            bucket: Nome do bucket S3
+            key: Chave do arquivo no S3
+            part_size: Tamanho de cada parte em bytes (mínimo 5 MB, padrão 8 MB)
+            content_type: Tipo de conteúdo (ex: 'text/csv')
+        
+        Exemplo:
+            s3 = S3Client()
+            with s3.open_multipart_writer("my-bucket", "exports/dados.csv.gz") as writer:
+                writer.write(b"...")
+        """
+        return S3MultipartWriter(
+            self.client, bucket, key, part_size=part_size or DEFAULT_PART_SIZE, content_type=content_type
+        )
+    
     def file_exists(self, bucket: str, key: str) -> bool:
         """Verifica se um arquivo existe no S3"""
         try:
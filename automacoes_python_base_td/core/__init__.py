@@ -8,6 +8,7 @@ from .exceptions import (
     DatabaseException,
     DatabaseConnectionError,
     DatabaseQueryError,
+    DatabaseTimeoutError,
     ModelNotFoundError,
     # AWS
     AWSException,
@@ -35,6 +36,7 @@ __all__ = [
     "DatabaseException",
     "DatabaseConnectionError",
     "DatabaseQueryError",
+    "DatabaseTimeoutError",
     "ModelNotFoundError",
     # AWS
     "AWSException",
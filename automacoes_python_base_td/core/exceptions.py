@@ -87,8 +87,15 @@ class DatabaseConnectionError(DatabaseException):
 class DatabaseQueryError(DatabaseException):
     """Erro ao executar query no banco de dados"""
     
-    def __init__(self, message: str = "Erro ao executar query", **kwargs):
-        super().__init__(message, code="DB_QUERY", **kwargs)
+    def __init__(self, message: str = "Erro ao executar query", code: str = "DB_QUERY", **kwargs):
+        super().__init__(message, code=code, **kwargs)
+
+
+class DatabaseTimeoutError(DatabaseQueryError):
+    """Query cancelada pelo servidor (statement_timeout ou cancelamento)"""
+    
+    def __init__(self, message: str = "Query cancelada por timeout", **kwargs):
+        super().__init__(message, code="DB_TIMEOUT", **kwargs)
 
 
 class ModelNotFoundError(DatabaseException):
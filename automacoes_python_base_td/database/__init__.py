@@ -4,12 +4,35 @@ Módulo de Database - PostgreSQL e SQLAlchemy
 # PostgreSQL (psycopg2)
 from .connection import (
     get_connection,
+    transaction,
     execute_query,
     execute_many,
+    execute_batch_values,
     fetch_all,
     fetch_one,
+    fetch_iter,
+    fetch_columns,
+    copy_rows,
+    export_query,
+    get_replica_router,
     DatabaseConnection,
 )
+from .pool import ConnectionPool, get_pool, close_all_pools
+from .prepared import get_prepared_statement_stats, reset_prepared_statement_stats
+from .cache import QueryCache, get_query_cache, invalidate_tables
+from .replica import ReplicaRouter
+from .metrics import get_query_stats, reset_query_stats
+from .pool_metrics import InstrumentedQueuePool, PoolMetrics
+from .statement_tracking import StatementScope, statement_scope, instrument_engine
+from .retry import get_connection_stats, reset_connection_stats
+from .snapshot import Snapshot, to_snapshot
+from .notify import (
+    Notification,
+    NotificationListener,
+    notify,
+    install_notify_trigger,
+    remove_notify_trigger,
+)
 
 # SQLAlchemy - Base e BaseModel
 from .models.base import Base, BaseModel
@@ -20,6 +43,10 @@ from .session import (
     DatabaseSessionManager,
     get_manager,
     get_session,
+    get_scoped_session,
+    remove_scoped_session,
+    get_engine_pool_stats,
+    unit_of_work,
     # Aliases para compatibilidade
     get_tdax_session,
     get_automations_session,
@@ -31,17 +58,58 @@ from .session import (
     get_automations_db_dependency,
 )
 
+# SQLAlchemy - Sessões assíncronas (extra [async])
+from .async_session import (
+    AsyncDatabaseSessionManager,
+    get_async_manager,
+    get_async_session,
+    get_async_db_dependency,
+    dispose_async_managers,
+)
+
 # Repositories CRUD
-from .repositories import CRUDBase, crud_factory
+from .repositories import CRUDBase, crud_factory, AsyncCRUDBase, async_crud_factory
 
 __all__ = [
     # PostgreSQL
     "get_connection",
+    "transaction",
     "execute_query",
     "execute_many",
+    "execute_batch_values",
     "fetch_all",
     "fetch_one",
+    "fetch_iter",
+    "fetch_columns",
+    "copy_rows",
+    "export_query",
     "DatabaseConnection",
+    "ConnectionPool",
+    "get_pool",
+    "close_all_pools",
+    "get_prepared_statement_stats",
+    "reset_prepared_statement_stats",
+    "QueryCache",
+    "get_query_cache",
+    "invalidate_tables",
+    "ReplicaRouter",
+    "get_replica_router",
+    "get_query_stats",
+    "reset_query_stats",
+    "InstrumentedQueuePool",
+    "PoolMetrics",
+    "StatementScope",
+    "statement_scope",
+    "instrument_engine",
+    "get_connection_stats",
+    "reset_connection_stats",
+    "Snapshot",
+    "to_snapshot",
+    "Notification",
+    "NotificationListener",
+    "notify",
+    "install_notify_trigger",
+    "remove_notify_trigger",
     # SQLAlchemy - Base
     "Base",
     "BaseModel",
@@ -50,6 +118,10 @@ __all__ = [
     "DatabaseSessionManager",
     "get_manager",
     "get_session",
+    "get_scoped_session",
+    "remove_scoped_session",
+    "get_engine_pool_stats",
+    "unit_of_work",
     # SQLAlchemy - Aliases (compatibilidade)
     "get_tdax_session",
     "get_automations_session",
@@ -59,8 +131,16 @@ __all__ = [
     "get_db_dependency",
     "get_tdax_db_dependency",
     "get_automations_db_dependency",
+    # SQLAlchemy - Async
+    "AsyncDatabaseSessionManager",
+    "get_async_manager",
+    "get_async_session",
+    "get_async_db_dependency",
+    "dispose_async_managers",
     # CRUD
     "CRUDBase",
     "crud_factory",
+    "AsyncCRUDBase",
+    "async_crud_factory",
 ]
 
@@ -0,0 +1,459 @@
+"""
+Conexões PostgreSQL assíncronas com psycopg 3 (asyncio)
+
+Mesma interface de database.connection (execute_query, execute_many, fetch_all,
+fetch_one, fetch_iter, copy_rows), mas com corrotinas e um pool de conexões
+assíncrono por destino. As queries usam os mesmos placeholders (%s / %(nome)s).
+
+Requer a dependência opcional: pip install automacoes-python-base-td[async]
+
+Exemplo:
+    from automacoes_python_base_td.database import aio
+
+    async def main():
+        empresas = await aio.fetch_all("SELECT * FROM empresas WHERE ativo = %s", (True,))
+        async for row in aio.fetch_iter("SELECT * FROM pagamentos"):
+            ...
+        await aio.close_all_pools()
+"""
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+from loguru import logger
+from ..settings import settings
+from ..core.exceptions import (
+    DatabaseConnectionError,
+    DatabaseException,
+    DatabaseQueryError,
+    DatabaseTimeoutError,
+)
+from .cache import get_query_cache, extract_write_tables
+from .pooler import async_pool_options, psycopg_connect_args
+from .retry import connect_options
+
+try:
+    import psycopg
+    from psycopg import sql
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # pragma: no cover - dependência opcional
+    psycopg = None
+
+
+def _require_psycopg() -> None:
+    if psycopg is None:
+        raise ImportError(
+            "psycopg 3 é necessário para database.aio: "
+            "pip install automacoes-python-base-td[async]"
+        )
+
+
+# ==========================================
+# POOLS (um por destino)
+# ==========================================
+
+# Um AsyncConnectionPool só funciona no event loop em que foi aberto: a chave
+# inclui o loop, e pools de loops já fechados (ex: asyncio.run anterior) são descartados
+_pools: Dict[Tuple[Any, ...], Tuple[asyncio.AbstractEventLoop, "AsyncConnectionPool"]] = {}
+
+
+def _reset_pools_after_fork() -> None:
+    """Executado no processo filho logo após o fork: os sockets são do processo pai"""
+    _pools.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+def _target(
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    database: Optional[str] = None,
+    user: Optional[str] = None,
+    password: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Resolve o destino com fallback para o settings global"""
+    return {
+        "host": host or settings.db_host,
+        "port": port or settings.db_port,
+        "dbname": database or settings.db_name,
+        "user": user or settings.db_user,
+        "password": password or settings.db_password,
+    }
+
+
+def _forget_closed_loops() -> None:
+    for key, (loop, _) in list(_pools.items()):
+        if loop.is_closed():
+            del _pools[key]
+
+
+async def get_pool(
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    database: Optional[str] = None,
+    user: Optional[str] = None,
+    password: Optional[str] = None,
+) -> "AsyncConnectionPool":
+    """
+    Retorna ou cria o pool assíncrono do event loop atual para um destino.
+    Tamanho e tempos vêm de settings.db_pool_* (os mesmos do pool psycopg2);
+    as conexões usam o connect_timeout e os keepalives TCP de settings. Atrás
+    de PgBouncer em modo transaction, o pool não guarda conexões ociosas e o
+    psycopg não prepara statements (ver pooler).
+    """
+    _require_psycopg()
+    target = _target(host, port, database, user, password)
+    loop = asyncio.get_running_loop()
+    _forget_closed_loops()
+    key = (id(loop), *target.values())
+    entry = _pools.get(key)
+    if entry is None:
+        # Registrado antes do await: corrotinas concorrentes recebem o mesmo pool
+        pool = AsyncConnectionPool(
+            kwargs={**target, **connect_options(), **psycopg_connect_args()},
+            **async_pool_options(),
+            name=f"aio-{target['host']}-{target['dbname']}",
+            open=False,
+        )
+        _pools[key] = (loop, pool)
+    else:
+        pool = entry[1]
+    # open() é idempotente
+    await pool.open()
+    return pool
+
+
+async def close_all_pools() -> None:
+    """
+    Fecha os pools assíncronos do event loop atual (ex: no shutdown da
+    aplicação) e esquece os de loops já fechados.
+    """
+    loop = asyncio.get_running_loop()
+    _forget_closed_loops()
+    pools = []
+    for key, (pool_loop, pool) in list(_pools.items()):
+        if pool_loop is loop:
+            del _pools[key]
+            pools.append(pool)
+    for pool in pools:
+        await pool.close()
+
+
+@asynccontextmanager
+async def get_connection(
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    database: Optional[str] = None,
+    user: Optional[str] = None,
+    password: Optional[str] = None,
+) -> AsyncIterator["psycopg.AsyncConnection"]:
+    """
+    Context manager assíncrono para uma conexão do pool.
+    Faz commit ao sair do bloco e rollback em caso de erro.
+
+    Exemplo:
+        async with aio.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT * FROM users")
+                results = await cursor.fetchall()
+    """
+    pool = await get_pool(host, port, database, user, password)
+    conn = None
+    try:
+        async with pool.connection() as conn:
+            yield conn
+    except psycopg.Error as e:
+        raise _database_error(e, conn, host) from e
+
+
+def _database_error(error: "psycopg.Error", conn: Optional["psycopg.AsyncConnection"], host: Optional[str]) -> DatabaseException:
+    """
+    Converte um erro do psycopg 3 como em database.connection: falha ao obter a
+    conexão (inclui PoolTimeout) ou conexão perdida vira DatabaseConnectionError,
+    query cancelada (QueryCanceled, subclasse de OperationalError) vira
+    DatabaseTimeoutError e o resto DatabaseQueryError.
+    """
+    if conn is None or conn.closed:
+        return DatabaseConnectionError(
+            "Falha ao conectar ao banco de dados",
+            details={"host": host or settings.db_host, "error": str(error)}
+        )
+    if isinstance(error, psycopg.errors.QueryCanceled):
+        return DatabaseTimeoutError(details={"error": str(error)})
+    return DatabaseQueryError(
+        "Erro ao executar operação no banco",
+        details={"error": str(error)}
+    )
+
+
+async def _statement_timeout(conn: "psycopg.AsyncConnection", timeout: Optional[float]) -> None:
+    """
+    Aplica statement_timeout (segundos) à transação corrente, como o SET LOCAL
+    de database.connection: o servidor cancela a query que passar do limite
+    (DatabaseTimeoutError) e o commit/rollback de get_connection o descarta.
+    Usa set_config porque o psycopg 3 envia os parâmetros ao servidor e SET
+    não aceita parâmetros.
+    """
+    if timeout is None:
+        timeout = settings.db_statement_timeout
+    if not timeout:
+        return
+    await conn.execute(
+        "SELECT set_config('statement_timeout', %s, true)",
+        (str(max(1, int(timeout * 1000))),),
+    )
+
+
+def _invalidate_written_tables(query: Any, tables: Optional[Iterable[str]] = None) -> None:
+    """Invalida o cache de resultados (database.cache) das tabelas alteradas"""
+    if tables is None:
+        tables = extract_write_tables(query) if isinstance(query, str) else ()
+    tables = set(tables)
+    if tables:
+        get_query_cache().invalidate(tables)
+
+
+# ==========================================
+# HELPERS
+# ==========================================
+
+async def execute_query(
+    query: str,
+    params: Optional[Union[Tuple, Dict[str, Any]]] = None,
+    connection_params: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
+) -> int:
+    """
+    Executa uma query SQL (INSERT, UPDATE, DELETE) e retorna o número de linhas afetadas.
+
+    timeout: Limite em segundos (statement_timeout da transação); acima dele a
+    query é cancelada com DatabaseTimeoutError. Padrão: settings.db_statement_timeout.
+    """
+    connection_params = connection_params or {}
+    try:
+        async with get_connection(**connection_params) as conn:
+            await _statement_timeout(conn, timeout)
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, params)
+                return cursor.rowcount
+    except (DatabaseConnectionError, DatabaseQueryError):
+        raise
+    except Exception as e:
+        raise DatabaseQueryError(
+            "Erro ao executar query",
+            details={"query": query[:100], "error": str(e)}
+        ) from e
+    finally:
+        _invalidate_written_tables(query)
+
+
+async def execute_many(
+    query: str,
+    params_list: List[Tuple],
+    connection_params: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
+) -> int:
+    """
+    Executa múltiplas queries SQL com diferentes parâmetros (pipeline do psycopg 3).
+
+    timeout: ver execute_query.
+    """
+    connection_params = connection_params or {}
+    try:
+        async with get_connection(**connection_params) as conn:
+            await _statement_timeout(conn, timeout)
+            async with conn.cursor() as cursor:
+                await cursor.executemany(query, params_list)
+                return cursor.rowcount
+    except (DatabaseConnectionError, DatabaseQueryError):
+        raise
+    except Exception as e:
+        raise DatabaseQueryError(
+            "Erro ao executar múltiplas queries",
+            details={"query": query[:100], "count": len(params_list), "error": str(e)}
+        ) from e
+    finally:
+        _invalidate_written_tables(query)
+
+
+async def fetch_all(
+    query: str,
+    params: Optional[Union[Tuple, Dict[str, Any]]] = None,
+    connection_params: Optional[Dict[str, Any]] = None,
+    as_dict: bool = True,
+    timeout: Optional[float] = None,
+) -> List:
+    """
+    Executa uma query SELECT e retorna todos os resultados.
+
+    timeout: ver execute_query.
+
+    Exemplo:
+        empresas = await aio.fetch_all("SELECT * FROM empresas WHERE ativo = %s", (True,))
+    """
+    connection_params = connection_params or {}
+    try:
+        async with get_connection(**connection_params) as conn:
+            await _statement_timeout(conn, timeout)
+            async with conn.cursor(row_factory=dict_row if as_dict else None) as cursor:
+                await cursor.execute(query, params)
+                return await cursor.fetchall()
+    except (DatabaseConnectionError, DatabaseQueryError):
+        raise
+    except Exception as e:
+        raise DatabaseQueryError(
+            "Erro ao buscar dados",
+            details={"query": query[:100], "error": str(e)}
+        ) from e
+
+
+async def fetch_one(
+    query: str,
+    params: Optional[Union[Tuple, Dict[str, Any]]] = None,
+    connection_params: Optional[Dict[str, Any]] = None,
+    as_dict: bool = True,
+    timeout: Optional[float] = None,
+) -> Optional[Any]:
+    """
+    Executa uma query SELECT e retorna apenas o primeiro resultado.
+
+    timeout: ver execute_query.
+    """
+    connection_params = connection_params or {}
+    try:
+        async with get_connection(**connection_params) as conn:
+            await _statement_timeout(conn, timeout)
+            async with conn.cursor(row_factory=dict_row if as_dict else None) as cursor:
+                await cursor.execute(query, params)
+                return await cursor.fetchone()
+    except (DatabaseConnectionError, DatabaseQueryError):
+        raise
+    except Exception as e:
+        raise DatabaseQueryError(
+            "Erro ao buscar dados",
+            details={"query": query[:100], "error": str(e)}
+        ) from e
+
+
+async def fetch_iter(
+    query: str,
+    params: Optional[Union[Tuple, Dict[str, Any]]] = None,
+    connection_params: Optional[Dict[str, Any]] = None,
+    as_dict: bool = True,
+    batch_size: int = 1000,
+    batches: bool = False,
+    timeout: Optional[float] = None,
+) -> AsyncIterator:
+    """
+    Executa uma query SELECT com cursor no servidor e retorna os resultados
+    sob demanda (async for), sem materializar tudo em memória.
+
+    A conexão fica fora do pool apenas enquanto o iterador é consumido.
+    timeout: Limite em segundos de cada FETCH no servidor (ver execute_query).
+
+    Exemplo:
+        async for row in aio.fetch_iter("SELECT * FROM speds_retificados", batch_size=5000):
+            await processa(row)
+    """
+    connection_params = connection_params or {}
+    async with get_connection(**connection_params) as conn:
+        await _statement_timeout(conn, timeout)
+        cursor = conn.cursor(
+            name=f"fetch_iter_{uuid.uuid4().hex}",
+            row_factory=dict_row if as_dict else None,
+        )
+        try:
+            await cursor.execute(query, params)
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if batches:
+                    yield rows
+                else:
+                    for row in rows:
+                        yield row
+        finally:
+            await cursor.close()
+
+
+async def copy_rows(
+    table: str,
+    columns: Sequence[str],
+    rows: Union[Iterable[Sequence[Any]], AsyncIterable[Sequence[Any]]],
+    connection_params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Carrega linhas em massa com COPY FROM STDIN.
+
+    Aceita iteráveis síncronos ou assíncronos; cada linha é adaptada pelo
+    psycopg (write_row), então não há serialização manual de CSV.
+
+    Returns:
+        Dict com rows, seconds e rows_per_second
+
+    Exemplo:
+        stats = await aio.copy_rows("pagamentos", ["cnpj", "valor", "data"], linhas)
+    """
+    copy_sql = sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.SQL(".").join(sql.Identifier(part) for part in table.split(".")),
+        sql.SQL(", ").join(sql.Identifier(column) for column in columns),
+    )
+    connection_params = connection_params or {}
+    count = 0
+    started = time.perf_counter()
+    try:
+        async with get_connection(**connection_params) as conn:
+            async with conn.cursor() as cursor:
+                async with cursor.copy(copy_sql) as copy:
+                    if hasattr(rows, "__aiter__"):
+                        async for row in rows:
+                            await copy.write_row(row)
+                            count += 1
+                    else:
+                        for row in rows:
+                            await copy.write_row(row)
+                            count += 1
+    finally:
+        _invalidate_written_tables(copy_sql, tables=[table])
+    elapsed = time.perf_counter() - started
+
+    stats = {
+        "rows": count,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(count / elapsed, 1) if elapsed > 0 else float(count),
+    }
+    logger.info(
+        f"COPY {table}: {stats['rows']} linhas em {stats['seconds']}s "
+        f"({stats['rows_per_second']} linhas/s)"
+    )
+    return stats
+
+
+__all__ = [
+    "get_pool",
+    "close_all_pools",
+    "get_connection",
+    "execute_query",
+    "execute_many",
+    "fetch_all",
+    "fetch_one",
+    "fetch_iter",
+    "copy_rows",
+]
@@ -0,0 +1,201 @@
+"""
+Gerenciamento de sessões SQLAlchemy assíncronas (AsyncEngine / AsyncSession)
+
+Mesma interface de database.session (manager por db_type, session_scope,
+get_session), sobre create_async_engine com o driver psycopg 3. Os models
+(Empresas, SessionGov, ...) são os mesmos das sessões síncronas.
+
+Requer a dependência opcional: pip install automacoes-python-base-td[async]
+
+Exemplo:
+    from automacoes_python_base_td.database import get_async_session, AsyncCRUDBase
+
+    empresa_crud = AsyncCRUDBase(Empresas)
+
+    async def main():
+        async with get_async_session("tdax") as session:
+            empresa = await empresa_crud.get(session, id=1)
+"""
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from sqlalchemy.engine import make_url
+from ..settings import settings
+from .pooler import engine_pool_options, pooler_connect_args
+from .retry import connect_options
+from .session import DatabaseType
+from .statement_tracking import PLUGIN_NAME as STATEMENT_TRACKING_PLUGIN
+
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+except ImportError:  # pragma: no cover - dependência opcional (greenlet)
+    create_async_engine = async_sessionmaker = None
+
+
+def _require_asyncio() -> None:
+    if create_async_engine is None:
+        raise ImportError(
+            "sqlalchemy[asyncio] e psycopg 3 são necessários para sessões assíncronas: "
+            "pip install automacoes-python-base-td[async]"
+        )
+
+
+def async_database_url(database_url: str) -> str:
+    """
+    Converte uma URL PostgreSQL para o driver assíncrono psycopg 3.
+
+    Exemplo:
+        async_database_url("postgresql://u:p@host:5432/tdax")
+        # "postgresql+psycopg://u:p@host:5432/tdax"
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == "postgresql" and url.get_driver_name() in ("psycopg2", "psycopg"):
+        url = url.set(drivername="postgresql+psycopg")
+    return url.render_as_string(hide_password=False)
+
+
+class AsyncDatabaseSessionManager:
+    """
+    Gerenciador de sessões SQLAlchemy assíncronas.
+    Suporta múltiplos bancos de dados através do parâmetro db_type.
+
+    As sessões usam expire_on_commit=False: atributos continuam acessíveis
+    após o commit sem um lazy load (que exigiria await).
+    """
+
+    def __init__(
+        self,
+        db_type: Optional[DatabaseType] = None,
+        database_url: Optional[str] = None,
+        echo: bool = False,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None,
+    ):
+        """
+        Inicializa o gerenciador de sessões assíncronas.
+
+        Args:
+            db_type: Tipo do banco ("tdax", "automations" ou None para env)
+            database_url: URL de conexão (sobrescreve db_type); postgresql:// vira postgresql+psycopg://
+            echo: Se True, mostra SQL queries no console
+            pool_size: Tamanho do pool de conexões (padrão settings.db_engine_pool_size)
+            max_overflow: Conexões extras permitidas (padrão settings.db_engine_max_overflow)
+        """
+        _require_asyncio()
+        if database_url is None:
+            if db_type == "tdax":
+                database_url = settings.database_url_tdax
+            elif db_type == "automations":
+                database_url = settings.database_url_automation
+            else:
+                database_url = settings.database_url
+
+        self.db_type = db_type
+        self.database_url = async_database_url(database_url)
+
+        connect_args = connect_options() if make_url(self.database_url).get_backend_name() == "postgresql" else {}
+        self.engine = create_async_engine(
+            self.database_url,
+            echo=echo,
+            connect_args={**connect_args, **pooler_connect_args(self.database_url)},
+            plugins=[STATEMENT_TRACKING_PLUGIN],
+            **engine_pool_options(pool_size, max_overflow, instrumented=False),
+        )
+        self.SessionLocal = async_sessionmaker(
+            bind=self.engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+
+    def get_session(self) -> "AsyncSession":
+        """Retorna uma nova sessão assíncrona"""
+        return self.SessionLocal()
+
+    @asynccontextmanager
+    async def session_scope(self) -> AsyncIterator["AsyncSession"]:
+        """
+        Context manager assíncrono com commit ao final e rollback em erro.
+
+        Exemplo:
+            manager = AsyncDatabaseSessionManager("tdax")
+            async with manager.session_scope() as session:
+                result = await session.execute(select(Empresas))
+        """
+        session = self.SessionLocal()
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    async def dispose(self) -> None:
+        """Fecha as conexões do pool do engine"""
+        await self.engine.dispose()
+
+
+# ==========================================
+# INSTÂNCIAS GLOBAIS (lazy loading)
+# ==========================================
+
+_async_managers: dict[Optional[DatabaseType], AsyncDatabaseSessionManager] = {}
+_async_managers_lock = threading.Lock()
+
+
+def get_async_manager(db_type: Optional[DatabaseType] = "tdax") -> AsyncDatabaseSessionManager:
+    """
+    Retorna ou cria um gerenciador assíncrono para o banco especificado.
+
+    Exemplo:
+        manager = get_async_manager("tdax")
+        async with manager.session_scope() as session:
+            ...
+    """
+    manager = _async_managers.get(db_type)
+    if manager is not None:
+        return manager
+
+    with _async_managers_lock:
+        if db_type not in _async_managers:
+            _async_managers[db_type] = AsyncDatabaseSessionManager(db_type=db_type)
+        return _async_managers[db_type]
+
+
+@asynccontextmanager
+async def get_async_session(db_type: Optional[DatabaseType] = "tdax") -> AsyncIterator["AsyncSession"]:
+    """
+    Context manager assíncrono para obter uma sessão (commit ao final).
+
+    Exemplo:
+        async with get_async_session("automations") as session:
+            jobs = (await session.scalars(select(Job))).all()
+    """
+    async with get_async_manager(db_type).session_scope() as session:
+        yield session
+
+
+async def get_async_db_dependency(db_type: DatabaseType = "tdax") -> AsyncIterator["AsyncSession"]:
+    """
+    Dependency assíncrono para FastAPI.
+
+    Uso:
+        @app.get("/empresas/{id}")
+        async def get_empresa(id: int, db: AsyncSession = Depends(get_async_db_dependency)):
+            return await empresa_crud.get(db, id)
+    """
+    session = get_async_manager(db_type).get_session()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+async def dispose_async_managers() -> None:
+    """Fecha os pools de todos os managers assíncronos (ex: no shutdown da aplicação)"""
+    with _async_managers_lock:
+        managers = list(_async_managers.values())
+        _async_managers.clear()
+    for manager in managers:
+        await manager.dispose()
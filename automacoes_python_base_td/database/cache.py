@@ -0,0 +1,157 @@
+"""
+Cache de resultados para fetch_all/fetch_one com TTL e invalidação por tabela
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+from ..settings import settings
+
+
+_IDENTIFIER = r'((?:"[^"]+"|[\w$]+)(?:\.(?:"[^"]+"|[\w$]+))?)'
+_READ_TABLES = re.compile(rf"\b(?:FROM|JOIN)\s+(?:ONLY\s+)?{_IDENTIFIER}", re.IGNORECASE)
+_WRITE_TABLES = re.compile(
+    rf"\b(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?|MERGE\s+INTO|COPY)"
+    rf"\s+(?:ONLY\s+)?{_IDENTIFIER}",
+    re.IGNORECASE,
+)
+
+
+def _normalize_table(name: str) -> str:
+    """Normaliza o nome da tabela para uso como tag ("public"."Empresas" -> empresas)"""
+    return name.split(".")[-1].strip('"').lower()
+
+
+def extract_read_tables(query: str) -> Set[str]:
+    """Tabelas lidas por uma query (FROM / JOIN)"""
+    return {_normalize_table(name) for name in _READ_TABLES.findall(query)}
+
+
+def extract_write_tables(query: str) -> Set[str]:
+    """Tabelas alteradas por uma query (INSERT / UPDATE / DELETE / TRUNCATE / MERGE / COPY)"""
+    return {_normalize_table(name) for name in _WRITE_TABLES.findall(query)}
+
+
+class QueryCache:
+    """
+    Cache LRU de resultados de query com TTL e tags por tabela.
+
+    Cada entrada guarda as tags (tabelas) das quais depende; invalidate()
+    remove todas as entradas que dependem das tabelas informadas.
+
+    Exemplo:
+        cache = QueryCache(max_size=100, ttl=30)
+        cache.set(("q", "p"), [1, 2], tags={"empresas"})
+        hit, value = cache.get(("q", "p"))
+        cache.invalidate({"empresas"})
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        Args:
+            max_size: Número máximo de entradas (LRU). Se None, usa settings.db_cache_max_size
+            ttl: Tempo de vida padrão das entradas (segundos). Se None, usa settings.db_cache_ttl
+        """
+        self.max_size = settings.db_cache_max_size if max_size is None else max_size
+        self.ttl = settings.db_cache_ttl if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, frozenset]]" = OrderedDict()
+        self._by_tag: Dict[str, Set[Hashable]] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Retorna (encontrado, valor)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, entry[1]
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        tags: Iterable[str] = (),
+        ttl: Optional[float] = None,
+    ) -> None:
+        """Armazena um valor com as tags das quais ele depende"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        tags = frozenset(_normalize_table(tag) for tag in tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, value, tags)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """Remove as entradas que dependem de alguma das tags; retorna quantas foram removidas"""
+        removed = 0
+        with self._lock:
+            for tag in {_normalize_table(tag) for tag in tags}:
+                for key in list(self._by_tag.get(tag, ())):
+                    self._remove(key)
+                    removed += 1
+            self._stats["invalidations"] += removed
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_tag.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove uma entrada (chamado com o lock adquirido)"""
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+
+# ==========================================
+# INSTÂNCIA GLOBAL (lazy loading)
+# ==========================================
+
+_query_cache: Optional[QueryCache] = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> QueryCache:
+    """Retorna o cache de resultados do processo"""
+    global _query_cache
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                _query_cache = QueryCache()
+    return _query_cache
+
+
+def invalidate_tables(*tables: str) -> int:
+    """
+    Invalida manualmente o cache de resultados das tabelas informadas.
+
+    Exemplo:
+        invalidate_tables("empresas", "organizacoes")
+    """
+    return get_query_cache().invalidate(tables)
@@ -1,13 +1,46 @@
 """
 Conexões PostgreSQL com psycopg2
 """
+import io
 import os
-from typing import Optional, List, Tuple, Any, Dict
-from contextlib import contextmanager
+import gzip
+import json
+import time
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from itertools import islice
+from contextvars import ContextVar
+from typing import Optional, List, Tuple, Any, Dict, Iterator, Iterable, Sequence, Callable, Union
+from contextlib import contextmanager, suppress
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import extensions, sql
+from psycopg2.extras import RealDictCursor, execute_values
+from loguru import logger
 from ..settings import settings
-from ..core.exceptions import DatabaseConnectionError, DatabaseQueryError
+from ..core.exceptions import DatabaseConnectionError, DatabaseQueryError, DatabaseTimeoutError
+from .pool import get_pool, is_pooled
+from .pooler import transaction_pooler
+from .prepared import execute_prepared
+from .cache import get_query_cache, extract_read_tables, extract_write_tables
+from .metrics import observe_query
+from .retry import (
+    backoff_delays,
+    connect_options,
+    count_connection_event,
+    is_connection_lost,
+    is_retryable_connect_error,
+)
+from .replica import (
+    REPLICATION_LAG_SQL,
+    ReplicaRouter,
+    replica_configured,
+    replica_connection_params,
+)
+
+
+COPY_FORMATS = ("csv", "text")
+EXPORT_FORMATS = ("csv", "text", "binary")
 
 
 class DatabaseConnection:
@@ -22,10 +55,19 @@ class DatabaseConnection:
         database: Optional[str] = None,
         user: Optional[str] = None,
         password: Optional[str] = None,
+        use_pool: bool = False,
+        connect_retries: Optional[int] = None,
     ):
         """
         Inicializa a conexão com o banco de dados.
         Se não fornecidos, usa valores do settings global.
+        
+        Com use_pool=True a conexão é emprestada do pool do processo em connect()
+        e devolvida em close(), em vez de abrir e fechar um socket próprio.
+        
+        Falhas transitórias ao abrir a conexão (recusada, timeout, failover) são
+        repetidas até connect_retries vezes (padrão settings.db_connect_retries)
+        com backoff exponencial e jitter.
         """
         # Usa settings global como fallback
         self.host = host or settings.db_host
@@ -33,20 +75,56 @@ class DatabaseConnection:
         self.database = database or settings.db_name
         self.user = user or settings.db_user
         self.password = password or settings.db_password
+        self.use_pool = use_pool
+        self.connect_retries = (
+            settings.db_connect_retries if connect_retries is None else connect_retries
+        )
         
         self._connection = None
+        self._pool = None
     
-    def connect(self):
-        """Estabelece conexão com o banco de dados"""
-        try:
-            if self._connection is None or self._connection.closed:
-                self._connection = psycopg2.connect(
+    def _open(self):
+        """
+        Abre uma nova conexão física (com connect_timeout e keepalives TCP),
+        repetindo falhas transitórias com backoff. Também é a fábrica de
+        conexões do pool.
+        """
+        delays = backoff_delays(self.connect_retries)
+        while True:
+            count_connection_event("connect_attempts")
+            try:
+                return psycopg2.connect(
                     host=self.host,
                     port=self.port,
                     database=self.database,
                     user=self.user,
-                    password=self.password
+                    password=self.password,
+                    **connect_options(),
+                )
+            except psycopg2.Error as e:
+                count_connection_event("connect_failures")
+                delay = next(delays, None) if is_retryable_connect_error(e) else None
+                if delay is None:
+                    raise
+                count_connection_event("connect_retries")
+                logger.warning(
+                    f"Falha ao conectar em {self.host}:{self.port}/{self.database} ({e}); "
+                    f"nova tentativa em {delay:.2f}s"
                 )
+                time.sleep(delay)
+    
+    def connect(self):
+        """Estabelece conexão com o banco de dados (ou empresta uma do pool)"""
+        try:
+            if self._connection is None or self._connection.closed:
+                if self.use_pool:
+                    self._pool = get_pool(
+                        (self.host, self.port, self.database, self.user, self.password),
+                        self._open,
+                    )
+                    self._connection = self._pool.getconn()
+                else:
+                    self._connection = self._open()
             return self._connection
         except psycopg2.Error as e:
             raise DatabaseConnectionError(
@@ -60,8 +138,13 @@ class DatabaseConnection:
             ) from e
     
     def close(self):
-        """Fecha a conexão com o banco de dados"""
-        if self._connection and not self._connection.closed:
+        """Fecha a conexão com o banco de dados (ou devolve ao pool)"""
+        if self._connection is None:
+            return
+        if self._pool is not None:
+            self._pool.putconn(self._connection)
+            self._connection = None
+        elif not self._connection.closed:
             self._connection.close()
     
     def __enter__(self):
@@ -71,6 +154,113 @@ class DatabaseConnection:
         self.close()
 
 
+# ==========================================
+# ESCOPO DE TRANSAÇÃO (contextvar)
+# ==========================================
+
+class _Transaction:
+    """Estado da transação ativa no contexto atual"""
+    
+    def __init__(self, connection, target: Tuple[Any, ...]):
+        self.connection = connection
+        self.target = target
+        self.savepoints = 0
+        # Tabelas alteradas na transação (invalidadas no cache após o commit)
+        self.written_tables: set = set()
+
+
+_current_transaction: ContextVar[Optional[_Transaction]] = ContextVar(
+    "db_transaction", default=None
+)
+
+
+def _target(
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    database: Optional[str] = None,
+    user: Optional[str] = None,
+) -> Tuple[Any, ...]:
+    """Destino efetivo da conexão (com fallback para o settings global)"""
+    return (
+        host or settings.db_host,
+        port or settings.db_port,
+        database or settings.db_name,
+        user or settings.db_user,
+    )
+
+
+def _target_params(connection_params: Dict[str, Any]) -> Dict[str, Any]:
+    """Extrai de connection_params apenas os campos que identificam o destino"""
+    return {key: connection_params.get(key) for key in ("host", "port", "database", "user")}
+
+
+def _active_transaction(**target_params) -> Optional[_Transaction]:
+    """Retorna a transação ativa se ela aponta para o mesmo destino"""
+    active = _current_transaction.get()
+    if active is not None and active.target == _target(**target_params):
+        return active
+    return None
+
+
+@contextmanager
+def transaction(
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    database: Optional[str] = None,
+    user: Optional[str] = None,
+    password: Optional[str] = None,
+    use_pool: Optional[bool] = None,
+):
+    """
+    Context manager que agrupa vários helpers em uma única conexão e transação.
+    
+    Dentro do bloco, execute_query, execute_many, fetch_all, fetch_one (e demais
+    helpers) que apontam para o mesmo destino reutilizam a mesma conexão e não
+    fazem commit; o commit acontece uma única vez ao final. Qualquer exceção
+    desfaz tudo. Blocos aninhados viram SAVEPOINTs.
+    
+    Exemplo:
+        with transaction():
+            empresa = fetch_one("SELECT id FROM empresas WHERE cnpj = %s", (cnpj,))
+            execute_query("UPDATE empresas SET ativo = true WHERE id = %s", (empresa["id"],))
+            execute_query("INSERT INTO privilegios (empresa_id) VALUES (%s)", (empresa["id"],))
+    """
+    active = _active_transaction(host=host, port=port, database=database, user=user)
+    if active is not None:
+        active.savepoints += 1
+        savepoint = f"sp_{active.savepoints}"
+        with active.connection.cursor() as cursor:
+            cursor.execute(f"SAVEPOINT {savepoint}")
+        try:
+            yield active.connection
+        except BaseException:
+            with active.connection.cursor() as cursor:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+            raise
+        else:
+            with active.connection.cursor() as cursor:
+                cursor.execute(f"RELEASE SAVEPOINT {savepoint}")
+        finally:
+            active.savepoints -= 1
+        return
+    
+    current = _Transaction(None, _target(host, port, database, user))
+    try:
+        with get_connection(host, port, database, user, password, use_pool=use_pool) as conn:
+            current.connection = conn
+            token = _current_transaction.set(current)
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                _current_transaction.reset(token)
+    finally:
+        if current.written_tables:
+            get_query_cache().invalidate(current.written_tables)
+
+
 @contextmanager
 def get_connection(
     host: Optional[str] = None,
@@ -78,47 +268,156 @@ def get_connection(
     database: Optional[str] = None,
     user: Optional[str] = None,
     password: Optional[str] = None,
+    use_pool: Optional[bool] = None,
 ):
     """
     Context manager para conexão com banco de dados PostgreSQL.
     
+    Por padrão a conexão vem do pool do processo (settings.db_pool_enabled);
+    use use_pool=False para abrir uma conexão exclusiva. Dentro de um bloco
+    transaction() para o mesmo destino, retorna a conexão da transação sem
+    fazer commit.
+    
     Exemplo:
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM users")
             results = cursor.fetchall()
     """
-    db = DatabaseConnection(host, port, database, user, password)
+    active = _active_transaction(host=host, port=port, database=database, user=user)
+    if active is not None:
+        try:
+            yield active.connection
+        except psycopg2.Error as e:
+            raise _query_error(e) from e
+        return
+    
+    if use_pool is None:
+        use_pool = settings.db_pool_enabled
+    db = DatabaseConnection(host, port, database, user, password, use_pool=use_pool)
+    conn = None
     try:
         conn = db.connect()
         yield conn
         conn.commit()
     except psycopg2.Error as e:
         if conn:
-            conn.rollback()
-        raise DatabaseQueryError(
-            "Erro ao executar operação no banco",
-            details={"error": str(e)}
-        ) from e
+            # Se a conexão caiu o rollback também falha; preserva o erro original
+            with suppress(psycopg2.Error):
+                conn.rollback()
+        raise _query_error(e) from e
     except DatabaseConnectionError:
         raise
     finally:
         db.close()
 
 
+def _connection_lost(error: DatabaseQueryError) -> bool:
+    """Verifica se o DatabaseQueryError foi causado por queda da conexão"""
+    cause = error.__cause__
+    return cause is not None and is_connection_lost(cause)
+
+
+def _query_error(error: psycopg2.Error) -> DatabaseQueryError:
+    """Converte um erro do psycopg2 (query cancelada vira DatabaseTimeoutError)"""
+    if isinstance(error, extensions.QueryCanceledError):
+        return DatabaseTimeoutError(details={"error": str(error)})
+    return DatabaseQueryError(
+        "Erro ao executar operação no banco",
+        details={"error": str(error)}
+    )
+
+
+@contextmanager
+def _statement_timeout(conn, timeout: Optional[float]):
+    """
+    Aplica SET LOCAL statement_timeout (segundos) à transação corrente; o
+    servidor cancela a query que passar do limite (DatabaseTimeoutError).
+    
+    Dentro de transaction() o limite é desfeito ao fim do bloco para não
+    afetar as próximas queries da transação. Fora dela, o commit/rollback
+    de get_connection já descarta o SET LOCAL.
+    """
+    if timeout is None:
+        timeout = settings.db_statement_timeout
+    if not timeout:
+        yield
+        return
+    
+    with conn.cursor() as cursor:
+        cursor.execute("SET LOCAL statement_timeout = %s", (max(1, int(timeout * 1000)),))
+    yield
+    active = _current_transaction.get()
+    if active is not None and active.connection is conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SET LOCAL statement_timeout = DEFAULT")
+
+
+def _invalidate_written_tables(
+    query: str,
+    connection_params: Dict[str, Any],
+    tables: Optional[Iterable[str]] = None,
+) -> None:
+    """
+    Invalida o cache de resultados das tabelas alteradas por uma escrita.
+    Dentro de transaction(), a invalidação é repetida após o commit.
+    """
+    tables = set(tables) if tables is not None else extract_write_tables(query)
+    if not tables:
+        return
+    active = _active_transaction(**_target_params(connection_params))
+    if active is not None:
+        active.written_tables.update(tables)
+    get_query_cache().invalidate(tables)
+
+
+def _copy_row(row: Any) -> Any:
+    """Cópia de uma linha dict (RealDictRow) para o cache; tuplas já são imutáveis"""
+    return dict(row) if isinstance(row, dict) else row
+
+
+def _cache_key(query: str, params: Any, connection_params: Dict[str, Any], kind: str) -> Tuple:
+    target = _target(**_target_params(connection_params))
+    return (kind, target, query, repr(params))
+
+
+def _execute(cursor, query: str, params: Optional[Tuple], prepared: Optional[bool]) -> None:
+    """
+    Executa a query, via prepared statement quando habilitado e a conexão é do
+    pool (nunca atrás de PgBouncer em modo transaction, ver pooler)
+    """
+    if prepared is None:
+        prepared = settings.db_prepared_statements
+    if prepared and is_pooled(cursor.connection) and not transaction_pooler():
+        execute_prepared(cursor, query, params)
+    else:
+        cursor.execute(query, params)
+
+
 def execute_query(
     query: str,
     params: Optional[Tuple] = None,
     connection_params: Optional[Dict[str, Any]] = None,
+    prepared: Optional[bool] = None,
+    timeout: Optional[float] = None,
 ) -> int:
     """
     Executa uma query SQL (INSERT, UPDATE, DELETE) e retorna o número de linhas afetadas.
+    
+    Com prepared=True (ou settings.db_prepared_statements), a query é preparada
+    uma vez por conexão do pool e as chamadas seguintes usam EXECUTE.
+    
+    timeout: Limite em segundos (SET LOCAL statement_timeout); acima dele a query
+    é cancelada com DatabaseTimeoutError. Padrão: settings.db_statement_timeout.
+    Queries acima de settings.db_slow_query_threshold são logadas (ver metrics).
     """
+    connection_params = connection_params or {}
     try:
-        connection_params = connection_params or {}
         with get_connection(**connection_params) as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(query, params)
+            with _statement_timeout(conn, timeout), conn.cursor() as cursor:
+                with observe_query(query, params) as observation:
+                    _execute(cursor, query, params, prepared)
+                    observation.rows = cursor.rowcount
                 return cursor.rowcount
     except (DatabaseConnectionError, DatabaseQueryError):
         raise
@@ -127,21 +426,197 @@ def execute_query(
             "Erro ao executar query",
             details={"query": query[:100], "error": str(e)}
         ) from e
+    finally:
+        _invalidate_written_tables(query, connection_params)
 
 
 def execute_many(
     query: str,
     params_list: List[Tuple],
     connection_params: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
 ) -> int:
     """
     Executa múltiplas queries SQL com diferentes parâmetros.
+    
+    timeout: ver execute_query.
     """
     connection_params = connection_params or {}
-    with get_connection(**connection_params) as conn:
+    try:
+        with get_connection(**connection_params) as conn:
+            with _statement_timeout(conn, timeout), conn.cursor() as cursor:
+                with observe_query(query, params_list) as observation:
+                    cursor.executemany(query, params_list)
+                    observation.rows = cursor.rowcount
+                return cursor.rowcount
+    finally:
+        _invalidate_written_tables(query, connection_params)
+
+
+def execute_batch_values(
+    query: str,
+    params_list: Iterable[Sequence[Any]],
+    connection_params: Optional[Dict[str, Any]] = None,
+    page_size: int = 1000,
+    template: Optional[str] = None,
+    returning: bool = False,
+    as_dict: bool = True,
+    timeout: Optional[float] = None,
+) -> Union[int, List]:
+    """
+    Executa INSERT/UPDATE em lote enviando VALUES de múltiplas linhas por statement
+    (psycopg2.extras.execute_values), uma ida ao banco por página.
+    
+    A query deve ter um único placeholder %s no lugar da lista de VALUES.
+    
+    Args:
+        query: Query com "VALUES %s" (ex: INSERT INTO t (a, b) VALUES %s)
+        params_list: Iterável de tuplas com os valores de cada linha
+        connection_params: Parâmetros de conexão (host, port, database, ...)
+        page_size: Linhas por statement
+        template: Template de cada linha (ex: "(%s, %s, now())")
+        returning: Se True, retorna as linhas do RETURNING de todas as páginas
+        as_dict: Se True, linhas do RETURNING retornam como dict
+        timeout: Limite em segundos por statement (ver execute_query)
+    
+    Returns:
+        Total de linhas afetadas (soma de todas as páginas) ou,
+        com returning=True, lista com as linhas retornadas
+    
+    Exemplo:
+        total = execute_batch_values(
+            "INSERT INTO pagamentos (cnpj, valor) VALUES %s",
+            [("123", 10.5), ("456", 20.0)],
+        )
+        
+        ids = execute_batch_values(
+            "INSERT INTO pagamentos (cnpj, valor) VALUES %s RETURNING id",
+            linhas,
+            returning=True,
+        )
+        
+        execute_batch_values(
+            "UPDATE dctf_retificacoes AS t SET status = v.status "
+            "FROM (VALUES %s) AS v (id, status) WHERE t.id = v.id",
+            [(1, "ok"), (2, "erro")],
+        )
+    """
+    connection_params = connection_params or {}
+    rows = iter(params_list)
+    total = 0
+    returned: List = []
+    
+    try:
+        with get_connection(**connection_params) as conn:
+            cursor_factory = RealDictCursor if as_dict and returning else None
+            with _statement_timeout(conn, timeout), conn.cursor(cursor_factory=cursor_factory) as cursor:
+                while True:
+                    page = list(islice(rows, page_size))
+                    if not page:
+                        break
+                    with observe_query(query, page) as observation:
+                        result = execute_values(
+                            cursor, query, page, template=template, page_size=len(page), fetch=returning
+                        )
+                        # Cada página é um único statement, então rowcount é o total da página
+                        observation.rows = cursor.rowcount
+                    total += cursor.rowcount
+                    if returning:
+                        returned.extend(result)
+    finally:
+        _invalidate_written_tables(query, connection_params)
+    
+    return returned if returning else total
+
+
+# ==========================================
+# LEITURAS (com roteamento para réplica)
+# ==========================================
+
+_replica_router: Optional[ReplicaRouter] = None
+
+
+def _replica_lag() -> float:
+    """Consulta o atraso de replicação na réplica"""
+    with get_connection(**replica_connection_params()) as conn:
         with conn.cursor() as cursor:
-            cursor.executemany(query, params_list)
-            return cursor.rowcount
+            cursor.execute(REPLICATION_LAG_SQL)
+            return cursor.fetchone()[0]
+
+
+def get_replica_router() -> ReplicaRouter:
+    """Retorna o roteador da réplica usado por fetch_all/fetch_one"""
+    global _replica_router
+    if _replica_router is None:
+        _replica_router = ReplicaRouter(_replica_lag, name=str(settings.db_read_host))
+    return _replica_router
+
+
+def _use_replica(connection_params: Dict[str, Any], use_replica: bool) -> bool:
+    """
+    Leituras vão para a réplica quando ela está configurada e saudável, sem
+    connection_params explícitos e fora de transaction() (para enxergar as
+    próprias escritas).
+    """
+    return (
+        use_replica
+        and not connection_params
+        and replica_configured()
+        and _current_transaction.get() is None
+        and get_replica_router().is_available()
+    )
+
+
+def _run_read(
+    query: str,
+    params: Optional[Tuple],
+    connection_params: Dict[str, Any],
+    as_dict: bool,
+    prepared: Optional[bool],
+    use_replica: bool,
+    timeout: Optional[float],
+    fetch: Callable[[Any], Any],
+) -> Any:
+    """
+    Executa uma leitura na réplica (com fallback para o primário) ou no primário.
+    
+    Fora de transaction(), leituras interrompidas por perda de conexão são
+    repetidas em uma conexão nova (até settings.db_read_retries vezes).
+    """
+    def execute(target_params: Dict[str, Any]) -> Any:
+        with get_connection(**target_params) as conn:
+            cursor_factory = RealDictCursor if as_dict else None
+            with _statement_timeout(conn, timeout), conn.cursor(cursor_factory=cursor_factory) as cursor:
+                with observe_query(query, params) as observation:
+                    _execute(cursor, query, params, prepared)
+                    result = fetch(cursor)
+                    observation.rows = cursor.rowcount
+                return result
+    
+    def run(target_params: Dict[str, Any]) -> Any:
+        if _current_transaction.get() is not None:
+            return execute(target_params)
+        delays = backoff_delays(settings.db_read_retries)
+        while True:
+            try:
+                return execute(target_params)
+            except DatabaseQueryError as e:
+                if not _connection_lost(e):
+                    raise
+                count_connection_event("connections_lost")
+                delay = next(delays, None)
+                if delay is None:
+                    raise
+                count_connection_event("reads_retried")
+                logger.warning(f"Conexão perdida durante leitura ({e.__cause__}); repetindo em {delay:.2f}s")
+                time.sleep(delay)
+    
+    if _use_replica(connection_params, use_replica):
+        try:
+            return run(replica_connection_params())
+        except DatabaseConnectionError as e:
+            get_replica_router().mark_down(e)
+    return run(connection_params)
 
 
 def fetch_all(
@@ -149,16 +624,51 @@ def fetch_all(
     params: Optional[Tuple] = None,
     connection_params: Optional[Dict[str, Any]] = None,
     as_dict: bool = True,
+    prepared: Optional[bool] = None,
+    cache: bool = False,
+    cache_ttl: Optional[float] = None,
+    cache_tags: Optional[Iterable[str]] = None,
+    use_replica: bool = True,
+    timeout: Optional[float] = None,
 ) -> List:
     """
     Executa uma query SELECT e retorna todos os resultados.
+    
+    prepared: ver execute_query (PREPARE uma vez por conexão do pool).
+    
+    Com cache=True o resultado fica no cache do processo por cache_ttl segundos
+    (padrão settings.db_cache_ttl), marcado com as tabelas lidas pela query
+    (ou cache_tags). Escritas feitas pelos helpers nessas tabelas invalidam a
+    entrada automaticamente. Dentro de transaction() o cache não é usado. O
+    cache guarda cópias das linhas e devolve cópias a cada acerto: alterar
+    uma linha retornada não afeta as próximas leituras.
+    
+    Se DB_READ_HOST estiver configurado, a leitura vai para a réplica (com
+    fallback para o primário em falha de conexão ou atraso acima de
+    DB_READ_MAX_LAG). Use use_replica=False para ler sempre do primário.
+    
+    timeout: ver execute_query (cancela a query após N segundos).
+    
+    Exemplo:
+        empresas = fetch_all("SELECT * FROM empresas WHERE ativo = %s", (True,), cache=True)
     """
     connection_params = connection_params or {}
-    with get_connection(**connection_params) as conn:
-        cursor_factory = RealDictCursor if as_dict else None
-        with conn.cursor(cursor_factory=cursor_factory) as cursor:
-            cursor.execute(query, params)
-            return cursor.fetchall()
+    use_cache = cache and _active_transaction(**_target_params(connection_params)) is None
+    if use_cache:
+        key = _cache_key(query, params, connection_params, "all" if as_dict else "all_tuple")
+        hit, rows = get_query_cache().get(key)
+        if hit:
+            return [_copy_row(row) for row in rows]
+    
+    rows = _run_read(
+        query, params, connection_params, as_dict, prepared, use_replica, timeout,
+        fetch=lambda cursor: cursor.fetchall(),
+    )
+    
+    if use_cache:
+        tags = cache_tags if cache_tags is not None else extract_read_tables(query)
+        get_query_cache().set(key, [_copy_row(row) for row in rows], tags=tags, ttl=cache_ttl)
+    return rows
 
 
 def fetch_one(
@@ -166,14 +676,469 @@ def fetch_one(
     params: Optional[Tuple] = None,
     connection_params: Optional[Dict[str, Any]] = None,
     as_dict: bool = True,
+    prepared: Optional[bool] = None,
+    cache: bool = False,
+    cache_ttl: Optional[float] = None,
+    cache_tags: Optional[Iterable[str]] = None,
+    use_replica: bool = True,
+    timeout: Optional[float] = None,
 ) -> Optional[Any]:
     """
     Executa uma query SELECT e retorna apenas um resultado.
+    
+    prepared: ver execute_query (PREPARE uma vez por conexão do pool).
+    cache, cache_ttl, cache_tags, use_replica, timeout: ver fetch_all.
     """
     connection_params = connection_params or {}
+    use_cache = cache and _active_transaction(**_target_params(connection_params)) is None
+    if use_cache:
+        key = _cache_key(query, params, connection_params, "one" if as_dict else "one_tuple")
+        hit, row = get_query_cache().get(key)
+        if hit:
+            return _copy_row(row)
+    
+    row = _run_read(
+        query, params, connection_params, as_dict, prepared, use_replica, timeout,
+        fetch=lambda cursor: cursor.fetchone(),
+    )
+    
+    if use_cache:
+        tags = cache_tags if cache_tags is not None else extract_read_tables(query)
+        get_query_cache().set(key, _copy_row(row), tags=tags, ttl=cache_ttl)
+    return row
+
+
+def fetch_iter(
+    query: str,
+    params: Optional[Tuple] = None,
+    connection_params: Optional[Dict[str, Any]] = None,
+    as_dict: bool = True,
+    batch_size: int = 1000,
+    batches: bool = False,
+    timeout: Optional[float] = None,
+) -> Iterator:
+    """
+    Executa uma query SELECT com cursor no servidor (named cursor) e retorna
+    os resultados sob demanda, sem materializar tudo em memória.
+    
+    A conexão e a transação ficam abertas apenas enquanto o iterador é consumido;
+    ao terminar (ou ao interromper com break/close()) a conexão é liberada.
+    
+    Args:
+        query: Query SELECT
+        params: Parâmetros da query
+        connection_params: Parâmetros de conexão (host, port, database, ...)
+        as_dict: Se True, retorna linhas como dict (RealDictRow)
+        batch_size: Linhas buscadas do servidor por vez (itersize)
+        batches: Se True, retorna listas de até batch_size linhas em vez de linha a linha
+        timeout: Limite em segundos de cada FETCH no servidor (ver execute_query)
+    
+    Exemplo:
+        for row in fetch_iter("SELECT * FROM speds_retificados", batch_size=5000):
+            processa(row)
+        
+        for lote in fetch_iter("SELECT * FROM dctf_download_unit", batches=True):
+            processa_lote(lote)
+    """
+    with _server_cursor(query, params, connection_params or {}, batch_size, as_dict, timeout) as cursor:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if batches:
+                yield rows
+            else:
+                yield from rows
+
+
+@contextmanager
+def _server_cursor(
+    query: str,
+    params: Optional[Tuple],
+    connection_params: Dict[str, Any],
+    batch_size: int,
+    as_dict: bool,
+    timeout: Optional[float] = None,
+):
+    """Abre um named cursor (cursor no servidor) já executado"""
     with get_connection(**connection_params) as conn:
         cursor_factory = RealDictCursor if as_dict else None
-        with conn.cursor(cursor_factory=cursor_factory) as cursor:
-            cursor.execute(query, params)
-            return cursor.fetchone()
+        cursor_name = f"fetch_iter_{uuid.uuid4().hex}"
+        with _statement_timeout(conn, timeout):
+            with conn.cursor(name=cursor_name, cursor_factory=cursor_factory) as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(query, params)
+                yield cursor
+
+
+def _to_array(values: List[Any]):
+    """Converte uma coluna em array NumPy inferindo o dtype pelos valores"""
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError(
+            "numpy é necessário para fetch_columns(as_numpy=True): "
+            "pip install automacoes-python-base-td[numpy]"
+        ) from e
+    
+    non_null = [value for value in values if value is not None]
+    has_null = len(non_null) != len(values)
+    
+    if not non_null:
+        return np.array(values, dtype=object)
+    if all(isinstance(value, bool) for value in non_null):
+        return np.array(values, dtype=object if has_null else bool)
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in non_null) and not has_null:
+        return np.array(values, dtype=np.int64)
+    if all(isinstance(value, (int, float, Decimal)) and not isinstance(value, bool) for value in non_null):
+        return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+    if all(isinstance(value, datetime) for value in non_null):
+        # datetime64 não guarda timezone: normaliza para UTC
+        return np.array(
+            [
+                None if value is None
+                else value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo
+                else value
+                for value in values
+            ],
+            dtype="datetime64[us]",
+        )
+    if all(isinstance(value, date) for value in non_null):
+        return np.array(values, dtype="datetime64[D]")
+    return np.array(values, dtype=object)
+
+
+def fetch_columns(
+    query: str,
+    params: Optional[Tuple] = None,
+    connection_params: Optional[Dict[str, Any]] = None,
+    batch_size: int = 10000,
+    as_numpy: bool = False,
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Executa uma query SELECT e retorna o resultado por coluna (dict de listas),
+    sem criar um dict por linha.
+    
+    As linhas são lidas como tuplas em lotes de um cursor no servidor e
+    transpostas para colunas, o que reduz bastante a memória em relação ao
+    fetch_all e permite agregações vetorizadas.
+    
+    Args:
+        query: Query SELECT
+        params: Parâmetros da query
+        connection_params: Parâmetros de conexão (host, port, database, ...)
+        batch_size: Linhas buscadas do servidor por vez
+        as_numpy: Se True, retorna arrays NumPy (int64/float64/bool/datetime64
+                  inferidos pelos valores; NULL vira NaN/NaT ou dtype object)
+        timeout: Limite em segundos de cada FETCH no servidor (ver execute_query)
+    
+    Returns:
+        Dict {nome_da_coluna: lista ou array}
+    
+    Exemplo:
+        colunas = fetch_columns("SELECT cnpj, valor, data FROM pagamentos", as_numpy=True)
+        total = colunas["valor"].sum()
+    """
+    names: List[str] = []
+    values: List[List[Any]] = []
+    with observe_query(query, params) as observation:
+        with _server_cursor(
+            query, params, connection_params or {}, batch_size, as_dict=False, timeout=timeout
+        ) as cursor:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not names and cursor.description:
+                    names = [column[0] for column in cursor.description]
+                    values = [[] for _ in names]
+                if not rows:
+                    break
+                for index, column in enumerate(zip(*rows)):
+                    values[index].extend(column)
+        observation.rows = len(values[0]) if values else 0
+    
+    if as_numpy:
+        return {name: _to_array(column) for name, column in zip(names, values)}
+    return dict(zip(names, values))
+
+
+# ==========================================
+# COPY (carga em massa)
+# ==========================================
+
+def _copy_csv_value(value: Any) -> str:
+    """Serializa um valor no formato CSV do COPY (NULL = campo vazio sem aspas)"""
+    if value is None:
+        return ""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\x" + bytes(value).hex()
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, default=str)
+    text = str(value)
+    if text == "" or any(char in text for char in ',"\\\n\r'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
 
+def _copy_text_value(value: Any) -> str:
+    """Serializa um valor no formato texto do COPY (NULL = \\N)"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        value = "\\x" + bytes(value).hex()
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value, default=str)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class _CopyRowStream:
+    """
+    Arquivo somente-leitura que serializa linhas sob demanda para o COPY FROM STDIN.
+    
+    O psycopg2 chama read(size) repetidamente; só são serializadas as linhas
+    necessárias para preencher cada bloco, então a memória fica limitada a
+    ~size bytes independente do tamanho do iterável.
+    """
+    
+    def __init__(self, rows: Iterable[Sequence[Any]], format: str = "csv"):
+        self._rows = iter(rows)
+        self._separator = "," if format == "csv" else "\t"
+        self._serialize: Callable[[Any], str] = (
+            _copy_csv_value if format == "csv" else _copy_text_value
+        )
+        self._buffer = bytearray()
+        self._exhausted = False
+        self.rows = 0
+    
+    def read(self, size: int = -1) -> bytes:
+        while not self._exhausted and (size < 0 or len(self._buffer) < size):
+            row = next(self._rows, None)
+            if row is None:
+                self._exhausted = True
+                break
+            line = self._separator.join(self._serialize(value) for value in row) + "\n"
+            self._buffer += line.encode("utf-8")
+            self.rows += 1
+        
+        if size < 0 or size > len(self._buffer):
+            size = len(self._buffer)
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return chunk
+    
+    readline = read
+
+
+def _qualified_table(table: str) -> sql.Composed:
+    """Monta o identificador de tabela (aceita 'schema.tabela')"""
+    return sql.SQL(".").join(sql.Identifier(part) for part in table.split("."))
+
+
+def copy_rows(
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    connection_params: Optional[Dict[str, Any]] = None,
+    format: str = "csv",
+    buffer_size: int = 65536,
+) -> Dict[str, Any]:
+    """
+    Carrega linhas em massa com COPY FROM STDIN.
+    
+    As linhas são consumidas do iterável (lista, generator, fetch_iter...) e
+    enviadas em blocos de buffer_size bytes, sem manter todo o conteúdo em memória.
+    
+    Args:
+        table: Nome da tabela (aceita "schema.tabela")
+        columns: Colunas na mesma ordem dos valores de cada linha
+        rows: Iterável de tuplas/listas com os valores
+        connection_params: Parâmetros de conexão (host, port, database, ...)
+        format: "csv" ou "text"
+        buffer_size: Tamanho (bytes) de cada bloco enviado ao servidor
+    
+    Returns:
+        Dict com rows, seconds e rows_per_second
+    
+    Exemplo:
+        def linhas():
+            for pagamento in ler_arquivo():
+                yield (pagamento.cnpj, pagamento.valor, pagamento.data)
+        
+        stats = copy_rows("pagamentos", ["cnpj", "valor", "data"], linhas())
+        print(stats["rows_per_second"])
+    """
+    if format not in COPY_FORMATS:
+        raise ValueError(f"format deve ser um de {COPY_FORMATS}, recebido: {format!r}")
+    
+    copy_sql = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT {})").format(
+        _qualified_table(table),
+        sql.SQL(", ").join(sql.Identifier(column) for column in columns),
+        sql.SQL(format),
+    )
+    stream = _CopyRowStream(rows, format=format)
+    
+    connection_params = connection_params or {}
+    started = time.perf_counter()
+    try:
+        with get_connection(**connection_params) as conn:
+            with conn.cursor() as cursor:
+                cursor.copy_expert(copy_sql, stream, size=buffer_size)
+    finally:
+        _invalidate_written_tables(copy_sql, connection_params, tables=[table])
+    elapsed = time.perf_counter() - started
+    
+    stats = {
+        "rows": stream.rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(stream.rows / elapsed, 1) if elapsed > 0 else float(stream.rows),
+    }
+    logger.info(
+        f"COPY {table}: {stats['rows']} linhas em {stats['seconds']}s "
+        f"({stats['rows_per_second']} linhas/s)"
+    )
+    return stats
+
+
+# ==========================================
+# COPY TO (exportação em streaming)
+# ==========================================
+
+class _CountingWriter:
+    """Repassa as escritas para o destino contando os bytes gravados"""
+    
+    def __init__(self, target: Any):
+        self._target = target
+        self._text = isinstance(target, io.TextIOBase)
+        self.bytes = 0
+    
+    def write(self, data: Union[bytes, str]) -> int:
+        if self._text and isinstance(data, bytes):
+            data = data.decode("utf-8")
+        elif not self._text and isinstance(data, str):
+            data = data.encode("utf-8")
+        self._target.write(data)
+        self.bytes += len(data)
+        return len(data)
+    
+    def flush(self) -> None:
+        flush = getattr(self._target, "flush", None)
+        if flush is not None:
+            flush()
+
+
+@contextmanager
+def _export_destination(destination: Any, part_size: Optional[int]):
+    """Abre o destino da exportação: arquivo já aberto, s3://bucket/chave ou caminho local"""
+    if hasattr(destination, "write"):
+        yield destination
+        return
+    
+    path = os.fspath(destination)
+    if path.startswith("s3://"):
+        from ..aws.s3 import S3Client
+        
+        bucket, _, key = path[len("s3://"):].partition("/")
+        if not bucket or not key:
+            raise ValueError(f"Destino S3 inválido (esperado s3://bucket/chave): {path!r}")
+        with S3Client().open_multipart_writer(bucket, key, part_size=part_size) as writer:
+            yield writer
+        return
+    
+    try:
+        with open(path, "wb") as file:
+            yield file
+    except BaseException:
+        # Não deixa arquivo parcial para trás
+        with suppress(OSError):
+            os.remove(path)
+        raise
+
+
+def export_query(
+    query: str,
+    destination: Any,
+    params: Optional[Tuple] = None,
+    connection_params: Optional[Dict[str, Any]] = None,
+    format: str = "csv",
+    header: bool = True,
+    compress: Optional[bool] = None,
+    timeout: Optional[float] = None,
+    part_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Exporta o resultado de uma query com COPY (query) TO STDOUT, gravando os
+    dados direto no destino conforme chegam do servidor (sem fetch_all e sem
+    manter o resultado em memória).
+    
+    Args:
+        query: Query SELECT (parâmetros são interpolados no cliente)
+        destination: Caminho local, "s3://bucket/chave" (multipart upload via
+                     S3Client) ou arquivo já aberto em modo binário
+        params: Parâmetros da query
+        connection_params: Parâmetros de conexão (host, port, database, ...)
+        format: "csv", "text" ou "binary" (formato binário do COPY)
+        header: Inclui cabeçalho com os nomes das colunas (apenas csv)
+        compress: Compacta com gzip durante a escrita. Se None, compacta
+                  quando o destino termina em ".gz"
+        timeout: Limite em segundos (ver execute_query)
+        part_size: Tamanho das partes do upload S3 em bytes (padrão 8 MB)
+    
+    Returns:
+        Dict com rows, bytes (gravados no destino), seconds e destination
+    
+    Exemplo:
+        export_query(
+            "SELECT * FROM pagamentos WHERE data >= %s",
+            "s3://analytics/exports/pagamentos.csv.gz",
+            params=(date(2025, 1, 1),),
+        )
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"format deve ser um de {EXPORT_FORMATS}, recebido: {format!r}")
+    
+    is_path = not hasattr(destination, "write")
+    name = os.fspath(destination) if is_path else getattr(destination, "name", type(destination).__name__)
+    if compress is None:
+        compress = is_path and str(name).endswith(".gz")
+    if compress and isinstance(destination, io.TextIOBase):
+        raise ValueError("compress=True requer um destino binário")
+    
+    options = [f"FORMAT {format}"]
+    if header and format == "csv":
+        options.append("HEADER true")
+    
+    connection_params = connection_params or {}
+    started = time.perf_counter()
+    with _export_destination(destination, part_size) as target:
+        counter = _CountingWriter(target)
+        sink = gzip.GzipFile(fileobj=counter, mode="wb") if compress else counter
+        with get_connection(**connection_params) as conn:
+            with _statement_timeout(conn, timeout), conn.cursor() as cursor:
+                select_sql = cursor.mogrify(query, params).decode("utf-8") if params else query
+                copy_sql = f"COPY ({select_sql}) TO STDOUT WITH ({', '.join(options)})"
+                with observe_query(query, params) as observation:
+                    cursor.copy_expert(copy_sql, sink)
+                    observation.rows = cursor.rowcount
+                rows = cursor.rowcount
+        if compress:
+            # Grava o trailer do gzip (não fecha o destino)
+            sink.close()
+    elapsed = time.perf_counter() - started
+    
+    stats = {
+        "rows": rows,
+        "bytes": counter.bytes,
+        "seconds": round(elapsed, 3),
+        "destination": str(name),
+    }
+    logger.info(
+        f"Exportação para {stats['destination']}: {rows} linhas, "
+        f"{stats['bytes']} bytes em {stats['seconds']}s"
+    )
+    return stats
@@ -0,0 +1,270 @@
+"""
+Métricas de queries: fingerprint de SQL, histograma de duração e log de queries lentas
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional, Sequence
+from loguru import logger
+from ..settings import settings
+
+
+# Limites superiores dos buckets (segundos); o último bucket é +Inf
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+OTHER_FINGERPRINT = "<outras>"
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_NUMBERS = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?(?![\w$])")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_REPEATED_TUPLES = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query: str) -> str:
+    """
+    Normaliza uma query para agrupar execuções com valores diferentes.
+
+    Remove comentários, troca literais e placeholders por ?, colapsa listas
+    (IN, VALUES) e espaços.
+
+    Exemplo:
+        fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND nome = 'x'")
+        # "SELECT * FROM t WHERE id IN (?) AND nome = ?"
+    """
+    text = _COMMENTS.sub(" ", str(query))
+    text = _STRINGS.sub("?", text)
+    text = _PLACEHOLDERS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    text = _LISTS.sub("(?)", text)
+    text = _REPEATED_TUPLES.sub("(?)", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def params_shape(params: Any) -> str:
+    """
+    Descreve o formato dos parâmetros sem expor os valores (para logs).
+
+    Exemplo:
+        params_shape(("123", 10, None))  # "(str, int, None)"
+        params_shape({"cnpj": "123"})    # "{cnpj: str}"
+    """
+    def kind(value: Any) -> str:
+        return "None" if value is None else type(value).__name__
+
+    if params is None:
+        return "-"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {kind(value)}" for key, value in params.items()) + "}"
+    if isinstance(params, (list, tuple)):
+        if params and all(isinstance(item, (list, tuple)) for item in params):
+            return f"{len(params)} x {params_shape(params[0])}"
+        return "(" + ", ".join(kind(value) for value in params) + ")"
+    return kind(params)
+
+
+class QueryHistogram:
+    """
+    Histograma de duração de queries agrupado por fingerprint.
+
+    Ao atingir max_fingerprints, novas queries são agrupadas em "<outras>"
+    para limitar a memória.
+
+    Exemplo:
+        histogram = QueryHistogram()
+        histogram.record("SELECT * FROM t WHERE id = ?", 0.012, rows=1)
+        histogram.snapshot()["SELECT * FROM t WHERE id = ?"]["p95_ms"]
+    """
+
+    def __init__(
+        self,
+        buckets: Sequence[float] = DURATION_BUCKETS,
+        max_fingerprints: Optional[int] = None,
+    ):
+        """
+        Args:
+            buckets: Limites superiores dos buckets em segundos (ordenados)
+            max_fingerprints: Máximo de fingerprints distintos. Se None, usa
+                              settings.db_query_stats_max_fingerprints
+        """
+        self.buckets = tuple(buckets)
+        self.max_fingerprints = (
+            settings.db_query_stats_max_fingerprints if max_fingerprints is None else max_fingerprints
+        )
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def record(
+        self,
+        key: str,
+        seconds: float,
+        rows: Optional[int] = None,
+        error: bool = False,
+    ) -> None:
+        """Registra uma execução"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    key = OTHER_FINGERPRINT
+                    entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._entries[key] = {
+                        "count": 0,
+                        "errors": 0,
+                        "rows": 0,
+                        "total_seconds": 0.0,
+                        "max_seconds": 0.0,
+                        "buckets": [0] * (len(self.buckets) + 1),
+                    }
+            entry["count"] += 1
+            entry["errors"] += int(error)
+            entry["rows"] += rows if isinstance(rows, int) and rows > 0 else 0
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["buckets"][bisect_left(self.buckets, seconds)] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retorna as estatísticas por fingerprint.
+
+        Percentis são estimados pelo limite superior do bucket (em ms).
+        """
+        with self._lock:
+            entries = {key: dict(entry, buckets=list(entry["buckets"])) for key, entry in self._entries.items()}
+
+        labels = [str(bound) for bound in self.buckets] + ["+Inf"]
+        result = {}
+        for key, entry in entries.items():
+            count = entry["count"]
+            result[key] = {
+                "count": count,
+                "errors": entry["errors"],
+                "rows": entry["rows"],
+                "total_seconds": round(entry["total_seconds"], 6),
+                "avg_ms": round(entry["total_seconds"] / count * 1000, 3),
+                "max_ms": round(entry["max_seconds"] * 1000, 3),
+                "p50_ms": self._percentile(entry, 0.50),
+                "p95_ms": self._percentile(entry, 0.95),
+                "p99_ms": self._percentile(entry, 0.99),
+                "buckets": dict(zip(labels, entry["buckets"])),
+            }
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _percentile(self, entry: Dict[str, Any], quantile: float) -> float:
+        target = quantile * entry["count"]
+        seen = 0
+        for index, count in enumerate(entry["buckets"]):
+            seen += count
+            if seen >= target and count:
+                if index < len(self.buckets):
+                    return round(min(self.buckets[index], entry["max_seconds"]) * 1000, 3)
+                return round(entry["max_seconds"] * 1000, 3)
+        return round(entry["max_seconds"] * 1000, 3)
+
+
+# ==========================================
+# INSTÂNCIA GLOBAL (lazy loading)
+# ==========================================
+
+_histogram: Optional[QueryHistogram] = None
+_histogram_lock = threading.Lock()
+
+
+def get_query_histogram() -> QueryHistogram:
+    """Retorna o histograma de queries do processo"""
+    global _histogram
+    if _histogram is None:
+        with _histogram_lock:
+            if _histogram is None:
+                _histogram = QueryHistogram()
+    return _histogram
+
+
+def get_query_stats(top: Optional[int] = None, sort_by: str = "total_seconds") -> Dict[str, Dict[str, Any]]:
+    """
+    Retorna as estatísticas de duração por fingerprint de SQL.
+
+    Args:
+        top: Se informado, retorna apenas as N queries com maior sort_by
+        sort_by: Campo usado na ordenação (total_seconds, count, max_ms, p95_ms...)
+
+    Exemplo:
+        for sql, stats in get_query_stats(top=10).items():
+            print(stats["count"], stats["p95_ms"], sql)
+    """
+    stats = get_query_histogram().snapshot()
+    ordered = sorted(stats.items(), key=lambda item: item[1][sort_by], reverse=True)
+    if top is not None:
+        ordered = ordered[:top]
+    return dict(ordered)
+
+
+def reset_query_stats() -> None:
+    """Zera o histograma de queries do processo"""
+    get_query_histogram().reset()
+
+
+def record_query(
+    query: Any,
+    params: Any,
+    seconds: float,
+    rows: Optional[int] = None,
+    error: Optional[BaseException] = None,
+) -> None:
+    """
+    Registra uma execução no histograma e loga se passar de
+    settings.db_slow_query_threshold.
+    """
+    query = str(query)
+    get_query_histogram().record(fingerprint(query), seconds, rows=rows, error=error is not None)
+
+    threshold = settings.db_slow_query_threshold
+    if threshold is not None and seconds >= threshold:
+        status = f"erro: {type(error).__name__}" if error is not None else f"{rows} linhas"
+        logger.warning(
+            f"Query lenta: {seconds * 1000:.0f} ms ({status}, params {params_shape(params)}): "
+            f"{_WHITESPACE.sub(' ', query).strip()[:500]}"
+        )
+
+
+class QueryObservation:
+    """Resultado preenchido dentro de observe_query (linhas retornadas/afetadas)"""
+
+    __slots__ = ("rows",)
+
+    def __init__(self):
+        self.rows: Optional[int] = None
+
+
+@contextmanager
+def observe_query(query: Any, params: Any = None) -> Iterator[QueryObservation]:
+    """
+    Mede a duração do bloco e registra a query (inclusive quando falha).
+
+    Exemplo:
+        with observe_query(query, params) as observation:
+            cursor.execute(query, params)
+            observation.rows = cursor.rowcount
+    """
+    observation = QueryObservation()
+    started = time.perf_counter()
+    error: Optional[BaseException] = None
+    try:
+        yield observation
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        record_query(query, params, time.perf_counter() - started, observation.rows, error)
+
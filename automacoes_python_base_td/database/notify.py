@@ -0,0 +1,442 @@
+"""
+Feed de mudanças com LISTEN/NOTIFY do PostgreSQL
+
+Substitui loops de polling (ex: status de dctf_download_unit) por notificações
+enviadas pelo banco: um trigger faz NOTIFY quando a linha muda e um listener
+com conexão dedicada entrega o payload para callbacks ou para um iterador.
+"""
+import json
+import queue
+import random
+import select
+import threading
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+from psycopg2 import sql
+from loguru import logger
+from ..settings import settings
+from .connection import DatabaseConnection, execute_query, get_connection
+
+
+# Limite do PostgreSQL para o payload do NOTIFY (bytes)
+MAX_PAYLOAD_SIZE = 7999
+
+TRIGGER_EVENTS = ("INSERT", "UPDATE", "DELETE")
+
+
+class Notification(NamedTuple):
+    """Notificação recebida de um canal"""
+
+    channel: str
+    payload: str
+    pid: int
+
+    @property
+    def data(self) -> Any:
+        """Payload decodificado como JSON (ou o texto original se não for JSON)"""
+        try:
+            return json.loads(self.payload)
+        except ValueError:
+            return self.payload
+
+
+NotificationCallback = Callable[[Notification], None]
+
+
+class NotificationListener:
+    """
+    Listener de LISTEN/NOTIFY em uma conexão dedicada (fora do pool, em autocommit).
+
+    Roda em uma thread própria. Notificações de canais com callback são
+    entregues aos callbacks; as demais vão para uma fila consumida com
+    listen()/get(). Se a conexão cair, o listener reconecta com backoff
+    exponencial e refaz os LISTEN; notificações enviadas enquanto estava
+    desconectado são perdidas, então use on_reconnect para ressincronizar
+    (ex: uma consulta única do estado atual).
+
+    Exemplo:
+        def on_status(notification):
+            print(notification.data["status"])
+
+        listener = NotificationListener()
+        listener.subscribe("dctf_download_unit_changes", on_status)
+        listener.start()
+        ...
+        listener.stop()
+
+        # Ou como iterador:
+        with NotificationListener(["dctf_retificacoes_changes"]) as listener:
+            for notification in listener.listen(timeout=60):
+                processa(notification.data)
+    """
+
+    def __init__(
+        self,
+        channels: Sequence[str] = (),
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        database: Optional[str] = None,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        on_reconnect: Optional[Callable[[], None]] = None,
+        poll_interval: Optional[float] = None,
+        reconnect_delay: Optional[float] = None,
+        max_reconnect_delay: Optional[float] = None,
+    ):
+        """
+        Inicializa o listener. Se não fornecidos, usa valores do settings global.
+
+        Args:
+            channels: Canais assinados desde o início (entregues na fila)
+            on_reconnect: Chamado após cada reconexão (para ressincronizar o estado)
+            poll_interval: Tempo máximo de espera por notificação em cada ciclo (segundos)
+            reconnect_delay: Espera inicial antes de reconectar (dobra a cada falha)
+            max_reconnect_delay: Espera máxima entre tentativas de reconexão
+        """
+        self._db = DatabaseConnection(host, port, database, user, password)
+        self.on_reconnect = on_reconnect
+        self.poll_interval = settings.db_notify_poll_interval if poll_interval is None else poll_interval
+        self.reconnect_delay = (
+            settings.db_notify_reconnect_delay if reconnect_delay is None else reconnect_delay
+        )
+        self.max_reconnect_delay = (
+            settings.db_notify_max_reconnect_delay if max_reconnect_delay is None else max_reconnect_delay
+        )
+
+        self._lock = threading.Lock()
+        self._callbacks: Dict[str, List[NotificationCallback]] = {}
+        self._channels = set(channels)
+        self._listening: set = set()
+        self._queue: "queue.Queue[Notification]" = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._conn = None
+        self._failures = 0
+        self.reconnects = 0
+
+    # ==========================================
+    # ASSINATURAS
+    # ==========================================
+
+    def subscribe(self, channel: str, callback: Optional[NotificationCallback] = None) -> None:
+        """
+        Assina um canal. Com callback, as notificações do canal vão para ele;
+        sem callback, vão para a fila (listen/get).
+        """
+        with self._lock:
+            self._channels.add(channel)
+            if callback is not None:
+                self._callbacks.setdefault(channel, []).append(callback)
+
+    def unsubscribe(self, channel: str) -> None:
+        """Cancela a assinatura de um canal (e remove seus callbacks)"""
+        with self._lock:
+            self._channels.discard(channel)
+            self._callbacks.pop(channel, None)
+
+    # ==========================================
+    # CICLO DE VIDA
+    # ==========================================
+
+    def start(self) -> "NotificationListener":
+        """Inicia a thread do listener (idempotente)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="db-notify-listener", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Para a thread e fecha a conexão dedicada"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout if timeout is not None else self.poll_interval * 2)
+            self._thread = None
+        self._close()
+
+    def __enter__(self) -> "NotificationListener":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # ==========================================
+    # CONSUMO VIA FILA
+    # ==========================================
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Notification]:
+        """Retorna a próxima notificação da fila, ou None após o timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def listen(self, timeout: Optional[float] = None) -> Iterator[Notification]:
+        """
+        Itera sobre as notificações da fila (inicia o listener se necessário).
+
+        Args:
+            timeout: Encerra a iteração após N segundos sem notificações
+                     (None = até stop())
+        """
+        self.start()
+        while not self._stop.is_set():
+            notification = self.get(timeout=self.poll_interval if timeout is None else timeout)
+            if notification is not None:
+                yield notification
+            elif timeout is not None:
+                return
+
+    # ==========================================
+    # INTERNOS
+    # ==========================================
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._ensure_connection()
+                self._sync_channels()
+                self._poll(self.poll_interval)
+            except Exception as e:
+                # Inclui DatabaseConnectionError (falha ao reconectar) e erros do socket
+                self._handle_disconnect(e)
+
+    def _ensure_connection(self) -> None:
+        """Abre a conexão dedicada (autocommit) se necessário"""
+        if self._conn is not None and not self._conn.closed:
+            return
+
+        reconnecting = self._failures > 0 or self.reconnects > 0
+        self._conn = self._db.connect()
+        self._conn.autocommit = True
+        with self._lock:
+            self._listening = set()
+        self._failures = 0
+        if reconnecting:
+            self.reconnects += 1
+            logger.info("Listener de notificações reconectado")
+            if self.on_reconnect is not None:
+                try:
+                    self.on_reconnect()
+                except Exception as e:
+                    logger.error(f"Erro no on_reconnect do listener: {e}")
+
+    def _sync_channels(self) -> None:
+        """Aplica LISTEN/UNLISTEN para refletir as assinaturas atuais"""
+        with self._lock:
+            to_listen = self._channels - self._listening
+            to_unlisten = self._listening - self._channels
+        if not to_listen and not to_unlisten:
+            return
+
+        with self._conn.cursor() as cursor:
+            for channel in sorted(to_listen):
+                cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+            for channel in sorted(to_unlisten):
+                cursor.execute(sql.SQL("UNLISTEN {}").format(sql.Identifier(channel)))
+        with self._lock:
+            self._listening = (self._listening | to_listen) - to_unlisten
+
+    def _poll(self, timeout: float) -> None:
+        """Espera dados no socket e despacha as notificações recebidas"""
+        if not self._conn.notifies:
+            readable, _, _ = select.select([self._conn], [], [], timeout)
+            if not readable:
+                return
+            self._conn.poll()
+        while self._conn.notifies:
+            notify = self._conn.notifies.pop(0)
+            self._dispatch(Notification(notify.channel, notify.payload, notify.pid))
+
+    def _dispatch(self, notification: Notification) -> None:
+        with self._lock:
+            callbacks = list(self._callbacks.get(notification.channel, ()))
+        if not callbacks:
+            self._queue.put(notification)
+            return
+        for callback in callbacks:
+            try:
+                callback(notification)
+            except Exception as e:
+                logger.error(f"Erro no callback do canal '{notification.channel}': {e}")
+
+    def _handle_disconnect(self, error: BaseException) -> None:
+        self._close()
+        self._failures += 1
+        delay = min(self.max_reconnect_delay, self.reconnect_delay * 2 ** (self._failures - 1))
+        # Jitter evita que vários listeners reconectem ao mesmo tempo
+        delay *= random.uniform(0.5, 1.0)
+        logger.warning(
+            f"Listener de notificações desconectado ({error}); nova tentativa em {delay:.1f}s"
+        )
+        self._stop.wait(delay)
+
+    def _close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                if not conn.closed:
+                    conn.close()
+            except Exception:
+                pass
+
+
+# ==========================================
+# ENVIO E TRIGGERS
+# ==========================================
+
+def notify(
+    channel: str,
+    payload: Any = "",
+    connection_params: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Envia uma notificação (pg_notify). Dentro de transaction() ela só é
+    entregue no commit.
+
+    Args:
+        channel: Canal
+        payload: Texto ou objeto serializável em JSON (máximo ~8000 bytes)
+
+    Exemplo:
+        notify("dctf_download_unit_changes", {"id": 10, "status": "concluido"})
+    """
+    if not isinstance(payload, str):
+        payload = json.dumps(payload, default=str)
+    if len(payload.encode("utf-8")) > MAX_PAYLOAD_SIZE:
+        raise ValueError(f"payload do NOTIFY acima de {MAX_PAYLOAD_SIZE} bytes")
+    execute_query("SELECT pg_notify(%s, %s)", (channel, payload), connection_params)
+
+
+def default_channel(table: str) -> str:
+    """Canal padrão dos triggers de uma tabela ("schema.tabela" -> "tabela_changes")"""
+    return f"{table.split('.')[-1]}_changes"
+
+
+def _trigger_names(table: str):
+    name = table.split(".")[-1]
+    schema = table.split(".")[0] if "." in table else None
+    function = f"td_notify_{name}"
+    qualified_function = (
+        sql.SQL(".").join([sql.Identifier(schema), sql.Identifier(function)])
+        if schema
+        else sql.Identifier(function)
+    )
+    qualified_table = sql.SQL(".").join(sql.Identifier(part) for part in table.split("."))
+    return qualified_table, qualified_function, sql.Identifier(function)
+
+
+def install_notify_trigger(
+    table: str,
+    watch_columns: Sequence[str] = ("status",),
+    payload_columns: Sequence[str] = ("id", "status"),
+    channel: Optional[str] = None,
+    events: Sequence[str] = ("INSERT", "UPDATE"),
+    connection_params: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Cria (ou recria) um trigger que faz NOTIFY quando as colunas observadas mudam.
+
+    O payload é um JSON {"table", "op", "data": {colunas de payload_columns}};
+    mantenha payload_columns pequeno (limite de ~8000 bytes do NOTIFY).
+    UPDATEs que não alteram watch_columns não notificam.
+
+    Args:
+        table: Tabela (aceita "schema.tabela")
+        watch_columns: Colunas cuja mudança dispara a notificação em UPDATE
+        payload_columns: Colunas enviadas no payload
+        channel: Canal (padrão: "<tabela>_changes")
+        events: Subconjunto de INSERT, UPDATE, DELETE
+
+    Returns:
+        Nome do canal
+
+    Exemplo:
+        canal = install_notify_trigger("dctf_download_unit")
+        listener.subscribe(canal, on_status)
+    """
+    events = [event.upper() for event in events]
+    invalid = [event for event in events if event not in TRIGGER_EVENTS]
+    if invalid or not events:
+        raise ValueError(f"events deve conter valores de {TRIGGER_EVENTS}, recebido: {events!r}")
+    if not watch_columns or not payload_columns:
+        raise ValueError("watch_columns e payload_columns não podem ser vazios")
+
+    channel = channel or default_channel(table)
+    qualified_table, qualified_function, trigger = _trigger_names(table)
+
+    def row(prefix: str) -> sql.Composed:
+        return sql.SQL("ROW({})").format(
+            sql.SQL(", ").join(
+                sql.SQL("{}.{}").format(sql.SQL(prefix), sql.Identifier(column))
+                for column in watch_columns
+            )
+        )
+
+    payload = sql.SQL(", ").join(
+        sql.SQL("{}, rec.{}").format(sql.Literal(column), sql.Identifier(column))
+        for column in payload_columns
+    )
+    function_sql = sql.SQL(
+        """
+        CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $td_notify$
+        DECLARE
+            rec record;
+        BEGIN
+            IF TG_OP = 'UPDATE' AND {old_row} IS NOT DISTINCT FROM {new_row} THEN
+                RETURN NEW;
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                rec := OLD;
+            ELSE
+                rec := NEW;
+            END IF;
+            PERFORM pg_notify(
+                {channel},
+                json_build_object(
+                    'table', TG_TABLE_NAME,
+                    'op', TG_OP,
+                    'data', json_build_object({payload})
+                )::text
+            );
+            RETURN rec;
+        END;
+        $td_notify$ LANGUAGE plpgsql
+        """
+    ).format(
+        function=qualified_function,
+        old_row=row("OLD"),
+        new_row=row("NEW"),
+        channel=sql.Literal(channel),
+        payload=payload,
+    )
+    drop_sql = sql.SQL("DROP TRIGGER IF EXISTS {trigger} ON {table}").format(
+        trigger=trigger, table=qualified_table
+    )
+    trigger_sql = sql.SQL(
+        "CREATE TRIGGER {trigger} AFTER {events} ON {table} "
+        "FOR EACH ROW EXECUTE FUNCTION {function}()"
+    ).format(
+        trigger=trigger,
+        events=sql.SQL(" OR ").join(sql.SQL(event) for event in events),
+        table=qualified_table,
+        function=qualified_function,
+    )
+
+    with get_connection(**(connection_params or {})) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(function_sql)
+            cursor.execute(drop_sql)
+            cursor.execute(trigger_sql)
+    logger.info(f"Trigger de NOTIFY instalado em {table} (canal '{channel}')")
+    return channel
+
+
+def remove_notify_trigger(table: str, connection_params: Optional[Dict[str, Any]] = None) -> None:
+    """Remove o trigger e a função criados por install_notify_trigger"""
+    qualified_table, qualified_function, trigger = _trigger_names(table)
+    with get_connection(**(connection_params or {})) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                sql.SQL("DROP TRIGGER IF EXISTS {} ON {}").format(trigger, qualified_table)
+            )
+            cursor.execute(sql.SQL("DROP FUNCTION IF EXISTS {}()").format(qualified_function))
@@ -0,0 +1,75 @@
+"""
+Tokens de cursor para paginação por chave (keyset / seek)
+
+O token guarda os nomes das colunas de ordenação e os valores da última
+linha da página, em JSON base64 (url-safe). Datas, horas, Decimal e UUID
+são serializados como texto e convertidos de volta pelo tipo da coluna.
+"""
+import base64
+import binascii
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, List, Sequence
+from ..core.exceptions import ValidationError
+
+
+_ISO_TYPES = (datetime, date, time)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, _ISO_TYPES):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def _decode_value(column: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type in _ISO_TYPES:
+        return python_type.fromisoformat(value)
+    if python_type in (Decimal, uuid.UUID):
+        return python_type(value)
+    return value
+
+
+def encode_cursor(keys: Sequence[str], values: Sequence[Any]) -> str:
+    """
+    Gera o token da posição após a linha com os valores informados.
+
+    Exemplo:
+        encode_cursor(["id"], [120])  # "eyJrIjogWyJpZCJdLCAidiI6IFsxMjBdfQ=="
+    """
+    payload = json.dumps({"k": list(keys), "v": [_encode_value(value) for value in values]})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(token: str, keys: Sequence[str], columns: Sequence[Any]) -> List[Any]:
+    """
+    Lê os valores de um token gerado por encode_cursor para a mesma ordenação.
+
+    Raises:
+        ValidationError: Se o token for inválido ou de outra ordenação
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        token_keys, values = payload["k"], payload["v"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise ValidationError("Cursor de paginação inválido", field="cursor") from e
+
+    if token_keys != list(keys) or len(values) != len(columns):
+        raise ValidationError(
+            f"Cursor de paginação gerado para outra ordenação ({token_keys}, esperado {list(keys)})",
+            field="cursor",
+        )
+    try:
+        return [_decode_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError) as e:
+        raise ValidationError("Cursor de paginação inválido", field="cursor") from e
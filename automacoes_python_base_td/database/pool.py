@@ -0,0 +1,350 @@
+"""
+Pool de conexões psycopg2 compartilhado pelo processo
+"""
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+from ..settings import settings
+
+
+# Conexões que pertencem a algum pool (usado para habilitar recursos por conexão)
+_pooled_connections: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def is_pooled(conn) -> bool:
+    """Verifica se a conexão pertence a um ConnectionPool"""
+    return conn in _pooled_connections
+
+
+class ConnectionPool:
+    """
+    Pool de conexões PostgreSQL thread-safe.
+
+    Mantém conexões abertas entre chamadas para evitar o handshake TCP + autenticação
+    a cada query. Conexões que ultrapassam o tempo de vida máximo ou ficam ociosas
+    por muito tempo são descartadas, e conexões reaproveitadas são validadas ao sair do pool.
+
+    Após um fork, o processo filho recomeça com o pool vazio e nunca reaproveita
+    (nem fecha) as conexões herdadas do processo pai.
+
+    Exemplo:
+        pool = ConnectionPool(lambda: psycopg2.connect(dsn), max_size=5)
+        conn = pool.getconn()
+        try:
+            ...
+        finally:
+            pool.putconn(conn)
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        max_lifetime: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        timeout: Optional[float] = None,
+        ping_interval: Optional[float] = None,
+    ):
+        """
+        Inicializa o pool. Se não fornecidos, usa valores do settings global.
+
+        Args:
+            connect: Função que abre uma nova conexão psycopg2
+            min_size: Conexões ociosas mantidas abertas mesmo após o idle_timeout
+            max_size: Número máximo de conexões abertas (em uso + ociosas)
+            max_lifetime: Tempo de vida máximo de uma conexão (segundos)
+            idle_timeout: Tempo máximo que uma conexão pode ficar ociosa (segundos)
+            timeout: Tempo máximo de espera por uma conexão livre (segundos)
+            ping_interval: Ociosidade a partir da qual a conexão é validada com SELECT 1
+                           antes de ser entregue (0 = valida sempre)
+        """
+        self._connect = connect
+        self.min_size = settings.db_pool_min_size if min_size is None else min_size
+        self.max_size = settings.db_pool_max_size if max_size is None else max_size
+        self.max_lifetime = settings.db_pool_max_lifetime if max_lifetime is None else max_lifetime
+        self.idle_timeout = settings.db_pool_idle_timeout if idle_timeout is None else idle_timeout
+        self.timeout = settings.db_pool_timeout if timeout is None else timeout
+        self.ping_interval = settings.db_pool_ping_interval if ping_interval is None else ping_interval
+
+        self._cond = threading.Condition()
+        self._idle: List[Any] = []
+        self._in_use: Dict[int, Any] = {}
+        self._created_at: Dict[int, float] = {}
+        self._last_used: Dict[int, float] = {}
+        self._opening = 0
+        self._closed = False
+        self._pid = os.getpid()
+        # Conexões herdadas do processo pai (mantidas vivas para não fechar os sockets dele)
+        self._inherited: List[Any] = []
+
+    @property
+    def size(self) -> int:
+        """Número de conexões abertas (em uso + ociosas + sendo abertas)"""
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def getconn(self):
+        """
+        Retira uma conexão do pool, abrindo uma nova se necessário.
+
+        Raises:
+            PoolError: Se o pool estiver fechado ou esgotado após o timeout
+            psycopg2.Error: Se a abertura de uma nova conexão falhar
+        """
+        self._check_fork()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn = self._acquire(deadline)
+            if conn is None:
+                return self._open()
+            if self._is_usable(conn):
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        """
+        Devolve uma conexão ao pool.
+
+        Transações abertas são desfeitas. Conexões fechadas, quebradas ou
+        expiradas são descartadas.
+
+        Args:
+            conn: Conexão retirada com getconn()
+            discard: Se True, fecha a conexão em vez de devolvê-la
+        """
+        self._check_fork()
+        if any(conn is inherited for inherited in self._inherited):
+            return
+        if discard or self._closed or conn.closed or self._expired(conn):
+            self._discard(conn)
+            return
+
+        status = conn.get_transaction_status()
+        if status in (extensions.TRANSACTION_STATUS_ACTIVE, extensions.TRANSACTION_STATUS_UNKNOWN):
+            self._discard(conn)
+            return
+        if status in (extensions.TRANSACTION_STATUS_INTRANS, extensions.TRANSACTION_STATUS_INERROR):
+            try:
+                conn.rollback()
+            except Exception:
+                self._discard(conn)
+                return
+
+        with self._cond:
+            self._in_use.pop(id(conn), None)
+            self._last_used[id(conn)] = time.monotonic()
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Fecha todas as conexões ociosas; conexões em uso são fechadas ao serem devolvidas"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            for conn in idle:
+                self._forget(conn)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna um retrato do uso do pool"""
+        with self._cond:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "max_size": self.max_size,
+            }
+
+    # ==========================================
+    # INTERNOS
+    # ==========================================
+
+    def _check_fork(self) -> None:
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+
+    def _reset_after_fork(self) -> None:
+        """
+        No processo filho, abandona as conexões herdadas e recomeça vazio.
+
+        As conexões não são fechadas: close() enviaria Terminate pelo socket
+        que o processo pai continua usando. O lock também é recriado, pois
+        pode ter sido herdado adquirido por outra thread do pai.
+        """
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._inherited.extend(self._idle)
+        self._inherited.extend(self._in_use.values())
+        for conn in self._inherited:
+            _pooled_connections.discard(conn)
+        self._cond = threading.Condition()
+        self._idle = []
+        self._in_use = {}
+        self._created_at = {}
+        self._last_used = {}
+        self._opening = 0
+
+    def _acquire(self, deadline: float):
+        """Retorna uma conexão ociosa, ou None quando há vaga para abrir uma nova"""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("Pool de conexões fechado")
+
+                self._prune_idle()
+                if self._idle:
+                    # LIFO: reaproveita a mais recente e deixa as demais expirarem
+                    conn = self._idle.pop()
+                    self._in_use[id(conn)] = conn
+                    return conn
+
+                if self.size < self.max_size:
+                    self._opening += 1
+                    return None
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(
+                        f"Pool de conexões esgotado (max_size={self.max_size}, timeout={self.timeout}s)"
+                    )
+                self._cond.wait(remaining)
+
+    def _open(self):
+        """Abre uma nova conexão fora do lock"""
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+
+        now = time.monotonic()
+        with self._cond:
+            self._opening -= 1
+            self._in_use[id(conn)] = conn
+            self._created_at[id(conn)] = now
+            self._last_used[id(conn)] = now
+        _pooled_connections.add(conn)
+        return conn
+
+    def _is_usable(self, conn) -> bool:
+        """Health check de uma conexão reaproveitada"""
+        if conn.closed or self._expired(conn):
+            return False
+
+        idle_for = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if idle_for < self.ping_interval:
+            return True
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _expired(self, conn) -> bool:
+        created_at = self._created_at.get(id(conn))
+        if created_at is None or self.max_lifetime <= 0:
+            return False
+        return time.monotonic() - created_at > self.max_lifetime
+
+    def _prune_idle(self) -> None:
+        """Fecha conexões ociosas há mais de idle_timeout (chamado com o lock adquirido)"""
+        if self.idle_timeout <= 0:
+            return
+
+        now = time.monotonic()
+        removable = self.size - self.min_size
+        keep = []
+        # Percorre da mais antiga para a mais recente (putconn faz append)
+        for conn in self._idle:
+            too_idle = now - self._last_used.get(id(conn), now) > self.idle_timeout
+            if too_idle and removable > 0:
+                self._forget(conn)
+                self._close_quietly(conn)
+                removable -= 1
+            else:
+                keep.append(conn)
+        self._idle = keep
+
+    def _discard(self, conn) -> None:
+        with self._cond:
+            self._forget(conn)
+            self._cond.notify()
+        self._close_quietly(conn)
+
+    def _forget(self, conn) -> None:
+        _pooled_connections.discard(conn)
+        self._in_use.pop(id(conn), None)
+        self._created_at.pop(id(conn), None)
+        self._last_used.pop(id(conn), None)
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+
+
+# ==========================================
+# REGISTRO GLOBAL DE POOLS (por destino)
+# ==========================================
+
+PoolKey = Tuple[Any, ...]
+
+_pools: Dict[PoolKey, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key: PoolKey, connect: Callable[[], Any]) -> ConnectionPool:
+    """
+    Retorna ou cria o pool do processo para um destino de conexão.
+
+    Args:
+        key: Identificação do destino (host, port, database, user, ...)
+        connect: Função usada para abrir novas conexões
+
+    Returns:
+        ConnectionPool compartilhado
+    """
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(connect)
+        return _pools[key]
+
+
+def _reset_pools_after_fork() -> None:
+    """Executado no processo filho logo após o fork"""
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    for pool in list(_pools.values()):
+        pool._reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+def close_all_pools() -> None:
+    """Fecha todos os pools do processo (ex: no shutdown da aplicação)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,244 @@
+"""
+Métricas do pool das engines SQLAlchemy: conexões em uso, overflow, espera
+no checkout, idade das conexões e invalidações
+"""
+import threading
+import time
+from typing import Any, Dict
+from loguru import logger
+from sqlalchemy import event, exc
+from sqlalchemy.pool import NullPool, Pool, QueuePool
+from ..settings import settings
+from .metrics import QueryHistogram
+
+
+_WAIT_KEY = "checkout"
+
+
+class PoolMetrics:
+    """
+    Contadores e histograma de espera de um pool (thread-safe).
+
+    Exemplo:
+        metrics = manager.engine.pool.metrics
+        metrics.snapshot(manager.engine.pool)["wait_p95_ms"]
+    """
+
+    COUNTERS = ("checkouts", "checkins", "connects", "invalidations", "soft_invalidations", "timeouts")
+
+    def __init__(self, name: str = "engine"):
+        self.name = name
+        self.reset()
+
+    def reset(self) -> None:
+        """Zera os contadores (também usado no processo filho após fork)"""
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.COUNTERS, 0)
+        self._waits = QueryHistogram(max_fingerprints=1)
+        # id(conexão DBAPI) -> momento da abertura (para a idade das conexões vivas)
+        self._connected_at: Dict[int, float] = {}
+        self._last_log = time.monotonic()
+
+    def count(self, counter: str) -> None:
+        with self._lock:
+            self._counts[counter] += 1
+
+    def connection_opened(self, dbapi_connection: Any) -> None:
+        with self._lock:
+            self._counts["connects"] += 1
+            self._connected_at[id(dbapi_connection)] = time.monotonic()
+
+    def connection_closed(self, dbapi_connection: Any) -> None:
+        with self._lock:
+            self._connected_at.pop(id(dbapi_connection), None)
+
+    def record_wait(self, pool: Pool, seconds: float, timed_out: bool = False) -> None:
+        """
+        Registra o tempo de um checkout; loga aviso acima de
+        settings.db_engine_pool_wait_warning e, a cada
+        settings.db_engine_pool_log_interval segundos, uma linha de status.
+        """
+        self._waits.record(_WAIT_KEY, seconds, error=timed_out)
+        if timed_out:
+            self.count("timeouts")
+
+        threshold = settings.db_engine_pool_wait_warning
+        if threshold is not None and seconds >= threshold:
+            logger.warning(
+                f"Pool {self.name}: checkout esperou {seconds * 1000:.0f} ms"
+                f"{' (timeout)' if timed_out else ''} - {self._status(pool)}"
+            )
+
+        interval = settings.db_engine_pool_log_interval
+        if interval:
+            now = time.monotonic()
+            with self._lock:
+                due = now - self._last_log >= interval
+                if due:
+                    self._last_log = now
+            if due:
+                self.log(pool)
+
+    def snapshot(self, pool: Pool) -> Dict[str, Any]:
+        """
+        Retorna o estado do pool e os contadores acumulados.
+
+        Returns:
+            Dict com size, checked_out, checked_in, overflow, max_overflow,
+            checkouts, checkins, connects, invalidations, soft_invalidations,
+            timeouts, wait_avg_ms, wait_p95_ms, wait_p99_ms, wait_max_ms,
+            connection_age_avg_s e connection_age_max_s
+        """
+        now = time.monotonic()
+        with self._lock:
+            counts = dict(self._counts)
+            ages = [now - opened for opened in self._connected_at.values()]
+        waits = self._waits.snapshot().get(_WAIT_KEY, {})
+
+        return {
+            "name": self.name,
+            **self._pool_state(pool),
+            **counts,
+            "wait_avg_ms": waits.get("avg_ms", 0.0),
+            "wait_p95_ms": waits.get("p95_ms", 0.0),
+            "wait_p99_ms": waits.get("p99_ms", 0.0),
+            "wait_max_ms": waits.get("max_ms", 0.0),
+            "connection_age_avg_s": round(sum(ages) / len(ages), 3) if ages else 0.0,
+            "connection_age_max_s": round(max(ages), 3) if ages else 0.0,
+        }
+
+    def log(self, pool: Pool) -> None:
+        """Loga uma linha com o estado do pool"""
+        stats = self.snapshot(pool)
+        logger.info(
+            f"Pool {self.name}: {self._status(pool)}, checkouts {stats['checkouts']}, "
+            f"espera p95 {stats['wait_p95_ms']} ms (máx {stats['wait_max_ms']} ms), "
+            f"timeouts {stats['timeouts']}, invalidações {stats['invalidations']}, "
+            f"idade máx {stats['connection_age_max_s']:.0f}s"
+        )
+
+    def _pool_state(self, pool: Pool) -> Dict[str, int]:
+        """Tamanho e ocupação do pool; no NullPool as conexões abertas são as em uso"""
+        if isinstance(pool, QueuePool):
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            }
+        with self._lock:
+            open_connections = len(self._connected_at)
+        return {"size": 0, "checked_out": open_connections, "checked_in": 0, "overflow": 0, "max_overflow": 0}
+
+    def _status(self, pool: Pool) -> str:
+        state = self._pool_state(pool)
+        if not isinstance(pool, QueuePool):
+            return f"em uso {state['checked_out']} (sem pool)"
+        limit = state["size"] + max(state["max_overflow"], 0)
+        return f"em uso {state['checked_out']}/{limit}, overflow {state['overflow']}"
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool que mede o tempo de checkout e registra eventos do pool em
+    PoolMetrics (atributo metrics).
+
+    O tempo de checkout inclui a espera por uma conexão livre, a abertura de
+    conexões novas e o pre-ping. As métricas são mantidas quando o pool é
+    recriado (engine.dispose()).
+
+    Exemplo:
+        engine = create_engine(url, poolclass=InstrumentedQueuePool, pool_size=5)
+        engine.pool.stats()["checked_out"]
+    """
+
+    def __init__(self, creator, *args, **kwargs):
+        super().__init__(creator, *args, **kwargs)
+        self.metrics = PoolMetrics()
+        # Em recreate() os listeners são copiados do pool anterior via _dispatch
+        if not kwargs.get("_dispatch"):
+            _listen(self, self.metrics)
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_wait(self, time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record_wait(self, time.perf_counter() - started)
+        return connection
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna o snapshot das métricas deste pool"""
+        return self.metrics.snapshot(self)
+
+
+class InstrumentedNullPool(NullPool):
+    """
+    NullPool (uma conexão nova por checkout, fechada no checkin) com as mesmas
+    métricas do InstrumentedQueuePool. Usado com settings.db_pooler_mode =
+    "transaction", quando o pool fica a cargo do PgBouncer.
+
+    Exemplo:
+        engine = create_engine(url, poolclass=InstrumentedNullPool)
+        engine.pool.stats()["checked_out"]
+    """
+
+    def __init__(self, creator, *args, **kwargs):
+        super().__init__(creator, *args, **kwargs)
+        self.metrics = PoolMetrics()
+        if not kwargs.get("_dispatch"):
+            _listen(self, self.metrics)
+
+    def connect(self):
+        started = time.perf_counter()
+        connection = super().connect()
+        self.metrics.record_wait(self, time.perf_counter() - started)
+        return connection
+
+    def recreate(self) -> "InstrumentedNullPool":
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna o snapshot das métricas deste pool"""
+        return self.metrics.snapshot(self)
+
+
+def _listen(pool: Pool, metrics: PoolMetrics) -> None:
+    """Registra os listeners de eventos do pool (copiados para os pools recriados)"""
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.connection_opened(dbapi_connection)
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.count("checkouts")
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.count("checkins")
+
+    @event.listens_for(pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.count("invalidations")
+
+    @event.listens_for(pool, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        metrics.count("soft_invalidations")
+
+    @event.listens_for(pool, "close")
+    def on_close(dbapi_connection, connection_record):
+        metrics.connection_closed(dbapi_connection)
+
+    @event.listens_for(pool, "close_detached")
+    def on_close_detached(dbapi_connection):
+        metrics.connection_closed(dbapi_connection)
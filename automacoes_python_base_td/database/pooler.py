@@ -0,0 +1,99 @@
+"""
+Configuração de pool das engines SQLAlchemy a partir de settings e modo de
+compatibilidade com PgBouncer (pool_mode=transaction)
+
+Com settings.db_pooler_mode = "transaction" cada transação pode cair em uma
+conexão diferente do servidor: o pool local é desligado (NullPool, a
+conexão com o PgBouncer é aberta no checkout e fechada no checkin; no pool
+assíncrono de database.aio, nenhuma conexão ociosa é mantida) e nada que
+dependa do estado da sessão no servidor é usado (prepared statements).
+"""
+from typing import Any, Dict, Optional
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+from ..settings import settings
+from .pool_metrics import InstrumentedNullPool, InstrumentedQueuePool
+
+
+def transaction_pooler() -> bool:
+    """True quando as conexões passam por um PgBouncer em modo transaction"""
+    return settings.db_pooler_mode == "transaction"
+
+
+def engine_pool_options(
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    instrumented: bool = True,
+) -> Dict[str, Any]:
+    """
+    Argumentos de pool para create_engine/create_async_engine.
+
+    Args:
+        pool_size: Conexões mantidas no pool (padrão settings.db_engine_pool_size)
+        max_overflow: Conexões extras (padrão settings.db_engine_max_overflow)
+        instrumented: Se True, usa os pools com métricas (engines síncronas)
+
+    Exemplo:
+        engine = create_engine(url, **engine_pool_options())
+    """
+    if transaction_pooler():
+        # Conexão nova a cada checkout: pre-ping seria sempre desperdício
+        return {"poolclass": InstrumentedNullPool if instrumented else NullPool, "pool_pre_ping": False}
+
+    options: Dict[str, Any] = {
+        "pool_size": settings.db_engine_pool_size if pool_size is None else pool_size,
+        "max_overflow": settings.db_engine_max_overflow if max_overflow is None else max_overflow,
+        "pool_timeout": settings.db_engine_pool_timeout,
+        "pool_recycle": -1 if settings.db_engine_pool_recycle is None else settings.db_engine_pool_recycle,
+        "pool_pre_ping": settings.db_engine_pool_pre_ping,
+        "pool_use_lifo": settings.db_engine_pool_use_lifo,
+    }
+    if instrumented:
+        options["poolclass"] = InstrumentedQueuePool
+    return options
+
+
+# Ociosidade máxima das conexões do pool assíncrono no modo transaction (segundos)
+TRANSACTION_POOLER_MAX_IDLE = 10.0
+
+
+def async_pool_options() -> Dict[str, Any]:
+    """
+    Argumentos de tamanho e tempo do AsyncConnectionPool (database.aio), de
+    settings.db_pool_*. No modo transaction o pool não mantém conexões
+    ociosas: o PgBouncer já faz o pooling.
+
+    Exemplo:
+        pool = AsyncConnectionPool(kwargs=..., **async_pool_options())
+    """
+    options: Dict[str, Any] = {
+        "min_size": settings.db_pool_min_size,
+        "max_size": settings.db_pool_max_size,
+        "timeout": settings.db_pool_timeout,
+        "max_lifetime": settings.db_pool_max_lifetime,
+        "max_idle": settings.db_pool_idle_timeout,
+    }
+    if transaction_pooler():
+        options.update(min_size=0, max_idle=min(settings.db_pool_idle_timeout, TRANSACTION_POOLER_MAX_IDLE))
+    return options
+
+
+def psycopg_connect_args() -> Dict[str, Any]:
+    """
+    Parâmetros extras de conexão do psycopg 3 para o modo transaction: ele
+    prepara statements no servidor após algumas execuções (prepare_threshold),
+    o que falha quando a conexão do servidor muda entre transações.
+    """
+    if transaction_pooler():
+        return {"prepare_threshold": None}
+    return {}
+
+
+def pooler_connect_args(database_url: str) -> Dict[str, Any]:
+    """
+    connect_args extras para o modo transaction (ver psycopg_connect_args).
+    O psycopg2 não prepara statements por conta própria.
+    """
+    if make_url(database_url).get_driver_name() == "psycopg":
+        return psycopg_connect_args()
+    return {}
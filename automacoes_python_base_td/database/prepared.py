@@ -0,0 +1,270 @@
+"""
+Cache de prepared statements por conexão (PREPARE / EXECUTE)
+"""
+import hashlib
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+import psycopg2
+from psycopg2 import errors, extensions
+from ..settings import settings
+
+
+_PLACEHOLDER = re.compile(r"%(%|s)")
+_NAMED_PLACEHOLDER = re.compile(r"%\(")
+
+# Parâmetros que o psycopg2 adapta para SQL composto ((1, 2), ARRAY[...], ...):
+# como $n no PREPARE viram um único valor e a query deixa de ser válida
+_COMPOSITE_PARAMS = (tuple, list, dict, set, frozenset)
+
+# Erros do PREPARE em queries válidas sem ele (ex: "IN $1", tipo indeterminado).
+# Outros erros (tabela ou coluna inexistente, permissão...) sobem para quem chamou
+_UNPREPARABLE_ERRORS = (
+    errors.SyntaxError,
+    errors.IndeterminateDatatype,
+    errors.AmbiguousParameter,
+    errors.DatatypeMismatch,
+)
+
+
+def to_prepared_sql(query: str) -> Tuple[str, int]:
+    """
+    Converte os placeholders %s do psycopg2 em $1, $2, ... do PREPARE.
+
+    Args:
+        query: Query com placeholders posicionais (%s) e %% para % literal
+
+    Returns:
+        Tuple[query convertida, número de parâmetros]
+
+    Exemplo:
+        to_prepared_sql("SELECT * FROM empresas WHERE cnpj = %s AND ativo = %s")
+        # ("SELECT * FROM empresas WHERE cnpj = $1 AND ativo = $2", 2)
+    """
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        if match.group(1) == "%":
+            return "%"
+        count += 1
+        return f"${count}"
+
+    return _PLACEHOLDER.sub(replace, query), count
+
+
+class StatementCache:
+    """
+    LRU de statements preparados em uma conexão.
+
+    Mapeia o hash do SQL para o nome do statement no servidor. Ao ultrapassar
+    max_size, o statement menos usado é removido e deve receber DEALLOCATE.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._statements: "OrderedDict[str, str]" = OrderedDict()
+        # Statements esquecidos que ainda precisam de DEALLOCATE no servidor
+        self._pending_deallocate: List[str] = []
+        # Queries que o servidor recusou no PREPARE: executadas sempre sem PREPARE
+        self._unpreparable: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def get(self, key: str) -> Optional[str]:
+        name = self._statements.get(key)
+        if name is not None:
+            self._statements.move_to_end(key)
+        return name
+
+    def put(self, key: str, name: str) -> Optional[str]:
+        """Adiciona o statement e retorna o nome do statement removido (se houver)"""
+        self._statements[key] = name
+        self._statements.move_to_end(key)
+        if len(self._statements) > self.max_size:
+            _, evicted = self._statements.popitem(last=False)
+            return evicted
+        return None
+
+    def discard(self, key: str) -> None:
+        self._statements.pop(key, None)
+
+    def invalidate(self, key: str) -> None:
+        """Esquece o statement e agenda o DEALLOCATE (feito fora de transação abortada)"""
+        name = self._statements.pop(key, None)
+        if name is not None:
+            self._pending_deallocate.append(name)
+
+    def mark_unpreparable(self, key: str) -> None:
+        self._unpreparable.add(key)
+
+    def is_unpreparable(self, key: str) -> bool:
+        return key in self._unpreparable
+
+    def take_pending(self) -> List[str]:
+        pending, self._pending_deallocate = self._pending_deallocate, []
+        return pending
+
+
+# ==========================================
+# ESTATÍSTICAS GLOBAIS
+# ==========================================
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "errors": 0}
+
+# Um cache por conexão; some junto com a conexão
+_caches: "weakref.WeakKeyDictionary[Any, StatementCache]" = weakref.WeakKeyDictionary()
+
+
+def _count(stat: str) -> None:
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def get_prepared_statement_stats() -> Dict[str, Any]:
+    """
+    Retorna estatísticas do cache de prepared statements do processo.
+
+    Returns:
+        Dict com hits, misses, evictions, errors e hit_ratio
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def reset_prepared_statement_stats() -> None:
+    """Zera as estatísticas do cache de prepared statements"""
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def _cache_for(conn) -> StatementCache:
+    cache = _caches.get(conn)
+    if cache is None:
+        cache = StatementCache(settings.db_prepared_cache_size)
+        _caches[conn] = cache
+    return cache
+
+
+def _execute_tolerant(cursor, statement: str, tolerated: type) -> bool:
+    """
+    Executa PREPARE/DEALLOCATE ignorando o erro tolerated. Fora de autocommit
+    o statement roda em um SAVEPOINT, para que o erro não aborte a transação
+    de quem chamou. Retorna False se o erro foi ignorado.
+    """
+    autocommit = cursor.connection.autocommit
+    # Comandos separados: um erro de sintaxe no statement rejeitaria a string
+    # inteira antes de o SAVEPOINT existir
+    if not autocommit:
+        cursor.execute("SAVEPOINT td_prepared")
+    try:
+        cursor.execute(statement)
+    except tolerated:
+        if not autocommit:
+            cursor.execute("ROLLBACK TO SAVEPOINT td_prepared; RELEASE SAVEPOINT td_prepared")
+        return False
+    if not autocommit:
+        cursor.execute("RELEASE SAVEPOINT td_prepared")
+    return True
+
+
+def _deallocate_pending(cursor, cache: StatementCache) -> None:
+    """DEALLOCATE dos statements invalidados, assim que a transação não estiver abortada"""
+    if cursor.connection.get_transaction_status() == extensions.TRANSACTION_STATUS_INERROR:
+        return
+    for name in cache.take_pending():
+        _execute_tolerant(cursor, f"DEALLOCATE {name}", errors.InvalidSqlStatementName)
+
+
+def execute_prepared(cursor, query: str, params: Optional[Sequence[Any]] = None) -> None:
+    """
+    Executa a query via EXECUTE, fazendo PREPARE na primeira vez nesta conexão.
+
+    Queries com parâmetros nomeados (%(nome)s) ou dict, com parâmetros compostos
+    (tuple, list...) ou que o servidor recusa no PREPARE (lembradas por conexão)
+    são executadas normalmente.
+
+    PREPARE não é transacional: o statement continua no servidor após um
+    rollback. Por isso um erro no EXECUTE só tira o statement do cache quando
+    ele não existe mais no servidor, ou quando o plano ficou inválido (neste
+    caso com DEALLOCATE na próxima chamada, já fora da transação abortada), e
+    um PREPARE de statement já existente é tratado como já preparado.
+
+    Args:
+        cursor: Cursor psycopg2
+        query: Query com placeholders posicionais (%s)
+        params: Parâmetros posicionais
+    """
+    if isinstance(params, dict) or _NAMED_PLACEHOLDER.search(query):
+        cursor.execute(query, params)
+        return
+
+    params = tuple(params or ())
+    if any(isinstance(param, _COMPOSITE_PARAMS) for param in params):
+        cursor.execute(query, params)
+        return
+
+    key = hashlib.sha1(query.encode("utf-8")).hexdigest()
+    cache = _cache_for(cursor.connection)
+    if cache.is_unpreparable(key):
+        cursor.execute(query, params or None)
+        return
+
+    _deallocate_pending(cursor, cache)
+    name = cache.get(key)
+
+    if name is None:
+        prepared_sql, param_count = to_prepared_sql(query)
+        if param_count != len(params):
+            cursor.execute(query, params or None)
+            return
+
+        _count("misses")
+        name = f"td_{key[:20]}"
+        try:
+            # O nome vem do hash do SQL: se já existe no servidor, é o mesmo statement
+            _execute_tolerant(cursor, f"PREPARE {name} AS {prepared_sql}", errors.DuplicatePreparedStatement)
+        except _UNPREPARABLE_ERRORS:
+            if not cursor.connection.autocommit:
+                cursor.execute("ROLLBACK TO SAVEPOINT td_prepared; RELEASE SAVEPOINT td_prepared")
+            cache.mark_unpreparable(key)
+            cursor.execute(query, params or None)
+            return
+        except psycopg2.Error:
+            _count("errors")
+            raise
+        evicted = cache.put(key, name)
+        if evicted is not None:
+            _count("evictions")
+            _execute_tolerant(cursor, f"DEALLOCATE {evicted}", errors.InvalidSqlStatementName)
+    else:
+        _count("hits")
+
+    try:
+        if params:
+            placeholders = ", ".join(["%s"] * len(params))
+            cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+    except errors.InvalidSqlStatementName:
+        # Statement sumiu do servidor (ex: DISCARD ALL): prepara de novo na próxima chamada
+        cache.discard(key)
+        _count("errors")
+        raise
+    except errors.FeatureNotSupported:
+        # Plano inválido após mudança de schema ("cached plan must not change result type")
+        cache.invalidate(key)
+        _count("errors")
+        raise
+    except psycopg2.Error:
+        # Erro da query (dados, constraint...): o statement continua válido no servidor
+        _count("errors")
+        raise
@@ -0,0 +1,102 @@
+"""
+Roteamento de leituras para réplica (read replica) com fallback para o primário
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from loguru import logger
+from ..settings import settings
+
+
+# Atraso de replicação em segundos (0 quando a réplica está em dia ou é um primário)
+REPLICATION_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+def replica_configured() -> bool:
+    """Verifica se há uma réplica de leitura configurada (DB_READ_HOST)"""
+    return bool(settings.db_read_host)
+
+
+def replica_connection_params() -> Dict[str, Any]:
+    """Parâmetros de conexão da réplica (mesmo banco/usuário do primário)"""
+    return {
+        "host": settings.db_read_host,
+        "port": settings.db_read_port or settings.db_port,
+    }
+
+
+class ReplicaRouter:
+    """
+    Decide se leituras podem ir para a réplica.
+
+    A réplica é considerada indisponível quando a conexão falha ou quando o
+    atraso de replicação passa de settings.db_read_max_lag. O resultado da
+    verificação fica válido por settings.db_read_check_interval segundos, para
+    não consultar o atraso a cada leitura.
+
+    Exemplo:
+        router = ReplicaRouter(check_lag=lambda: consulta_atraso_na_replica())
+        if router.is_available():
+            ...  # lê da réplica
+        else:
+            ...  # lê do primário
+    """
+
+    def __init__(self, check_lag: Callable[[], float], name: str = "replica"):
+        """
+        Args:
+            check_lag: Função que retorna o atraso da réplica em segundos
+                       (deve lançar exceção se a réplica estiver inacessível)
+            name: Nome usado nos logs
+        """
+        self._check_lag = check_lag
+        self.name = name
+        self._lock = threading.Lock()
+        self._available = True
+        self._checked_at: Optional[float] = None
+
+    def is_available(self) -> bool:
+        """Retorna se a réplica pode receber leituras agora"""
+        now = time.monotonic()
+        with self._lock:
+            fresh = (
+                self._checked_at is not None
+                and now - self._checked_at < settings.db_read_check_interval
+            )
+            if fresh:
+                return self._available
+            # Evita que várias threads verifiquem ao mesmo tempo
+            self._checked_at = now
+
+        available = self._verify()
+        with self._lock:
+            self._available = available
+        return available
+
+    def mark_down(self, error: Optional[BaseException] = None) -> None:
+        """Marca a réplica como indisponível até a próxima verificação"""
+        with self._lock:
+            self._available = False
+            self._checked_at = time.monotonic()
+        logger.warning(f"Réplica '{self.name}' indisponível, usando o primário: {error}")
+
+    def _verify(self) -> bool:
+        max_lag = settings.db_read_max_lag
+        try:
+            lag = float(self._check_lag()) if max_lag is not None else 0.0
+        except Exception as e:
+            logger.warning(f"Falha ao verificar a réplica '{self.name}', usando o primário: {e}")
+            return False
+
+        if max_lag is not None and lag > max_lag:
+            logger.warning(
+                f"Réplica '{self.name}' com atraso de {lag:.1f}s (máximo {max_lag}s), usando o primário"
+            )
+            return False
+        return True
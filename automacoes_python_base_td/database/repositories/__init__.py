@@ -2,6 +2,7 @@
 Repositories refatorados usando CRUD genérico e session adequada
 """
 from .crud import CRUDBase, crud_factory
+from .async_crud import AsyncCRUDBase, async_crud_factory
 
 # Repositories refatorados
 from .certificate_repository import (
@@ -68,6 +69,8 @@ __all__ = [
     # CRUD Genérico
     'CRUDBase',
     'crud_factory',
+    'AsyncCRUDBase',
+    'async_crud_factory',
 
     # Certificate Repository (refatorado)
     'get_certificate',
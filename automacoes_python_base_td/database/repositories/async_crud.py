@@ -0,0 +1,290 @@
+"""
+CRUD genérico assíncrono para qualquer model SQLAlchemy (AsyncSession)
+"""
+from typing import TYPE_CHECKING, Any, Dict, Generic, List, Optional, Sequence, Type
+from sqlalchemy import func, insert, select, true
+from sqlalchemy.exc import SQLAlchemyError
+from .crud import ModelType, _upsert_statements
+from ...core.exceptions import DatabaseQueryError, ModelNotFoundError
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class AsyncCRUDBase(Generic[ModelType]):
+    """
+    Versão assíncrona do CRUDBase, para uso com AsyncSession
+    (get_async_session / AsyncDatabaseSessionManager).
+
+    Mesma semântica do CRUDBase: leituras retornam só registros ativos por
+    padrão e escritas fazem commit.
+
+    Exemplo:
+        empresa_crud = AsyncCRUDBase(Empresas)
+
+        async with get_async_session("tdax") as session:
+            empresa = await empresa_crud.get(session, id=1)
+            empresas = await empresa_crud.filter(session, cnpj="12345678000199")
+            await empresa_crud.update(session, 1, {"nome": "Nova Razão"})
+    """
+
+    def __init__(self, model: Type[ModelType]):
+        """
+        Inicializa o CRUD com o model.
+
+        Args:
+            model: Classe do model SQLAlchemy
+        """
+        self.model = model
+
+    def _select(self, include_inactive: bool = False, **filters):
+        """SELECT do model com o filtro de ativos e filtros de igualdade"""
+        query = select(self.model)
+        if not include_inactive and hasattr(self.model, 'ativo'):
+            query = query.where(self.model.ativo == true())
+        for key, value in filters.items():
+            if hasattr(self.model, key):
+                query = query.where(getattr(self.model, key) == value)
+        return query
+
+    async def get(self, session: "AsyncSession", id: int, include_inactive: bool = False) -> Optional[ModelType]:
+        """
+        Busca um registro por ID.
+
+        Args:
+            session: Sessão assíncrona
+            id: ID do registro
+            include_inactive: Se True, inclui registros inativos
+
+        Returns:
+            Instância do model ou None
+        """
+        query = self._select(include_inactive).where(self.model.id == id)
+        result = await session.scalars(query.limit(1))
+        return result.first()
+
+    async def get_all(
+        self,
+        session: "AsyncSession",
+        skip: int = 0,
+        limit: int = 100,
+        include_inactive: bool = False,
+    ) -> List[ModelType]:
+        """
+        Busca todos os registros com paginação.
+
+        Args:
+            session: Sessão assíncrona
+            skip: Número de registros para pular
+            limit: Número máximo de registros
+            include_inactive: Se True, inclui registros inativos
+        """
+        result = await session.scalars(self._select(include_inactive).offset(skip).limit(limit))
+        return list(result.all())
+
+    async def filter(
+        self,
+        session: "AsyncSession",
+        skip: int = 0,
+        limit: int = 100,
+        include_inactive: bool = False,
+        **filters
+    ) -> List[ModelType]:
+        """
+        Busca registros com filtros de igualdade.
+
+        Exemplo:
+            empresas = await empresa_crud.filter(session, cnpj="12345678000199")
+        """
+        query = self._select(include_inactive, **filters).offset(skip).limit(limit)
+        result = await session.scalars(query)
+        return list(result.all())
+
+    async def create(self, session: "AsyncSession", data: Dict[str, Any]) -> ModelType:
+        """
+        Cria um registro.
+
+        Raises:
+            DatabaseQueryError: Se o INSERT falhar (a sessão é desfeita)
+        """
+        try:
+            obj = self.model(**data)
+            session.add(obj)
+            await session.commit()
+            await session.refresh(obj)
+            return obj
+        except SQLAlchemyError as e:
+            await session.rollback()
+            raise DatabaseQueryError(
+                f"Erro ao criar {self.model.__name__}",
+                details={"model": self.model.__name__, "error": str(e)}
+            ) from e
+
+    async def create_many(
+        self,
+        session: "AsyncSession",
+        data_list: List[Dict[str, Any]],
+        chunk_size: int = 1000,
+    ) -> List[ModelType]:
+        """
+        Cria múltiplos registros com INSERT ... RETURNING em lotes e um único
+        commit (ver CRUDBase.create_many)
+
+        Raises:
+            DatabaseQueryError: Se algum INSERT falhar (a sessão é desfeita)
+        """
+        statement = insert(self.model).returning(self.model, sort_by_parameter_order=True)
+        try:
+            objects: List[ModelType] = []
+            for start in range(0, len(data_list), chunk_size):
+                result = await session.scalars(statement, data_list[start:start + chunk_size])
+                objects.extend(result.all())
+            await session.commit()
+            return objects
+        except SQLAlchemyError as e:
+            await session.rollback()
+            raise DatabaseQueryError(
+                f"Erro ao criar registros de {self.model.__name__}",
+                details={"model": self.model.__name__, "rows": len(data_list), "error": str(e)}
+            ) from e
+
+    async def update(self, session: "AsyncSession", id: int, data: Dict[str, Any]) -> ModelType:
+        """
+        Atualiza um registro existente.
+
+        Raises:
+            ModelNotFoundError: Se o registro não existir
+            DatabaseQueryError: Se o UPDATE falhar
+        """
+        obj = await self.get(session, id)
+        if obj is None:
+            raise ModelNotFoundError(self.model.__name__, id)
+        try:
+            for key, value in data.items():
+                if hasattr(obj, key):
+                    setattr(obj, key, value)
+            await session.commit()
+            await session.refresh(obj)
+            return obj
+        except SQLAlchemyError as e:
+            await session.rollback()
+            raise DatabaseQueryError(
+                f"Erro ao atualizar {self.model.__name__}",
+                details={"model": self.model.__name__, "id": id, "error": str(e)}
+            ) from e
+
+    async def upsert(
+        self,
+        session: "AsyncSession",
+        data: Dict[str, Any],
+        id: Optional[int] = None,
+        conflict_columns: Optional[Sequence[str]] = None,
+        **filters
+    ) -> ModelType:
+        """
+        Insert or Update: busca por id ou pelos filtros e atualiza, senão cria.
+
+        Com conflict_columns, executa um único INSERT ... ON CONFLICT
+        (conflict_columns) DO UPDATE ... RETURNING, atômico com requisições
+        concorrentes (ver CRUDBase.upsert).
+
+        Exemplo:
+            empresa = await empresa_crud.upsert(session, {"nome": "ACME"}, cnpj="12345678000199")
+
+            # ON CONFLICT nativo (índice único em cnpj)
+            empresa = await empresa_crud.upsert(session, {"nome": "ACME"}, conflict_columns=["cnpj"], cnpj="12345678000199")
+        """
+        if conflict_columns:
+            row = {**filters, **data}
+            if id is not None:
+                row["id"] = id
+            try:
+                dialect = session.get_bind().dialect.name
+                objects: List[ModelType] = []
+                for statement, group in _upsert_statements(self.model, dialect, [row], conflict_columns):
+                    result = await session.scalars(statement, group, execution_options={"populate_existing": True})
+                    objects.extend(result.all())
+                await session.commit()
+                return objects[0]
+            except SQLAlchemyError as e:
+                await session.rollback()
+                raise DatabaseQueryError(
+                    f"Erro ao fazer upsert em {self.model.__name__}",
+                    details={"model": self.model.__name__, "conflict_columns": list(conflict_columns), "data": row, "error": str(e)}
+                ) from e
+
+        try:
+            obj = None
+            if id is not None:
+                obj = await self.get(session, id)
+            elif filters:
+                results = await self.filter(session, limit=1, **filters)
+                obj = results[0] if results else None
+
+            if obj:
+                for key, value in data.items():
+                    if hasattr(obj, key):
+                        setattr(obj, key, value)
+            else:
+                obj = self.model(**data)
+                session.add(obj)
+
+            await session.commit()
+            await session.refresh(obj)
+            return obj
+        except SQLAlchemyError as e:
+            await session.rollback()
+            raise DatabaseQueryError(
+                f"Erro ao fazer upsert em {self.model.__name__}",
+                details={"model": self.model.__name__, "id": id, "filters": filters, "data": data, "error": str(e)}
+            ) from e
+
+    async def delete(self, session: "AsyncSession", id: int) -> bool:
+        """
+        Deleta logicamente um registro (marca ativo=False).
+
+        Raises:
+            ModelNotFoundError: Se o registro não existir
+            DatabaseQueryError: Se o model não tiver a coluna 'ativo'
+        """
+        try:
+            obj = await self.get(session, id)
+            if not obj:
+                raise ModelNotFoundError(self.model.__name__, id)
+
+            if not hasattr(obj, 'ativo'):
+                raise DatabaseQueryError(
+                    f"Model {self.model.__name__} não possui coluna 'ativo' para soft delete",
+                    details={"model": self.model.__name__, "id": id}
+                )
+
+            obj.ativo = False
+            await session.commit()
+            return True
+        except (ModelNotFoundError, DatabaseQueryError):
+            raise
+        except SQLAlchemyError as e:
+            await session.rollback()
+            raise DatabaseQueryError(
+                f"Erro ao deletar {self.model.__name__}",
+                details={"model": self.model.__name__, "id": id, "error": str(e)}
+            ) from e
+
+    async def count(self, session: "AsyncSession", include_inactive: bool = False, **filters) -> int:
+        """Conta o número de registros (com filtros opcionais)"""
+        query = select(func.count()).select_from(self._select(include_inactive, **filters).subquery())
+        return await session.scalar(query)
+
+    async def exists(self, session: "AsyncSession", id: int, include_inactive: bool = False) -> bool:
+        """Verifica se um registro existe"""
+        return await self.get(session, id, include_inactive=include_inactive) is not None
+
+
+def async_crud_factory(model: Type[ModelType]) -> AsyncCRUDBase[ModelType]:
+    """
+    Factory para criar instâncias de AsyncCRUDBase para qualquer model.
+
+    Exemplo:
+        empresa_crud = async_crud_factory(Empresas)
+    """
+    return AsyncCRUDBase(model)
@@ -4,6 +4,7 @@ Repository para operações com certificados usando utils
 from typing import Tuple, Optional
 from pathlib import Path
 from ..session import get_session
+from ..snapshot import Snapshot, snapshot_columns, snapshot_from_row
 from ..repositories.crud import crud_factory
 from ...database.models.tdax import Certificates, Organizacoes
 from ...utils import write_file, create_dir, slugify
@@ -92,20 +93,20 @@ def get_certificate_from_org_id(org_id: int, cert_dir: str = "files") -> Tuple[O
     """
     try:
         with get_session("tdax") as session:
-            # Busca organização com join no certificado
-            result = session.query(Organizacoes).join(
-                Certificates,
+            # Busca o certificado da organização em uma query (sem lazy load de Organizacoes.certificate)
+            certificate = session.query(Certificates).join(
+                Organizacoes,
                 Organizacoes.certificate_id == Certificates.id
             ).filter(Organizacoes.id == org_id).first()
 
-            if not result or not result.certificate:
+            if certificate is None:
                 return None, None
 
             # Salva o arquivo usando utils
-            cert_path = _save_certificate_file(result.certificate, cert_dir)
+            cert_path = _save_certificate_file(certificate, cert_dir)
 
             if cert_path:
-                return cert_path, result.certificate.password
+                return cert_path, certificate.password
             else:
                 return None, None
 
@@ -113,7 +114,7 @@ def get_certificate_from_org_id(org_id: int, cert_dir: str = "files") -> Tuple[O
         return None, None
 
 
-def get_certificate_by_filters(cert_dir: str = "files", **filters) -> list[Certificates]:
+def get_certificate_by_filters(cert_dir: str = "files", **filters) -> list[Snapshot]:
     """
     Buscar certificados por filtros
 
@@ -122,13 +123,13 @@ def get_certificate_by_filters(cert_dir: str = "files", **filters) -> list[Certi
         **filters: Filtros de busca
 
     Returns:
-        Lista de Certificates
+        Lista de snapshots de Certificates (somente leitura, sem sessão)
     """
     with get_session("tdax") as session:
-        return certificates_crud.filter(session, **filters)
+        return certificates_crud.filter(session, snapshot=True, **filters)
 
 
-def get_certificate_info(org_id: int) -> Optional[Certificates]:
+def get_certificate_info(org_id: int) -> Optional[Snapshot]:
     """
     Busca informações do certificado sem salvar arquivo
 
@@ -136,17 +137,17 @@ def get_certificate_info(org_id: int) -> Optional[Certificates]:
         org_id: ID da organização
 
     Returns:
-        Instância Certificates ou None
+        Snapshot de Certificates (somente leitura, sem sessão) ou None
     """
     try:
         with get_session("tdax") as session:
-            # Busca organização com join no certificado
-            result = session.query(Organizacoes).join(
-                Certificates,
+            # Só as colunas do certificado, em uma query (sem lazy load de Organizacoes.certificate)
+            row = session.query(*snapshot_columns(Certificates)).join(
+                Organizacoes,
                 Organizacoes.certificate_id == Certificates.id
             ).filter(Organizacoes.id == org_id).first()
 
-            return result.certificate if result else None
+            return snapshot_from_row(Certificates, row) if row is not None else None
 
     except Exception as e:
         return None
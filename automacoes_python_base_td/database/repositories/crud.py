@@ -1,16 +1,88 @@
 """
 CRUD genérico para qualquer model SQLAlchemy (plug and play)
 """
-from typing import TypeVar, Generic, Type, Optional, List, Dict, Any
+from typing import TypeVar, Generic, Type, Optional, List, Dict, Any, Iterator, Sequence, Tuple, Union
+from sqlalchemy import inspect, insert, true, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from ..models.base import Base
+from ..pagination import decode_cursor, encode_cursor
+from ..snapshot import Snapshot, snapshot_columns, snapshot_from_row
 from ...core.exceptions import DatabaseQueryError, ModelNotFoundError
 
 
 ModelType = TypeVar("ModelType", bound=Base)
 
 
+def _upsert_statements(
+    model: Type[ModelType],
+    dialect: str,
+    rows: List[Dict[str, Any]],
+    conflict_columns: Sequence[str],
+    update_columns: Optional[Sequence[str]] = None,
+) -> List[Tuple[Any, List[Dict[str, Any]]]]:
+    """
+    Monta os INSERT ... ON CONFLICT DO UPDATE ... RETURNING das linhas, um por
+    conjunto de chaves, com as linhas de cada um (usado por CRUDBase e AsyncCRUDBase)
+    """
+    if dialect == "postgresql":
+        statement = postgresql.insert(model)
+    elif dialect == "sqlite":
+        statement = sqlite.insert(model)
+    else:
+        raise DatabaseQueryError(
+            f"Upsert nativo não suportado no banco {dialect}",
+            details={"model": model.__name__, "dialect": dialect}
+        )
+    
+    mapper = inspect(model)
+    columns = {attr.key: attr.columns[0] for attr in mapper.column_attrs}
+    unknown = [key for key in [*conflict_columns, *(update_columns or [])] if key not in columns]
+    if unknown:
+        raise DatabaseQueryError(
+            f"Colunas inexistentes em {model.__name__} para upsert: {unknown}",
+            details={"model": model.__name__, "columns": unknown}
+        )
+    
+    missing = [index for index, row in enumerate(rows) if any(key not in row for key in conflict_columns)]
+    if missing:
+        raise ValueError(
+            f"Linhas sem as colunas de conflito {list(conflict_columns)} no upsert de "
+            f"{model.__name__} (posições {missing[:10]})"
+        )
+    
+    # Última ocorrência de cada chave (o mesmo statement não pode atualizar a linha duas vezes)
+    unique_rows = list({tuple(row[key] for key in conflict_columns): row for row in rows}.values())
+    
+    # Um statement por conjunto de chaves: uma coluna ausente em uma linha iria
+    # como NULL/default e o "col = excluded.col" apagaria o valor já gravado
+    groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for row in unique_rows:
+        groups.setdefault(tuple(row), []).append(row)
+    
+    primary_keys = {mapper.get_property_by_column(column).key for column in mapper.primary_key}
+    statements: List[Tuple[Any, List[Dict[str, Any]]]] = []
+    for keys, group in groups.items():
+        if update_columns is None:
+            # A chave primária nunca é sobrescrita por padrão (ex: upsert(..., id=...))
+            group_update_columns = [key for key in keys if key not in conflict_columns and key not in primary_keys]
+        else:
+            group_update_columns = list(update_columns)
+        set_ = {columns[key]: statement.excluded[columns[key].name] for key in group_update_columns}
+        if not set_:
+            # Sem colunas para atualizar: reatribui a chave para que o RETURNING devolva a linha existente
+            key = conflict_columns[0]
+            set_ = {columns[key]: statement.excluded[columns[key].name]}
+        
+        group_statement = statement.on_conflict_do_update(
+            index_elements=[columns[key] for key in conflict_columns],
+            set_=set_,
+        ).returning(model)
+        statements.append((group_statement, group))
+    return statements
+
+
 class CRUDBase(Generic[ModelType]):
     """
     CRUD genérico para qualquer model SQLAlchemy.
@@ -34,6 +106,9 @@ class CRUDBase(Generic[ModelType]):
         user = user_crud.get(session, id=1, include_inactive=True)
         users = user_crud.get_all(session, include_inactive=True)
         
+        # READ (snapshot imutável, utilizável depois que a sessão fecha)
+        user = user_crud.get(session, id=1, snapshot=True)
+        
         # UPDATE
         updated_user = user_crud.update(session, id=1, data={"name": "João Silva"})
         
@@ -53,7 +128,54 @@ class CRUDBase(Generic[ModelType]):
         """
         self.model = model
     
-    def get(self, session: Session, id: int, include_inactive: bool = False) -> Optional[ModelType]:
+    def _query(self, session: Session, snapshot: bool):
+        """Query das instâncias do model ou, com snapshot=True, só das colunas"""
+        if snapshot:
+            return session.query(*snapshot_columns(self.model))
+        return session.query(self.model)
+    
+    def _filtered_query(
+        self,
+        session: Session,
+        snapshot: bool = False,
+        include_inactive: bool = False,
+        **filters
+    ):
+        """
+        Query com o filtro de ativos e os filtros de igualdade (colunas
+        inexistentes no model são ignoradas), base de filter, count e da
+        paginação por chave
+        """
+        query = self._query(session, snapshot)
+        if not include_inactive and hasattr(self.model, 'ativo'):
+            query = query.filter(self.model.ativo == true())
+        for key, value in filters.items():
+            if hasattr(self.model, key):
+                query = query.filter(getattr(self.model, key) == value)
+        return query
+    
+    def _result(self, rows: List[Any], snapshot: bool) -> List[Any]:
+        if snapshot:
+            return [snapshot_from_row(self.model, row) for row in rows]
+        return rows
+    
+    @staticmethod
+    def _commit_loaded(session: Session) -> None:
+        """Commit sem expirar as instâncias (já carregadas pelo RETURNING)"""
+        expire_on_commit = session.expire_on_commit
+        session.expire_on_commit = False
+        try:
+            session.commit()
+        finally:
+            session.expire_on_commit = expire_on_commit
+    
+    def get(
+        self,
+        session: Session,
+        id: int,
+        include_inactive: bool = False,
+        snapshot: bool = False,
+    ) -> Optional[Union[ModelType, Snapshot]]:
         """
         Busca um registro por ID.
         
@@ -61,14 +183,17 @@ class CRUDBase(Generic[ModelType]):
             session: Sessão SQLAlchemy
             id: ID do registro
             include_inactive: Se True, inclui registros inativos
+            snapshot: Se True, retorna um Snapshot imutável com todas as colunas
+                (sem lazy loading, válido depois que a sessão fecha)
         
         Returns:
-            Instância do model ou None
+            Instância do model (ou Snapshot) ou None
         """
-        query = session.query(self.model).filter(self.model.id == id)
-        if not include_inactive and hasattr(self.model, 'ativo'):
-            query = query.filter(self.model.ativo == True)
-        return query.first()
+        query = self._filtered_query(session, snapshot, include_inactive).filter(self.model.id == id)
+        row = query.first()
+        if row is None or not snapshot:
+            return row
+        return snapshot_from_row(self.model, row)
     
     def get_all(
         self,
@@ -76,7 +201,8 @@ class CRUDBase(Generic[ModelType]):
         skip: int = 0,
         limit: int = 100,
         include_inactive: bool = False,
-    ) -> List[ModelType]:
+        snapshot: bool = False,
+    ) -> List[Union[ModelType, Snapshot]]:
         """
         Busca todos os registros com paginação.
         
@@ -85,14 +211,13 @@ class CRUDBase(Generic[ModelType]):
             skip: Número de registros para pular
             limit: Número máximo de registros
             include_inactive: Se True, inclui registros inativos
+            snapshot: Se True, retorna Snapshots imutáveis (ver get)
         
         Returns:
-            Lista de instâncias do model
+            Lista de instâncias do model (ou Snapshots)
         """
-        query = session.query(self.model)
-        if not include_inactive and hasattr(self.model, 'ativo'):
-            query = query.filter(self.model.ativo == True)
-        return query.offset(skip).limit(limit).all()
+        query = self._filtered_query(session, snapshot, include_inactive)
+        return self._result(query.offset(skip).limit(limit).all(), snapshot)
     
     def filter(
         self,
@@ -100,8 +225,9 @@ class CRUDBase(Generic[ModelType]):
         skip: int = 0,
         limit: int = 100,
         include_inactive: bool = False,
+        snapshot: bool = False,
         **filters
-    ) -> List[ModelType]:
+    ) -> List[Union[ModelType, Snapshot]]:
         """
         Busca registros com filtros.
         
@@ -110,39 +236,165 @@ class CRUDBase(Generic[ModelType]):
             skip: Número de registros para pular
             limit: Número máximo de registros
             include_inactive: Se True, inclui registros inativos
+            snapshot: Se True, retorna Snapshots imutáveis (ver get)
             **filters: Filtros (ex: name="João", active=True)
         
         Returns:
-            Lista de instâncias do model
+            Lista de instâncias do model (ou Snapshots)
         
         Exemplo:
             users = user_crud.filter(session, name="João", active=True)
         """
-        query = session.query(self.model)
-        if not include_inactive and hasattr(self.model, 'ativo'):
-            query = query.filter(self.model.ativo == True)
-        for key, value in filters.items():
-            if hasattr(self.model, key):
-                query = query.filter(getattr(self.model, key) == value)
-        return query.offset(skip).limit(limit).all()
+        query = self._filtered_query(session, snapshot, include_inactive, **filters)
+        return self._result(query.offset(skip).limit(limit).all(), snapshot)
     
-    def create_many(self, session: Session, data_list: List[Dict[str, Any]]) -> List[ModelType]:
+    def _order_keys(self, order_by: Optional[Union[str, Sequence[str]]]) -> List[str]:
+        """Atributos de ordenação, completados pela chave primária para desempate"""
+        if order_by is None:
+            keys: List[str] = []
+        elif isinstance(order_by, str):
+            keys = [order_by]
+        else:
+            keys = list(order_by)
+        mapper = inspect(self.model)
+        for column in mapper.primary_key:
+            key = mapper.get_property_by_column(column).key
+            if key not in keys:
+                keys.append(key)
+        return keys
+    
+    def _seek_page(
+        self,
+        session: Session,
+        page_size: int,
+        keys: List[str],
+        after: Optional[List[Any]],
+        descending: bool,
+        include_inactive: bool,
+        snapshot: bool,
+        filters: Dict[str, Any],
+    ) -> List[Any]:
+        """Próxima página após a chave after (WHERE (chaves) > after ORDER BY chaves LIMIT)"""
+        columns = [getattr(self.model, key) for key in keys]
+        query = self._filtered_query(session, snapshot, include_inactive, **filters)
+        if after is not None:
+            position = tuple_(*columns)
+            query = query.filter(position < tuple_(*after) if descending else position > tuple_(*after))
+        query = query.order_by(*[column.desc() if descending else column for column in columns])
+        return self._result(query.limit(page_size).all(), snapshot)
+    
+    def iter_pages(
+        self,
+        session: Session,
+        page_size: int = 1000,
+        order_by: Optional[Union[str, Sequence[str]]] = None,
+        descending: bool = False,
+        include_inactive: bool = False,
+        snapshot: bool = False,
+        **filters
+    ) -> Iterator[List[Union[ModelType, Snapshot]]]:
         """
-        Cria múltiplos registros.
+        Percorre os registros em páginas por chave (keyset): cada página
+        continua após a última chave da anterior (WHERE chave > última), sem
+        OFFSET, com custo constante em tabelas grandes.
+        
+        A ordenação deve usar colunas indexadas e não nulas; a chave primária
+        é sempre acrescentada para desempate (padrão: só a chave primária).
         
         Args:
             session: Sessão SQLAlchemy
-            data_list: Lista de dicionários com os dados
+            page_size: Registros por página
+            order_by: Atributo ou lista de atributos de ordenação
+            descending: Se True, percorre em ordem decrescente
+            include_inactive: Se True, inclui registros inativos
+            snapshot: Se True, as páginas trazem Snapshots imutáveis (ver get)
+            **filters: Filtros de igualdade (como em filter)
+        
+        Exemplo:
+            for pagina in sped_crud.iter_pages(session, page_size=5000, cnpj=cnpj):
+                processar(pagina)
+        """
+        keys = self._order_keys(order_by)
+        after = None
+        while True:
+            page = self._seek_page(session, page_size, keys, after, descending, include_inactive, snapshot, filters)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after = [getattr(page[-1], key) for key in keys]
+    
+    def get_page(
+        self,
+        session: Session,
+        page_size: int = 100,
+        cursor: Optional[str] = None,
+        order_by: Optional[Union[str, Sequence[str]]] = None,
+        descending: bool = False,
+        include_inactive: bool = False,
+        snapshot: bool = False,
+        **filters
+    ) -> Tuple[List[Union[ModelType, Snapshot]], Optional[str]]:
+        """
+        Uma página por chave (ver iter_pages) e o cursor da próxima, para
+        paginação retomável em APIs.
+        
+        Args:
+            cursor: Token retornado pela página anterior (None = primeira página)
+            (demais argumentos como em iter_pages)
+        
+        Returns:
+            Tuple[registros, cursor da próxima página ou None se acabou]
+        
+        Raises:
+            ValidationError: Se o cursor for inválido ou de outra ordenação
+        
+        Exemplo:
+            itens, proximo = sped_crud.get_page(session, 50, cursor=request.query_params.get("cursor"))
+        """
+        keys = self._order_keys(order_by)
+        after = None
+        if cursor is not None:
+            after = decode_cursor(cursor, keys, [getattr(self.model, key) for key in keys])
+        
+        rows = self._seek_page(session, page_size + 1, keys, after, descending, include_inactive, snapshot, filters)
+        page = rows[:page_size]
+        if len(rows) <= page_size:
+            return page, None
+        return page, encode_cursor(keys, [getattr(page[-1], key) for key in keys])
+    
+    def create_many(
+        self,
+        session: Session,
+        data_list: List[Dict[str, Any]],
+        chunk_size: int = 1000,
+    ) -> List[ModelType]:
+        """
+        Cria múltiplos registros com INSERT ... RETURNING em lotes e um único commit.
+        
+        As instâncias vêm preenchidas pelo RETURNING (ids e defaults do
+        servidor), na ordem de data_list, sem um SELECT por registro; o commit
+        não as expira, então continuam utilizáveis sem nova query.
+        
+        Args:
+            session: Sessão SQLAlchemy
+            data_list: Lista de dicionários com os dados (nomes dos atributos do model)
+            chunk_size: Registros por statement INSERT
         
         Returns:
             Lista de instâncias do model criadas
+        
+        Exemplo:
+            units = unit_crud.create_many(session, [{"cnpj": cnpj, "periodo": p} for p in periodos])
         """
+        statement = insert(self.model).returning(self.model, sort_by_parameter_order=True)
         try:
-            objects = [self.model(**data) for data in data_list]
-            session.add_all(objects)
-            session.commit()
-            for obj in objects:
-                session.refresh(obj)
+            objects: List[ModelType] = []
+            for start in range(0, len(data_list), chunk_size):
+                chunk = data_list[start:start + chunk_size]
+                objects.extend(session.scalars(statement, chunk).all())
+            self._commit_loaded(session)
             return objects
         except SQLAlchemyError as e:
             session.rollback()
@@ -153,15 +405,24 @@ class CRUDBase(Generic[ModelType]):
         session: Session,
         data: Dict[str, Any],
         id: Optional[int] = None,
+        conflict_columns: Optional[Sequence[str]] = None,
         **filters
     ) -> ModelType:
         """
         Insert or Update (upsert).
         
+        Com conflict_columns, executa um único INSERT ... ON CONFLICT
+        (conflict_columns) DO UPDATE ... RETURNING, atômico mesmo com vários
+        workers concorrentes (requer índice único nessas colunas). id e
+        filters entram como valores da linha; a chave primária de um registro
+        existente não é alterada. Sem conflict_columns, busca o
+        registro por id ou filtros e faz UPDATE ou INSERT.
+        
         Args:
             session: Sessão SQLAlchemy
             data: Dicionário com os dados
             id: ID do registro (opcional)
+            conflict_columns: Colunas da constraint única para ON CONFLICT (opcional)
             **filters: Filtros para buscar registro existente (ex: email="joao@example.com")
         
         Returns:
@@ -173,7 +434,25 @@ class CRUDBase(Generic[ModelType]):
             
             # Por filtro único (email)
             user = user_crud.upsert(session, {"name": "João Silva"}, email="joao@example.com")
+            
+            # ON CONFLICT nativo (índice único em email)
+            user = user_crud.upsert(session, {"name": "João Silva"}, conflict_columns=["email"], email="joao@example.com")
         """
+        if conflict_columns:
+            row = {**filters, **data}
+            if id is not None:
+                row["id"] = id
+            try:
+                objects = self._upsert_rows(session, [row], conflict_columns)
+                self._commit_loaded(session)
+                return objects[0]
+            except SQLAlchemyError as e:
+                session.rollback()
+                raise DatabaseQueryError(
+                    f"Erro ao fazer upsert em {self.model.__name__}",
+                    details={"model": self.model.__name__, "conflict_columns": list(conflict_columns), "data": row, "error": str(e)}
+                ) from e
+        
         try:
             # Buscar registro existente
             obj = None
@@ -205,6 +484,73 @@ class CRUDBase(Generic[ModelType]):
                 details={"model": self.model.__name__, "id": id, "filters": filters, "data": data, "error": str(e)}
             ) from e
     
+    def bulk_upsert(
+        self,
+        session: Session,
+        data_list: List[Dict[str, Any]],
+        conflict_columns: Sequence[str],
+        update_columns: Optional[Sequence[str]] = None,
+        chunk_size: int = 1000,
+    ) -> List[ModelType]:
+        """
+        Upsert em lote: INSERT ... ON CONFLICT (conflict_columns) DO UPDATE ...
+        RETURNING, um statement por lote de chunk_size linhas e um único commit.
+        
+        Linhas repetidas na mesma chave dentro de um lote são reduzidas à
+        última (o PostgreSQL não aceita atualizar a mesma linha duas vezes
+        em um statement). Linhas com conjuntos de chaves diferentes vão em
+        statements separados, para que uma coluna ausente não sobrescreva o
+        valor existente. As instâncias vêm do RETURNING, sem SELECT extra;
+        a ordem do retorno não é garantida.
+        
+        Args:
+            session: Sessão SQLAlchemy
+            data_list: Lista de dicionários com os dados (incluindo conflict_columns)
+            conflict_columns: Colunas da constraint única (ex: ["cnpj"])
+            update_columns: Colunas atualizadas no conflito (padrão: as demais informadas
+                em cada linha, exceto a chave primária)
+            chunk_size: Linhas por statement
+        
+        Returns:
+            Lista de instâncias inseridas ou atualizadas
+        
+        Raises:
+            DatabaseQueryError: Se algum lote falhar (nada é commitado) ou se
+                conflict_columns/update_columns tiverem colunas inexistentes
+            ValueError: Se alguma linha não tiver todas as conflict_columns
+        
+        Exemplo:
+            privilegios_crud.bulk_upsert(session, linhas, conflict_columns=["cnpj"])
+        """
+        try:
+            objects: List[ModelType] = []
+            for start in range(0, len(data_list), chunk_size):
+                chunk = data_list[start:start + chunk_size]
+                objects.extend(self._upsert_rows(session, chunk, conflict_columns, update_columns))
+            self._commit_loaded(session)
+            return objects
+        except SQLAlchemyError as e:
+            session.rollback()
+            raise DatabaseQueryError(
+                f"Erro ao fazer upsert em lote em {self.model.__name__}",
+                details={"model": self.model.__name__, "conflict_columns": list(conflict_columns), "rows": len(data_list), "error": str(e)}
+            ) from e
+    
+    def _upsert_rows(
+        self,
+        session: Session,
+        rows: List[Dict[str, Any]],
+        conflict_columns: Sequence[str],
+        update_columns: Optional[Sequence[str]] = None,
+    ) -> List[ModelType]:
+        """Executa os INSERT ... ON CONFLICT DO UPDATE ... RETURNING para as linhas"""
+        dialect = session.get_bind().dialect.name
+        objects: List[ModelType] = []
+        for statement, group in _upsert_statements(self.model, dialect, rows, conflict_columns, update_columns):
+            result = session.scalars(statement, group, execution_options={"populate_existing": True})
+            objects.extend(result.all())
+        return objects
+    
     def delete(self, session: Session, id: int) -> bool:
         """
         Deleta logicamente um registro (marca ativo=False).
@@ -255,13 +601,7 @@ class CRUDBase(Generic[ModelType]):
         Returns:
             Número de registros
         """
-        query = session.query(self.model)
-        if not include_inactive and hasattr(self.model, 'ativo'):
-            query = query.filter(self.model.ativo == True)
-        for key, value in filters.items():
-            if hasattr(self.model, key):
-                query = query.filter(getattr(self.model, key) == value)
-        return query.count()
+        return self._filtered_query(session, include_inactive=include_inactive, **filters).count()
     
     def exists(self, session: Session, id: int, include_inactive: bool = False) -> bool:
         """
@@ -275,9 +615,7 @@ class CRUDBase(Generic[ModelType]):
         Returns:
             True se existe, False caso contrário
         """
-        query = session.query(self.model).filter(self.model.id == id)
-        if not include_inactive and hasattr(self.model, 'ativo'):
-            query = query.filter(self.model.ativo == True)
+        query = self._filtered_query(session, include_inactive=include_inactive).filter(self.model.id == id)
         return query.first() is not None
 
 
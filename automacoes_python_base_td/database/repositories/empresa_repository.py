@@ -3,6 +3,7 @@ Repository para operações com Empresas usando CRUD genérico
 """
 from typing import Optional
 from ..session import get_session
+from ..snapshot import Snapshot
 from ..repositories.crud import crud_factory
 from ...database.models.tdax import Empresas
 
@@ -26,7 +27,7 @@ def check_cnpj_exists_return_id(cnpj: str) -> Optional[int]:
         return empresas[0].id if empresas else None
 
 
-def get_empresa_by_cnpj(cnpj: str) -> Optional[Empresas]:
+def get_empresa_by_cnpj(cnpj: str) -> Optional[Snapshot]:
     """
     Buscar empresa por CNPJ
 
@@ -34,14 +35,14 @@ def get_empresa_by_cnpj(cnpj: str) -> Optional[Empresas]:
         cnpj: CNPJ da empresa
 
     Returns:
-        Instância Empresas ou None
+        Snapshot de Empresas (somente leitura, sem sessão) ou None
     """
     with get_session("tdax") as session:
-        empresas = empresa_crud.filter(session, cnpj=cnpj, limit=1)
+        empresas = empresa_crud.filter(session, cnpj=cnpj, limit=1, snapshot=True)
         return empresas[0] if empresas else None
 
 
-def get_empresa_by_id(empresa_id: int) -> Optional[Empresas]:
+def get_empresa_by_id(empresa_id: int) -> Optional[Snapshot]:
     """
     Buscar empresa por ID
 
@@ -49,7 +50,7 @@ def get_empresa_by_id(empresa_id: int) -> Optional[Empresas]:
         empresa_id: ID da empresa
 
     Returns:
-        Instância Empresas ou None
+        Snapshot de Empresas (somente leitura, sem sessão) ou None
     """
     with get_session("tdax") as session:
-        return empresa_crud.get(session, id=empresa_id)
\ No newline at end of file
+        return empresa_crud.get(session, id=empresa_id, snapshot=True)
\ No newline at end of file
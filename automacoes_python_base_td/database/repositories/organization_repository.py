@@ -3,6 +3,7 @@ Repository para operações com organizações usando joins complexos
 """
 from typing import Optional, Tuple
 from ..session import get_session
+from ..snapshot import Snapshot, to_snapshot
 from ..repositories.crud import crud_factory
 from ...database.models.tdax import Organizacoes, Certificates, DctfRetificacao
 from ...utils import write_file, create_dir, slugify
@@ -31,23 +32,19 @@ def get_organization_certificate(org_id: int) -> Tuple[Optional[str], Optional[s
     """
     try:
         with get_session("tdax") as session:
-            # Join complexo entre Organizacoes e Certificates
-            result = session.query(Organizacoes).join(
-                Certificates,
+            # Certificado da organização em uma query (sem lazy load de Organizacoes.certificate)
+            certificate = session.query(Certificates).join(
+                Organizacoes,
                 Organizacoes.certificate_id == Certificates.id
             ).filter(
                 Organizacoes.id == org_id
             ).first()
 
-            if not result:
-                logger.warning(f"Organização não encontrada com ID {org_id}")
-                return None, None
-
-            if not result.certificate:
+            if certificate is None:
                 logger.warning(f"Certificado não encontrado para organização {org_id}")
                 return None, None
 
-            return result.certificate.file_name, result.certificate.password
+            return certificate.file_name, certificate.password
 
     except Exception as e:
         logger.error(f"Erro ao buscar certificado da organização {org_id}: {e}")
@@ -101,24 +98,24 @@ def save_organization_certificate_file(org_id: int, cert_dir: str = "files") ->
     """
     try:
         with get_session("tdax") as session:
-            # Join complexo para buscar organização com certificado
-            result = session.query(Organizacoes).join(
-                Certificates,
+            # Certificado da organização em uma query (sem lazy load de Organizacoes.certificate)
+            certificate = session.query(Certificates).join(
+                Organizacoes,
                 Organizacoes.certificate_id == Certificates.id
             ).filter(
                 Organizacoes.id == org_id
             ).first()
 
-            if not result or not result.certificate:
+            if certificate is None:
                 logger.warning(f"Certificado não encontrado para organização {org_id}")
                 return None, None
 
             # Salva arquivo usando utils
-            cert_path = _save_certificate_to_file(result.certificate, cert_dir)
+            cert_path = _save_certificate_to_file(certificate, cert_dir)
 
             if cert_path:
                 logger.info(f"Certificado salvo para organização {org_id}: {cert_path}")
-                return cert_path, result.certificate.password
+                return cert_path, certificate.password
             else:
                 return None, None
 
@@ -161,7 +158,7 @@ def _save_certificate_to_file(certificate: Certificates, cert_dir: str) -> Optio
         return None
 
 
-def get_organization_by_id(org_id: int) -> Optional[Organizacoes]:
+def get_organization_by_id(org_id: int) -> Optional[Snapshot]:
     """
     Busca organização por ID (operação simples via CRUD).
 
@@ -169,13 +166,13 @@ def get_organization_by_id(org_id: int) -> Optional[Organizacoes]:
         org_id: ID da organização
 
     Returns:
-        Instância Organizacoes ou None
+        Snapshot de Organizacoes (utilizável após o fechamento da sessão) ou None
     """
     with get_session("tdax") as session:
-        return organizacoes_crud.get(session, id=org_id)
+        return organizacoes_crud.get(session, id=org_id, snapshot=True)
 
 
-def get_organizations_by_filters(**filters) -> list[Organizacoes]:
+def get_organizations_by_filters(**filters) -> list[Snapshot]:
     """
     Buscar organizações por filtros diversos.
 
@@ -183,27 +180,30 @@ def get_organizations_by_filters(**filters) -> list[Organizacoes]:
         **filters: Filtros de busca
 
     Returns:
-        Lista de Organizacoes
+        Lista de snapshots de Organizacoes
     """
     with get_session("tdax") as session:
-        return organizacoes_crud.filter(session, **filters)
+        return organizacoes_crud.filter(session, snapshot=True, **filters)
 
 
-def get_certificate_organizations() -> list[tuple[Organizacoes, Certificates]]:
+def get_certificate_organizations() -> list[tuple[Snapshot, Snapshot]]:
     """
     Busca organizações que têm certificados (join complexo).
 
+    Organização e certificado vêm da mesma query (sem um SELECT por
+    organização para Organizacoes.certificate).
+
     Returns:
-        Lista de tuplas (Organizacao, Certificate)
+        Lista de tuplas (snapshot da Organizacao, snapshot do Certificate)
     """
     try:
         with get_session("tdax") as session:
-            results = session.query(Organizacoes).join(
+            results = session.query(Organizacoes, Certificates).join(
                 Certificates,
                 Organizacoes.certificate_id == Certificates.id
             ).all()
 
-            return [(org, org.certificate) for org in results if org.certificate]
+            return [(to_snapshot(org), to_snapshot(certificate)) for org, certificate in results]
 
     except Exception as e:
         logger.error(f"Erro ao buscar organizações com certificados: {e}")
@@ -214,7 +214,7 @@ def get_certificate_organizations() -> list[tuple[Organizacoes, Certificates]]:
 # FUNÇÕES DE COMPATIBILIDADE LEGADA
 # ==========================================
 
-def get_organizacao_by_id(org_id: int) -> Optional[Organizacoes]:
+def get_organizacao_by_id(org_id: int) -> Optional[Snapshot]:
     """
     Função de compatibilidade legada.
 
@@ -224,7 +224,7 @@ def get_organizacao_by_id(org_id: int) -> Optional[Organizacoes]:
         org_id: ID da organização
 
     Returns:
-        Instância Organizacoes ou None
+        Snapshot de Organizacoes ou None
     """
     logger.warning("get_organizacao_by_id() está deprecated. Use get_organization_by_id()")
     return get_organization_by_id(org_id)
@@ -0,0 +1,131 @@
+"""
+Resiliência de conexão: backoff exponencial com jitter, keepalives TCP e
+contadores de reconexão
+"""
+import random
+import threading
+from typing import Any, Dict, Iterator, Optional
+import psycopg2
+from psycopg2 import extensions
+from ..settings import settings
+
+
+# SQLSTATEs que indicam conexão perdida (classe 08 e encerramento pelo servidor)
+CONNECTION_LOST_PGCODES = ("57P01", "57P02", "57P03")
+
+# Falhas de conexão que não adianta repetir
+_NON_RETRYABLE_MESSAGES = ("authentication failed", "does not exist", "no pg_hba.conf entry")
+
+
+def connect_options() -> Dict[str, Any]:
+    """
+    Parâmetros libpq de timeout e keepalive TCP (settings.db_connect_timeout,
+    settings.db_keepalives_*). Keepalives detectam conexões mortas por
+    failover ou NAT em vez de esperar o timeout do sistema operacional.
+
+    Exemplo:
+        psycopg2.connect(dsn, **connect_options())
+    """
+    options: Dict[str, Any] = {}
+    if settings.db_connect_timeout:
+        options["connect_timeout"] = int(settings.db_connect_timeout)
+    if settings.db_keepalives_idle:
+        options.update(
+            keepalives=1,
+            keepalives_idle=settings.db_keepalives_idle,
+            keepalives_interval=settings.db_keepalives_interval,
+            keepalives_count=settings.db_keepalives_count,
+        )
+    return options
+
+
+def backoff_delays(
+    retries: int,
+    base: Optional[float] = None,
+    maximum: Optional[float] = None,
+) -> Iterator[float]:
+    """
+    Esperas entre tentativas: exponencial (base, 2*base, 4*base...) limitada
+    a maximum, com "full jitter" (valor aleatório entre 0 e o limite) para
+    que vários processos não reconectem ao mesmo tempo.
+
+    Args:
+        retries: Número de novas tentativas (esperas geradas)
+        base: Espera inicial em segundos (padrão settings.db_connect_backoff)
+        maximum: Espera máxima em segundos (padrão settings.db_connect_max_backoff)
+    """
+    base = settings.db_connect_backoff if base is None else base
+    maximum = settings.db_connect_max_backoff if maximum is None else maximum
+    for attempt in range(retries):
+        yield random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+def is_retryable_connect_error(error: BaseException) -> bool:
+    """Falha ao abrir conexão que pode ser transitória (recusada, timeout, failover)"""
+    if not isinstance(error, psycopg2.OperationalError):
+        return False
+    message = str(error).lower()
+    return not any(text in message for text in _NON_RETRYABLE_MESSAGES)
+
+
+def is_connection_lost(error: BaseException, conn: Any = None) -> bool:
+    """
+    Verifica se o erro indica que a conexão caiu (e não um erro da query).
+
+    Queries canceladas por statement_timeout não contam como conexão perdida.
+    """
+    if isinstance(error, extensions.QueryCanceledError):
+        return False
+    if not isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+        return False
+    pgcode = getattr(error, "pgcode", None)
+    if pgcode:
+        return pgcode.startswith("08") or pgcode in CONNECTION_LOST_PGCODES
+    if conn is not None:
+        return bool(conn.closed)
+    # Sem pgcode o erro veio do cliente (socket fechado, servidor reiniciado)
+    return True
+
+
+# ==========================================
+# CONTADORES GLOBAIS
+# ==========================================
+
+_stats_lock = threading.Lock()
+_stats = {
+    "connect_attempts": 0,
+    "connect_failures": 0,
+    "connect_retries": 0,
+    "connections_lost": 0,
+    "reads_retried": 0,
+}
+
+
+def count_connection_event(stat: str) -> None:
+    """Incrementa um contador de conexão (ver get_connection_stats)"""
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def get_connection_stats() -> Dict[str, int]:
+    """
+    Retorna os contadores de conexão do processo.
+
+    Returns:
+        Dict com connect_attempts, connect_failures, connect_retries
+        (novas tentativas após falha transitória), connections_lost
+        (quedas durante leituras) e reads_retried
+
+    Exemplo:
+        stats = get_connection_stats()
+        print(stats["connect_retries"], stats["reads_retried"])
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_connection_stats() -> None:
+    """Zera os contadores de conexão do processo"""
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
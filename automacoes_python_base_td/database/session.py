@@ -1,22 +1,45 @@
 """
 Gerenciamento de sessões SQLAlchemy - Unificado
 """
-from typing import Optional, Generator, Literal
+import asyncio
+import os
+import threading
+import weakref
+from contextvars import ContextVar
+from typing import Any, List, Optional, Generator, Literal, Tuple
 from contextlib import contextmanager
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
 from .models.base import Base
+from .pooler import engine_pool_options, pooler_connect_args
+from .replica import REPLICATION_LAG_SQL, ReplicaRouter, replica_configured
+from .retry import connect_options
+from .statement_tracking import PLUGIN_NAME as STATEMENT_TRACKING_PLUGIN, statement_scope
 from ..settings import settings
 
 
 DatabaseType = Literal["tdax", "automations"]
 
 
+def _scope_owner() -> Tuple[int, int, int]:
+    """Identifica o escopo atual: processo, thread e task asyncio (0 fora de tasks)"""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return (os.getpid(), threading.get_ident(), id(task) if task is not None else 0)
+
+
 class DatabaseSessionManager:
     """
     Gerenciador de sessões SQLAlchemy unificado.
     Suporta múltiplos bancos de dados através do parâmetro db_type.
+    
+    É seguro entre processos: após um fork (multiprocessing, gunicorn, celery)
+    o processo filho descarta o pool herdado e abre as próprias conexões sob
+    demanda, sem fechar os sockets que o processo pai continua usando.
     """
     
     def __init__(
@@ -24,18 +47,22 @@ class DatabaseSessionManager:
         db_type: Optional[DatabaseType] = None,
         database_url: Optional[str] = None,
         echo: bool = False,
-        pool_size: int = 5,
-        max_overflow: int = 10,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None,
     ):
         """
         Inicializa o gerenciador de sessões.
         
+        Timeout, recycle, pre-ping e LIFO do pool vêm de settings.db_engine_pool_*;
+        com settings.db_pooler_mode = "transaction" (PgBouncer) o pool local é
+        desligado (ver pooler.engine_pool_options).
+        
         Args:
             db_type: Tipo do banco ("tdax", "automations" ou None para env)
             database_url: URL de conexão (sobrescreve db_type)
             echo: Se True, mostra SQL queries no console
-            pool_size: Tamanho do pool de conexões
-            max_overflow: Conexões extras permitidas
+            pool_size: Tamanho do pool de conexões (padrão settings.db_engine_pool_size)
+            max_overflow: Conexões extras permitidas (padrão settings.db_engine_max_overflow)
         """
         # Se não forneceu URL, usa settings baseado em db_type
         if database_url is None:
@@ -49,45 +76,284 @@ class DatabaseSessionManager:
         
         self.db_type = db_type
         self.database_url = database_url
+        self.echo = echo
+        self.pool_size = settings.db_engine_pool_size if pool_size is None else pool_size
+        self.max_overflow = settings.db_engine_max_overflow if max_overflow is None else max_overflow
         
-        self.engine = create_engine(
-            self.database_url,
-            echo=echo,
-            poolclass=QueuePool,
-            pool_size=pool_size,
-            max_overflow=max_overflow,
-            pool_pre_ping=True,
-        )
+        self._pid = os.getpid()
+        # Pools herdados do processo pai (mantidos vivos para não fechar os sockets dele)
+        self._inherited_pools: List[Any] = []
+        self._engine = self._create_engine(self.database_url, self.db_type or "default")
         
         self.SessionLocal = sessionmaker(
             autocommit=False,
             autoflush=False,
-            bind=self.engine,
+            bind=self._engine,
+        )
+        
+        # Réplica de leitura (criada sob demanda em session_scope(read_only=True))
+        self.read_engine = None
+        self.ReadSessionLocal = None
+        self._replica_router: Optional[ReplicaRouter] = None
+        
+        # Sessão por escopo (thread/task) guardada com o dono, pois tasks asyncio
+        # herdam uma cópia do contexto de quem as criou
+        self._scoped: ContextVar[Optional[Tuple[Tuple[int, int, int], Session]]] = ContextVar(
+            f"db_scoped_session_{id(self)}", default=None
+        )
+        # Unidade de trabalho ativa (ver unit_of_work), também guardada com o dono
+        self._unit_of_work: ContextVar[Optional[Tuple[Tuple[int, int, int], Session]]] = ContextVar(
+            f"db_unit_of_work_{id(self)}", default=None
+        )
+        
+        _live_managers.add(self)
+    
+    @property
+    def engine(self):
+        """Engine do processo atual (com o pool recriado se houve fork)"""
+        self._check_fork()
+        return self._engine
+    
+    def _check_fork(self) -> None:
+        """Detecta execução em um processo filho (pid diferente do criador do pool)"""
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+    
+    def _reset_after_fork(self) -> None:
+        """
+        No processo filho, troca os pools herdados por pools novos e vazios.
+        
+        engine.dispose(close=False) não fecha as conexões herdadas; os pools
+        antigos ficam referenciados para que o coletor de lixo também não as
+        feche (o que encerraria as sessões do processo pai no servidor).
+        As sessionmakers continuam válidas, pois a engine é a mesma.
+        """
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        for engine in (self._engine, self.read_engine):
+            if engine is not None:
+                self._inherited_pools.append(engine.pool)
+                engine.dispose(close=False)
+                engine.pool.metrics.reset()
+    
+    def _create_engine(self, database_url: str, name: str):
+        """
+        Cria uma engine com a configuração de pool do manager (e, no PostgreSQL,
+        connect_timeout e keepalives TCP de settings). O pool é instrumentado
+        (ver pool_stats) e os statements são registrados no histograma de
+        queries e no escopo ativo (ver statement_tracking).
+        """
+        connect_args = connect_options() if make_url(database_url).get_backend_name() == "postgresql" else {}
+        engine = create_engine(
+            database_url,
+            echo=self.echo,
+            connect_args={**connect_args, **pooler_connect_args(database_url)},
+            plugins=[STATEMENT_TRACKING_PLUGIN],
+            **engine_pool_options(self.pool_size, self.max_overflow),
         )
+        engine.pool.metrics.name = name
+        return engine
+    
+    @property
+    def read_database_url(self) -> Optional[str]:
+        """URL da réplica de leitura (mesma URL com DB_READ_HOST/DB_READ_PORT) ou None"""
+        if not replica_configured():
+            return None
+        url = make_url(self.database_url)
+        url = url.set(host=settings.db_read_host, port=settings.db_read_port or url.port)
+        return url.render_as_string(hide_password=False)
+    
+    def _replica_lag(self) -> float:
+        with self.read_engine.connect() as conn:
+            return conn.execute(text(REPLICATION_LAG_SQL)).scalar()
+    
+    def _read_session_factory(self) -> sessionmaker:
+        """Sessionmaker da réplica se configurada e saudável; senão o do primário"""
+        self._check_fork()
+        if not replica_configured():
+            return self.SessionLocal
+        
+        if self.ReadSessionLocal is None:
+            self.read_engine = self._create_engine(
+                self.read_database_url, f"{self.db_type or 'default'}-replica"
+            )
+            self.ReadSessionLocal = sessionmaker(
+                autocommit=False,
+                autoflush=False,
+                bind=self.read_engine,
+            )
+            self._replica_router = ReplicaRouter(
+                self._replica_lag, name=f"{self.db_type or 'default'}-replica"
+            )
+        
+        if self._replica_router.is_available():
+            return self.ReadSessionLocal
+        return self.SessionLocal
+    
+    def pool_stats(self) -> dict:
+        """
+        Métricas do pool do engine: conexões em uso, overflow, espera no
+        checkout (avg/p95/p99/max), idade das conexões e invalidações.
+        
+        Exemplo:
+            stats = get_manager("tdax").pool_stats()
+            if stats["checked_out"] >= stats["size"] + stats["max_overflow"]:
+                ...  # pool esgotado
+        """
+        return self.engine.pool.stats()
     
     def get_session(self) -> Session:
         """Retorna uma nova sessão"""
+        self._check_fork()
         return self.SessionLocal()
     
+    def scoped_session(self) -> Session:
+        """
+        Retorna a sessão do escopo atual, criando-a na primeira chamada.
+        
+        Cada thread e cada task asyncio recebe a própria sessão (todas
+        compartilham o pool do engine); chamadas seguintes no mesmo escopo
+        devolvem a mesma sessão. Uma task filha nunca reaproveita a sessão da
+        task que a criou. Chame remove_scoped_session() ao fim da unidade de
+        trabalho para devolver a conexão ao pool.
+        
+        Exemplo:
+            def processar(empresa_id):
+                session = manager.scoped_session()
+                try:
+                    ...
+                    session.commit()
+                finally:
+                    manager.remove_scoped_session()
+            
+            with ThreadPoolExecutor(8) as executor:
+                executor.map(processar, ids)
+        """
+        owner = _scope_owner()
+        current = self._scoped.get()
+        if current is not None and current[0] == owner:
+            return current[1]
+        session = self.get_session()
+        self._scoped.set((owner, session))
+        return session
+    
+    def remove_scoped_session(self) -> None:
+        """Fecha a sessão do escopo atual (desfazendo o que não foi commitado)"""
+        current = self._scoped.get()
+        if current is None:
+            return
+        if current[0] == _scope_owner():
+            current[1].close()
+        self._scoped.set(None)
+    
+    def _active_unit_of_work(self) -> Optional[Session]:
+        """Sessão da unidade de trabalho aberta pelo escopo atual, se houver"""
+        current = self._unit_of_work.get()
+        if current is not None and current[0] == _scope_owner():
+            return current[1]
+        return None
+    
     @contextmanager
-    def session_scope(self) -> Generator[Session, None, None]:
+    def unit_of_work(self) -> Generator[Session, None, None]:
+        """
+        Unidade de trabalho: uma conexão e uma transação para todas as
+        chamadas de session_scope/get_session feitas dentro do bloco.
+        
+        A sessão usa join_transaction_mode="create_savepoint": o commit de
+        cada session_scope interno (e os session.commit() dos repositórios e
+        do CRUDBase) apenas libera um SAVEPOINT, e o rollback desfaz só o
+        SAVEPOINT. O COMMIT real acontece uma vez, ao sair do bloco; uma
+        exceção que escapa do bloco desfaz tudo. Unidades aninhadas
+        reaproveitam a externa. Threads e tasks filhas não participam da
+        unidade de quem as criou.
+        
+        Exemplo:
+            with manager.unit_of_work():
+                empresa = get_empresa_by_cnpj(cnpj)
+                create_session_gov(empresa.id, ...)
+            # um único COMMIT aqui
+        """
+        session = self._active_unit_of_work()
+        if session is not None:
+            yield session
+            return
+        
+        with statement_scope(f"unit_of_work({self.db_type or 'default'})"):
+            with self.engine.connect() as connection:
+                transaction = connection.begin()
+                session = self.SessionLocal(bind=connection, join_transaction_mode="create_savepoint")
+                token = self._unit_of_work.set((_scope_owner(), session))
+                try:
+                    yield session
+                    session.commit()
+                    transaction.commit()
+                except Exception:
+                    transaction.rollback()
+                    raise
+                finally:
+                    self._unit_of_work.reset(token)
+                    session.close()
+    
+    @contextmanager
+    def session_scope(self, read_only: bool = False) -> Generator[Session, None, None]:
         """
         Context manager para sessão com auto-commit e rollback.
         
+        Com read_only=True a sessão usa a réplica de leitura (DB_READ_HOST), se
+        configurada e com atraso aceitável, e nunca faz commit. Em falha de
+        conexão com a réplica, ela é marcada como indisponível e os próximos
+        escopos voltam ao primário.
+        
+        Os statements do escopo são contados; ao final são logados avisos de
+        N+1 e de orçamento excedido (ver statement_tracking.statement_scope).
+        
+        Dentro de unit_of_work() o escopo usa a sessão da unidade (inclusive
+        com read_only=True, para enxergar o que ainda não foi commitado) e o
+        commit/rollback vale só para o SAVEPOINT do escopo.
+        
         Exemplo:
             manager = DatabaseSessionManager("tdax")
             with manager.session_scope() as session:
                 clientes = session.query(Cliente).all()
+            
+            with manager.session_scope(read_only=True) as session:
+                relatorio = session.query(Pagamento).all()
         """
-        session = self.SessionLocal()
-        try:
-            yield session
-            session.commit()
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+        with statement_scope(f"session_scope({self.db_type or 'default'})"):
+            session = self._active_unit_of_work()
+            if session is not None:
+                try:
+                    yield session
+                    session.commit()
+                except Exception as e:
+                    session.rollback()
+                    raise e
+                return
+            
+            if read_only:
+                session_factory = self._read_session_factory()
+                session = session_factory()
+                try:
+                    yield session
+                except OperationalError as e:
+                    if session_factory is self.ReadSessionLocal:
+                        self._replica_router.mark_down(e)
+                    raise
+                finally:
+                    session.close()
+                return
+            
+            self._check_fork()
+            session = self.SessionLocal()
+            try:
+                yield session
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                raise e
+            finally:
+                session.close()
 
 
 # ==========================================
@@ -95,6 +361,22 @@ class DatabaseSessionManager:
 # ==========================================
 
 _managers: dict[Optional[DatabaseType], DatabaseSessionManager] = {}
+_managers_lock = threading.Lock()
+
+# Todos os managers vivos (inclusive os criados fora de get_manager), para o reset pós-fork
+_live_managers: "weakref.WeakSet[DatabaseSessionManager]" = weakref.WeakSet()
+
+
+def _reset_managers_after_fork() -> None:
+    """Executado no processo filho logo após o fork"""
+    global _managers_lock
+    _managers_lock = threading.Lock()
+    for manager in list(_live_managers):
+        manager._reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_managers_after_fork)
 
 
 def get_manager(db_type: Optional[DatabaseType] = "tdax") -> DatabaseSessionManager:
@@ -112,10 +394,14 @@ def get_manager(db_type: Optional[DatabaseType] = "tdax") -> DatabaseSessionMana
         with manager.session_scope() as session:
             ...
     """
-    if db_type not in _managers:
-        _managers[db_type] = DatabaseSessionManager(db_type=db_type)
+    manager = _managers.get(db_type)
+    if manager is not None:
+        return manager
     
-    return _managers[db_type]
+    with _managers_lock:
+        if db_type not in _managers:
+            _managers[db_type] = DatabaseSessionManager(db_type=db_type)
+        return _managers[db_type]
 
 
 # ==========================================
@@ -124,13 +410,15 @@ def get_manager(db_type: Optional[DatabaseType] = "tdax") -> DatabaseSessionMana
 
 @contextmanager
 def get_session(
-    db_type: Optional[DatabaseType] = "tdax"
+    db_type: Optional[DatabaseType] = "tdax",
+    read_only: bool = False,
 ) -> Generator[Session, None, None]:
     """
     Context manager para obter uma sessão.
     
     Args:
         db_type: "tdax", "automations" ou None
+        read_only: Se True, usa a réplica de leitura (ver session_scope)
     
     Exemplo:
         # TDAX
@@ -144,12 +432,63 @@ def get_session(
         # Padrão (tdax)
         with get_session() as session:
             ...
+    
+    Dentro de unit_of_work(db_type) a sessão é a da unidade de trabalho e o
+    commit só acontece ao final da unidade.
     """
     manager = get_manager(db_type)
-    with manager.session_scope() as session:
+    with manager.session_scope(read_only=read_only) as session:
         yield session
 
 
+@contextmanager
+def unit_of_work(db_type: Optional[DatabaseType] = "tdax") -> Generator[Session, None, None]:
+    """
+    Abre uma unidade de trabalho (ver DatabaseSessionManager.unit_of_work):
+    as funções de repositório chamadas no bloco reaproveitam a mesma sessão
+    via get_session e o COMMIT acontece uma única vez, ao final. Fora de uma
+    unidade de trabalho, get_session continua com commit por chamada.
+    
+    Exemplo:
+        with unit_of_work("tdax"):
+            empresa = get_empresa_by_cnpj(cnpj)
+            create_session_gov(empresa.id, ...)
+            update_organization_status(empresa.id, ...)
+    """
+    with get_manager(db_type).unit_of_work() as session:
+        yield session
+
+
+def get_engine_pool_stats() -> dict:
+    """
+    Métricas do pool de cada manager criado por get_manager, por db_type.
+    
+    Exemplo:
+        get_engine_pool_stats()["tdax"]["wait_p95_ms"]
+    """
+    return {str(db_type): manager.pool_stats() for db_type, manager in list(_managers.items())}
+
+
+def get_scoped_session(db_type: Optional[DatabaseType] = "tdax") -> Session:
+    """
+    Retorna a sessão da thread/task atual (ver DatabaseSessionManager.scoped_session).
+    
+    Exemplo:
+        session = get_scoped_session("tdax")
+        try:
+            ...
+            session.commit()
+        finally:
+            remove_scoped_session("tdax")
+    """
+    return get_manager(db_type).scoped_session()
+
+
+def remove_scoped_session(db_type: Optional[DatabaseType] = "tdax") -> None:
+    """Fecha a sessão da thread/task atual criada por get_scoped_session"""
+    get_manager(db_type).remove_scoped_session()
+
+
 # ==========================================
 # ALIASES PARA COMPATIBILIDADE
 # ==========================================
@@ -0,0 +1,89 @@
+"""
+Snapshots: cópias imutáveis e desacopladas da sessão de registros ORM
+
+Uma instância ORM devolvida depois que o session_scope fez commit e fechou a
+sessão está expirada: cada acesso a atributo tenta recarregar do banco e
+falha com DetachedInstanceError. Um snapshot guarda os valores de todas as
+colunas no momento da leitura; não faz lazy loading nem precisa de sessão.
+
+Exemplo:
+    with get_session("tdax") as session:
+        empresa = empresa_crud.get(session, 1, snapshot=True)
+    empresa.cnpj          # sem nova query
+    empresa.as_dict()     # {"id": 1, "cnpj": "...", ...}
+"""
+import threading
+from dataclasses import fields, make_dataclass
+from typing import Any, Dict, List, Type
+from sqlalchemy import inspect
+
+
+class Snapshot:
+    """
+    Base dos snapshots gerados por model (ex: EmpresasSnapshot).
+
+    As classes são dataclasses congeladas: atribuir um atributo levanta
+    FrozenInstanceError e a comparação é por model e valores.
+    """
+
+    __slots__ = ()
+    model: Any = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Valores das colunas por nome de atributo"""
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+
+_classes: Dict[type, Type[Snapshot]] = {}
+_classes_lock = threading.Lock()
+
+
+def _column_keys(model: type) -> List[str]:
+    return [attr.key for attr in inspect(model).column_attrs]
+
+
+def snapshot_class(model: type) -> Type[Snapshot]:
+    """
+    Classe de snapshot do model (criada uma vez e reaproveitada).
+
+    Exemplo:
+        EmpresasSnapshot = snapshot_class(Empresas)
+    """
+    cls = _classes.get(model)
+    if cls is not None:
+        return cls
+
+    with _classes_lock:
+        if model not in _classes:
+            cls = make_dataclass(
+                f"{model.__name__}Snapshot",
+                [(key, Any) for key in _column_keys(model)],
+                bases=(Snapshot,),
+                frozen=True,
+                namespace={"model": model},
+            )
+            _classes[model] = cls
+        return _classes[model]
+
+
+def snapshot_columns(model: type) -> list:
+    """Colunas do model rotuladas pelo nome do atributo (para session.query(*colunas))"""
+    return [getattr(model, key).label(key) for key in _column_keys(model)]
+
+
+def snapshot_from_row(model: type, row: Any) -> Snapshot:
+    """Cria o snapshot a partir de uma linha de session.query(*snapshot_columns(model))"""
+    return snapshot_class(model)(**row._mapping)
+
+
+def to_snapshot(obj: Any) -> Snapshot:
+    """
+    Cria o snapshot de uma instância ORM (dentro da sessão, antes do commit).
+
+    Exemplo:
+        with get_session("tdax") as session:
+            org = session.get(Organizacoes, org_id)
+            certificado = to_snapshot(org.certificate)
+    """
+    model = type(obj)
+    return snapshot_class(model)(**{key: getattr(obj, key) for key in _column_keys(model)})
@@ -0,0 +1,200 @@
+"""
+Instrumentação das engines SQLAlchemy: duração por statement e detecção de
+N+1 por session_scope
+
+Cada statement executado pelas engines do DatabaseSessionManager é registrado
+no histograma de queries (database.metrics, o mesmo dos helpers psycopg2) e
+contado no escopo ativo. Ao fim do escopo, statements de mesmo formato
+repetidos muitas vezes (lazy loading em loop, ex: Organizacoes.certificate)
+geram um aviso, assim como escopos acima do orçamento de statements ou tempo.
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.dialects import plugins
+from sqlalchemy.engine import CreateEnginePlugin
+from ..settings import settings
+from .metrics import fingerprint, record_query
+
+
+PLUGIN_NAME = "td_statement_tracking"
+
+_START_TIMES = "td_statement_started"
+
+
+class StatementScope:
+    """
+    Statements executados dentro de um escopo (normalmente um session_scope).
+
+    Exemplo:
+        with statement_scope("importar_dctf") as scope:
+            ...
+        scope.summary()["statements"]
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.statements = 0
+        self.seconds = 0.0
+        self.by_fingerprint: Counter = Counter()
+        self.seconds_by_fingerprint: Counter = Counter()
+
+    def record(self, key: str, seconds: float) -> None:
+        self.statements += 1
+        self.seconds += seconds
+        self.by_fingerprint[key] += 1
+        self.seconds_by_fingerprint[key] += seconds
+
+    def merge(self, other: "StatementScope") -> None:
+        """Soma os statements de um escopo aninhado"""
+        self.statements += other.statements
+        self.seconds += other.seconds
+        self.by_fingerprint.update(other.by_fingerprint)
+        self.seconds_by_fingerprint.update(other.seconds_by_fingerprint)
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """SELECTs de mesmo formato executados threshold vezes ou mais (suspeita de N+1)"""
+        return {
+            key: count
+            for key, count in self.by_fingerprint.most_common()
+            if count >= threshold and key.lstrip("( ").upper().startswith("SELECT")
+        }
+
+    def summary(self, top: int = 5) -> Dict[str, Any]:
+        """Resumo do escopo: total de statements, tempo e os formatos mais executados"""
+        return {
+            "name": self.name,
+            "statements": self.statements,
+            "seconds": round(self.seconds, 6),
+            "top": [
+                {
+                    "statement": key,
+                    "count": count,
+                    "seconds": round(self.seconds_by_fingerprint[key], 6),
+                }
+                for key, count in self.by_fingerprint.most_common(top)
+            ],
+        }
+
+    def report(self) -> None:
+        """Loga suspeitas de N+1 e o resumo se o orçamento foi excedido"""
+        threshold = settings.db_n_plus_one_threshold
+        if threshold:
+            for key, count in self.repeated(threshold).items():
+                logger.warning(f"Possível N+1 em {self.name}: {count}x {key[:300]}")
+
+        statement_budget = settings.db_scope_statement_budget
+        time_budget = settings.db_scope_time_budget
+        over_count = statement_budget is not None and self.statements > statement_budget
+        over_time = time_budget is not None and self.seconds > time_budget
+        if over_count or over_time:
+            summary = self.summary()
+            top = "; ".join(f"{item['count']}x {item['statement'][:120]}" for item in summary["top"])
+            logger.warning(
+                f"Escopo {self.name} acima do orçamento: {self.statements} statements "
+                f"em {self.seconds * 1000:.0f} ms. Mais executados: {top}"
+            )
+
+
+_current_scope: ContextVar[Optional[StatementScope]] = ContextVar("db_statement_scope", default=None)
+
+
+@contextmanager
+def statement_scope(name: str = "session_scope") -> Iterator[StatementScope]:
+    """
+    Conta os statements SQLAlchemy executados no bloco e, ao final, avisa
+    sobre N+1 (settings.db_n_plus_one_threshold) e orçamento excedido
+    (settings.db_scope_statement_budget / db_scope_time_budget). Escopos
+    aninhados somam seus statements no escopo externo, que é o único a
+    avisar (assim cada statement é reportado uma vez).
+
+    Exemplo:
+        with statement_scope("listar_certificados"):
+            for org in session.query(Organizacoes):
+                org.certificate  # lazy load por organização -> aviso de N+1
+    """
+    scope = StatementScope(name)
+    parent = _current_scope.get()
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+        if parent is None:
+            scope.report()
+        else:
+            parent.merge(scope)
+
+
+def current_scope() -> Optional[StatementScope]:
+    """Retorna o escopo de statements ativo no contexto atual"""
+    return _current_scope.get()
+
+
+# ==========================================
+# EVENTOS DA ENGINE
+# ==========================================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_START_TIMES, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info[_START_TIMES].pop()
+    _record(statement, parameters, time.perf_counter() - started, rows=cursor.rowcount)
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    started_times = conn.info.get(_START_TIMES) if conn is not None else None
+    if not started_times or exception_context.statement is None:
+        return
+    seconds = time.perf_counter() - started_times.pop()
+    _record(
+        exception_context.statement,
+        exception_context.parameters,
+        seconds,
+        error=exception_context.original_exception,
+    )
+
+
+def _record(statement: str, parameters: Any, seconds: float, rows: Any = None, error: Any = None) -> None:
+    record_query(statement, parameters, seconds, rows=rows, error=error)
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.record(fingerprint(statement), seconds)
+
+
+def instrument_engine(engine) -> None:
+    """
+    Registra os eventos de instrumentação em uma engine síncrona.
+
+    Exemplo:
+        engine = create_engine(url)
+        instrument_engine(engine)
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class StatementTrackingPlugin(CreateEnginePlugin):
+    """
+    Plugin de create_engine que instrumenta a engine criada.
+
+    Exemplo:
+        create_engine(url, plugins=["td_statement_tracking"])
+    """
+
+    def update_url(self, url):
+        return url
+
+    def engine_created(self, engine) -> None:
+        instrument_engine(engine)
+
+
+plugins.register(PLUGIN_NAME, __name__, "StatementTrackingPlugin")
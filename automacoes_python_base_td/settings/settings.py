@@ -50,7 +50,69 @@ class AppSettings(BaseSettings):
     db_user: str
     db_password: str
     db_name: str = Field(default="tdax")
-    
+
+    # Réplica de leitura (opcional): fetch_all/fetch_one e session_scope(read_only=True)
+    db_read_host: Optional[str] = Field(default=None)
+    db_read_port: Optional[int] = Field(default=None)  # padrão: db_port
+    db_read_max_lag: Optional[float] = Field(default=None)  # segundos; None = sem verificação
+    db_read_check_interval: float = Field(default=10.0)  # validade da verificação da réplica
+
+    # Pool de conexões psycopg2 (execute_query, fetch_all, fetch_one, ...)
+    db_pool_enabled: bool = Field(default=True)
+    db_pool_min_size: int = Field(default=1)
+    db_pool_max_size: int = Field(default=10)
+    db_pool_max_lifetime: float = Field(default=3600.0)  # segundos
+    db_pool_idle_timeout: float = Field(default=300.0)  # segundos
+    db_pool_timeout: float = Field(default=30.0)  # espera por conexão livre
+    db_pool_ping_interval: float = Field(default=30.0)  # ociosidade para validar com SELECT 1
+
+    # Pool das engines SQLAlchemy (DatabaseSessionManager, get_manager, sessões assíncronas)
+    db_engine_pool_size: int = Field(default=5)
+    db_engine_max_overflow: int = Field(default=10)  # conexões extras além de pool_size
+    db_engine_pool_timeout: float = Field(default=30.0)  # espera por conexão livre
+    db_engine_pool_recycle: Optional[float] = Field(default=None)  # idade máxima da conexão; None = sem limite
+    db_engine_pool_pre_ping: bool = Field(default=True)  # SELECT 1 no checkout; False = só invalida na falha
+    db_engine_pool_use_lifo: bool = Field(default=False)  # reusa a conexão mais recente (ociosas expiram no servidor)
+    # "transaction" = atrás de PgBouncer em pool_mode=transaction: NullPool e sem prepared statements
+    db_pooler_mode: Literal["session", "transaction"] = Field(default="session")
+
+    # Métricas do pool das engines SQLAlchemy (DatabaseSessionManager)
+    db_engine_pool_wait_warning: Optional[float] = Field(default=1.0)  # segundos de checkout; None = sem aviso
+    db_engine_pool_log_interval: Optional[float] = Field(default=None)  # segundos entre logs de status; None = desliga
+
+    # Statements SQLAlchemy por session_scope (N+1 e orçamento)
+    db_n_plus_one_threshold: Optional[int] = Field(default=10)  # mesmo SELECT repetido no escopo; None = desliga
+    db_scope_statement_budget: Optional[int] = Field(default=100)  # statements por escopo; None = sem limite
+    db_scope_time_budget: Optional[float] = Field(default=None)  # segundos de SQL por escopo; None = sem limite
+
+    # Resiliência de conexão (DatabaseConnection, pool e engines SQLAlchemy)
+    db_connect_timeout: int = Field(default=10)  # segundos; 0 = sem limite
+    db_connect_retries: int = Field(default=3)  # novas tentativas em falha transitória
+    db_connect_backoff: float = Field(default=0.1)  # espera inicial (dobra a cada falha, com jitter)
+    db_connect_max_backoff: float = Field(default=5.0)
+    db_keepalives_idle: int = Field(default=30)  # segundos ocioso até o 1º probe; 0 = desliga
+    db_keepalives_interval: int = Field(default=10)  # segundos entre probes
+    db_keepalives_count: int = Field(default=3)  # probes sem resposta até a queda
+    db_read_retries: int = Field(default=1)  # repetições de leitura após queda de conexão
+
+    # Prepared statements em conexões do pool (opt-in)
+    db_prepared_statements: bool = Field(default=False)
+    db_prepared_cache_size: int = Field(default=100)  # statements por conexão (LRU)
+
+    # Cache de resultados (fetch_all/fetch_one com cache=True)
+    db_cache_ttl: float = Field(default=60.0)  # segundos
+    db_cache_max_size: int = Field(default=1024)  # entradas (LRU)
+
+    # Timeout e métricas de queries (helpers de database.connection)
+    db_statement_timeout: Optional[float] = Field(default=None)  # segundos; None = sem limite
+    db_slow_query_threshold: Optional[float] = Field(default=1.0)  # segundos; None = sem log
+    db_query_stats_max_fingerprints: int = Field(default=500)  # queries distintas no histograma
+
+    # LISTEN/NOTIFY (database.notify)
+    db_notify_poll_interval: float = Field(default=1.0)  # segundos por ciclo de espera
+    db_notify_reconnect_delay: float = Field(default=1.0)  # espera inicial (dobra a cada falha)
+    db_notify_max_reconnect_delay: float = Field(default=30.0)
+
     # ==========================================
     # AWS
     # ==========================================
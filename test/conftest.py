@@ -79,6 +79,14 @@ def mock_psycopg2_connect(monkeypatch, mock_db_connection):
     return conn, cursor
 
 
+@pytest.fixture(autouse=True)
+def reset_connection_pools():
+    """Fecha os pools de conexão do processo após cada teste (evita reaproveitar mocks)"""
+    yield
+    from automacoes_python_base_td.database.pool import close_all_pools
+    close_all_pools()
+
+
 # Fixtures para mock de SQLAlchemy
 @pytest.fixture
 def mock_sqlalchemy_session():
@@ -5,7 +5,7 @@ Testa funcionalidade, exceções e logs
 import pytest
 from unittest.mock import patch, MagicMock
 from botocore.exceptions import ClientError
-from automacoes_python_base_td.aws.s3 import S3Client
+from automacoes_python_base_td.aws.s3 import S3Client, S3MultipartWriter, MIN_PART_SIZE
 from automacoes_python_base_td.core.exceptions import S3Exception
 
 
@@ -89,3 +89,66 @@ class TestS3Client:
         assert "ExtraArgs" in call_args[1]
         assert "Metadata" in call_args[1]["ExtraArgs"]
 
+
+
+class TestS3MultipartWriter:
+    """Testes para S3MultipartWriter (upload em streaming)"""
+    
+    def _writer(self, mock_boto_client, part_size=MIN_PART_SIZE):
+        mock_client = MagicMock()
+        mock_client.create_multipart_upload.return_value = {"UploadId": "up-1"}
+        mock_client.upload_part.side_effect = lambda **kwargs: {"ETag": f"etag-{kwargs['PartNumber']}"}
+        mock_boto_client.return_value = mock_client
+        s3 = S3Client(aws_access_key_id="test", aws_secret_access_key="test")
+        return s3.open_multipart_writer("my-bucket", "exports/big.csv", part_size=part_size), mock_client
+    
+    @patch('boto3.client')
+    def test_small_payload_uses_put_object(self, mock_boto_client):
+        """Testa que conteúdo menor que uma parte vira um único put_object"""
+        writer, mock_client = self._writer(mock_boto_client)
+        
+        with writer:
+            writer.write(b"abc")
+        
+        mock_client.put_object.assert_called_once_with(Bucket="my-bucket", Key="exports/big.csv", Body=b"abc")
+        mock_client.create_multipart_upload.assert_not_called()
+    
+    @patch('boto3.client')
+    def test_multipart_upload_in_parts(self, mock_boto_client):
+        """Testa envio em partes de part_size e conclusão do upload"""
+        writer, mock_client = self._writer(mock_boto_client)
+        chunk = b"x" * (1024 * 1024)
+        
+        with writer:
+            for _ in range(11):
+                writer.write(chunk)
+        
+        sizes = [len(call.kwargs["Body"]) for call in mock_client.upload_part.call_args_list]
+        assert sizes == [MIN_PART_SIZE, MIN_PART_SIZE, 1024 * 1024]
+        parts = mock_client.complete_multipart_upload.call_args.kwargs["MultipartUpload"]["Parts"]
+        assert parts == [
+            {"ETag": "etag-1", "PartNumber": 1},
+            {"ETag": "etag-2", "PartNumber": 2},
+            {"ETag": "etag-3", "PartNumber": 3},
+        ]
+        assert writer.bytes_written == 11 * 1024 * 1024
+    
+    @patch('boto3.client')
+    def test_error_aborts_upload(self, mock_boto_client):
+        """Testa que exceção no bloco aborta o multipart upload"""
+        writer, mock_client = self._writer(mock_boto_client)
+        
+        with pytest.raises(RuntimeError):
+            with writer:
+                writer.write(b"x" * MIN_PART_SIZE)
+                raise RuntimeError("falha na exportação")
+        
+        mock_client.abort_multipart_upload.assert_called_once_with(
+            Bucket="my-bucket", Key="exports/big.csv", UploadId="up-1"
+        )
+        mock_client.complete_multipart_upload.assert_not_called()
+    
+    def test_part_size_minimum(self):
+        """Testa validação do tamanho mínimo da parte"""
+        with pytest.raises(ValueError):
+            S3MultipartWriter(MagicMock(), "b", "k", part_size=1024)
@@ -0,0 +1,317 @@
+"""
+Testes para conexões PostgreSQL assíncronas (database.aio)
+Testa helpers assíncronos, streaming, COPY e exceções
+"""
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+from automacoes_python_base_td.database import aio
+from automacoes_python_base_td.settings import settings
+from automacoes_python_base_td.core.exceptions import (
+    DatabaseConnectionError,
+    DatabaseQueryError,
+    DatabaseTimeoutError,
+)
+
+psycopg = pytest.importorskip("psycopg")
+
+
+def _fake_pool(cursor=None, error=None):
+    """Pool falso cujo connection() entrega uma conexão com o cursor informado"""
+    cursor = cursor or MagicMock()
+    cursor.__aenter__ = AsyncMock(return_value=cursor)
+    cursor.__aexit__ = AsyncMock(return_value=False)
+    conn = MagicMock(closed=False)
+    conn.cursor.return_value = cursor
+
+    @asynccontextmanager
+    async def connection():
+        if error is not None:
+            raise error
+        yield conn
+
+    pool = MagicMock()
+    pool.connection = connection
+    return pool, conn, cursor
+
+
+def _patch_pool(pool):
+    return patch.object(aio, "get_pool", AsyncMock(return_value=pool))
+
+
+class TestHelpers:
+    """Testes para execute_query, execute_many, fetch_all e fetch_one"""
+
+    def test_execute_query_returns_rowcount(self):
+        """Testa que execute_query retorna linhas afetadas"""
+        cursor = MagicMock(execute=AsyncMock(), rowcount=3)
+        pool, _, _ = _fake_pool(cursor)
+
+        with _patch_pool(pool):
+            result = asyncio.run(aio.execute_query("UPDATE t SET a = %s", (1,)))
+
+        assert result == 3
+        cursor.execute.assert_awaited_once_with("UPDATE t SET a = %s", (1,))
+
+    def test_execute_many(self):
+        """Testa executemany assíncrono"""
+        cursor = MagicMock(executemany=AsyncMock(), rowcount=2)
+        pool, _, _ = _fake_pool(cursor)
+
+        with _patch_pool(pool):
+            result = asyncio.run(aio.execute_many("INSERT INTO t VALUES (%s)", [(1,), (2,)]))
+
+        assert result == 2
+        cursor.executemany.assert_awaited_once()
+
+    def test_fetch_all_uses_dict_rows(self):
+        """Testa que fetch_all retorna dicts por padrão"""
+        cursor = MagicMock(execute=AsyncMock(), fetchall=AsyncMock(return_value=[{"id": 1}]))
+        pool, conn, _ = _fake_pool(cursor)
+
+        with _patch_pool(pool):
+            result = asyncio.run(aio.fetch_all("SELECT * FROM t"))
+
+        assert result == [{"id": 1}]
+        assert conn.cursor.call_args.kwargs["row_factory"] is aio.dict_row
+
+    def test_fetch_one_as_tuple(self):
+        """Testa fetch_one com as_dict=False"""
+        cursor = MagicMock(execute=AsyncMock(), fetchone=AsyncMock(return_value=(1,)))
+        pool, conn, _ = _fake_pool(cursor)
+
+        with _patch_pool(pool):
+            result = asyncio.run(aio.fetch_one("SELECT 1", as_dict=False))
+
+        assert result == (1,)
+        assert conn.cursor.call_args.kwargs["row_factory"] is None
+
+    def test_query_error_is_wrapped(self):
+        """Testa que erros do psycopg viram DatabaseQueryError"""
+        cursor = MagicMock(execute=AsyncMock(side_effect=psycopg.errors.SyntaxError("erro")))
+        pool, _, _ = _fake_pool(cursor)
+
+        with _patch_pool(pool):
+            with pytest.raises(DatabaseQueryError):
+                asyncio.run(aio.fetch_all("SELEC 1"))
+
+    def test_connection_error_is_wrapped(self):
+        """Testa que falha de conexão (ou pool esgotado) vira DatabaseConnectionError"""
+        pool, _, _ = _fake_pool(error=psycopg.OperationalError("sem conexão"))
+
+        with _patch_pool(pool):
+            with pytest.raises(DatabaseConnectionError):
+                asyncio.run(aio.fetch_all("SELECT 1"))
+
+    def test_query_canceled_in_body_is_timeout(self):
+        """Testa que statement_timeout na query vira DatabaseTimeoutError, não erro de conexão"""
+        cursor = MagicMock(execute=AsyncMock(side_effect=psycopg.errors.QueryCanceled("canceling statement due to statement timeout")))
+        pool, _, _ = _fake_pool(cursor)
+
+        with _patch_pool(pool):
+            with pytest.raises(DatabaseTimeoutError):
+                asyncio.run(aio.fetch_all("SELECT pg_sleep(10)"))
+
+    def test_lost_connection_in_body_is_connection_error(self):
+        """Testa que conexão perdida durante a query vira DatabaseConnectionError"""
+        cursor = MagicMock(execute=AsyncMock(side_effect=psycopg.OperationalError("server closed the connection")))
+        pool, conn, _ = _fake_pool(cursor)
+        conn.closed = True
+
+        with _patch_pool(pool):
+            with pytest.raises(DatabaseConnectionError):
+                asyncio.run(aio.fetch_all("SELECT 1"))
+
+    def test_timeout_sets_statement_timeout(self):
+        """Testa que timeout= aplica statement_timeout na transação antes da query"""
+        cursor = MagicMock(execute=AsyncMock(), fetchall=AsyncMock(return_value=[]))
+        pool, conn, _ = _fake_pool(cursor)
+        conn.execute = AsyncMock()
+
+        with _patch_pool(pool):
+            asyncio.run(aio.fetch_all("SELECT * FROM t", timeout=2.5))
+
+        conn.execute.assert_awaited_once_with("SELECT set_config('statement_timeout', %s, true)", ("2500",))
+        cursor.execute.assert_awaited_once_with("SELECT * FROM t", None)
+
+    def test_write_invalidates_query_cache(self):
+        """Testa que escritas assíncronas invalidam o cache de resultados"""
+        cursor = MagicMock(execute=AsyncMock(), rowcount=1)
+        pool, _, _ = _fake_pool(cursor)
+
+        with _patch_pool(pool):
+            with patch.object(aio, "get_query_cache") as mock_cache:
+                asyncio.run(aio.execute_query("DELETE FROM empresas WHERE id = %s", (1,)))
+
+        mock_cache.return_value.invalidate.assert_called_once_with({"empresas"})
+
+
+class TestFetchIter:
+    """Testes para fetch_iter assíncrono"""
+
+    def _collect(self, **kwargs):
+        cursor = MagicMock(
+            execute=AsyncMock(),
+            fetchmany=AsyncMock(side_effect=[[1, 2], [3], []]),
+            close=AsyncMock(),
+        )
+        pool, conn, _ = _fake_pool(cursor)
+
+        async def run():
+            return [item async for item in aio.fetch_iter("SELECT * FROM t", batch_size=2, **kwargs)]
+
+        with _patch_pool(pool):
+            return asyncio.run(run()), conn, cursor
+
+    def test_streams_rows_with_server_cursor(self):
+        """Testa streaming linha a linha com cursor nomeado"""
+        rows, conn, cursor = self._collect()
+
+        assert rows == [1, 2, 3]
+        assert conn.cursor.call_args.kwargs["name"].startswith("fetch_iter_")
+        cursor.fetchmany.assert_awaited_with(2)
+        cursor.close.assert_awaited_once()
+
+    def test_batches(self):
+        """Testa streaming em lotes"""
+        rows, _, _ = self._collect(batches=True)
+
+        assert rows == [[1, 2], [3]]
+
+
+class TestCopyRows:
+    """Testes para copy_rows assíncrono"""
+
+    def _copy(self, rows):
+        copy = MagicMock(write_row=AsyncMock())
+        copy.__aenter__ = AsyncMock(return_value=copy)
+        copy.__aexit__ = AsyncMock(return_value=False)
+        cursor = MagicMock()
+        cursor.copy.return_value = copy
+        pool, _, _ = _fake_pool(cursor)
+
+        with _patch_pool(pool):
+            stats = asyncio.run(aio.copy_rows("public.pagamentos", ["cnpj", "valor"], rows))
+        return stats, cursor, copy
+
+    def test_copy_sync_iterable(self):
+        """Testa COPY a partir de uma lista"""
+        stats, cursor, copy = self._copy([("1", 10), ("2", 20)])
+
+        assert stats["rows"] == 2
+        assert copy.write_row.await_count == 2
+        copy_sql = cursor.copy.call_args[0][0]
+        assert copy_sql.as_string() == 'COPY "public"."pagamentos" ("cnpj", "valor") FROM STDIN'
+
+    def test_copy_async_iterable(self):
+        """Testa COPY a partir de um generator assíncrono"""
+        async def rows():
+            for i in range(3):
+                yield (str(i), i)
+
+        stats, _, copy = self._copy(rows())
+
+        assert stats["rows"] == 3
+        copy.write_row.assert_awaited_with(("2", 2))
+
+
+class TestPools:
+    """Testes para o registro de pools assíncronos"""
+
+    def test_get_pool_reuses_pool_per_target(self):
+        """Testa que o mesmo destino reaproveita o pool"""
+        async def run():
+            with patch.object(aio, "AsyncConnectionPool") as mock_pool_class:
+                mock_pool_class.return_value.open = AsyncMock()
+                mock_pool_class.return_value.close = AsyncMock()
+                first = await aio.get_pool(host="h1")
+                second = await aio.get_pool(host="h1")
+                await aio.close_all_pools()
+                return first, second, mock_pool_class
+
+        first, second, mock_pool_class = asyncio.run(run())
+
+        assert first is second
+        assert mock_pool_class.call_count == 1
+        assert mock_pool_class.call_args.kwargs["open"] is False
+        first.close.assert_awaited_once()
+        assert aio._pools == {}
+
+    def test_pool_uses_connect_options(self, monkeypatch):
+        """Testa que as conexões assíncronas recebem connect_timeout e keepalives"""
+        monkeypatch.setattr(settings, "db_connect_timeout", 5)
+        monkeypatch.setattr(settings, "db_keepalives_idle", 30)
+
+        async def run():
+            with patch.object(aio, "AsyncConnectionPool") as mock_pool_class:
+                mock_pool_class.return_value.open = AsyncMock()
+                mock_pool_class.return_value.close = AsyncMock()
+                await aio.get_pool(host="h1")
+                await aio.close_all_pools()
+                return mock_pool_class
+
+        kwargs = asyncio.run(run()).call_args.kwargs["kwargs"]
+
+        assert kwargs["connect_timeout"] == 5
+        assert kwargs["keepalives"] == 1
+        assert kwargs["keepalives_idle"] == 30
+
+    def test_transaction_pooler_disables_prepare_and_idle_connections(self, monkeypatch):
+        """Testa que atrás de PgBouncer (transaction) o pool não prepara statements nem guarda conexões ociosas"""
+        monkeypatch.setattr(settings, "db_pooler_mode", "transaction")
+
+        async def run():
+            with patch.object(aio, "AsyncConnectionPool") as mock_pool_class:
+                mock_pool_class.return_value.open = AsyncMock()
+                mock_pool_class.return_value.close = AsyncMock()
+                await aio.get_pool(host="h1")
+                await aio.close_all_pools()
+                return mock_pool_class
+
+        call = asyncio.run(run()).call_args
+
+        assert call.kwargs["kwargs"]["prepare_threshold"] is None
+        assert call.kwargs["min_size"] == 0
+        assert call.kwargs["max_idle"] <= 10.0
+
+    def test_session_pooler_keeps_defaults(self, monkeypatch):
+        """Testa que no modo session o pool segue settings.db_pool_*"""
+        monkeypatch.setattr(settings, "db_pooler_mode", "session")
+
+        async def run():
+            with patch.object(aio, "AsyncConnectionPool") as mock_pool_class:
+                mock_pool_class.return_value.open = AsyncMock()
+                mock_pool_class.return_value.close = AsyncMock()
+                await aio.get_pool(host="h1")
+                await aio.close_all_pools()
+                return mock_pool_class
+
+        call = asyncio.run(run()).call_args
+
+        assert "prepare_threshold" not in call.kwargs["kwargs"]
+        assert call.kwargs["min_size"] == settings.db_pool_min_size
+        assert call.kwargs["max_idle"] == settings.db_pool_idle_timeout
+
+    def test_new_event_loop_gets_new_pool(self):
+        """Testa que um segundo asyncio.run não reaproveita o pool do loop anterior"""
+        async def run():
+            return await aio.get_pool(host="h1")
+
+        with patch.object(aio, "AsyncConnectionPool") as mock_pool_class:
+            mock_pool_class.side_effect = lambda **kwargs: MagicMock(open=AsyncMock(), close=AsyncMock())
+            first = asyncio.run(run())
+            second = asyncio.run(run())
+
+        assert first is not second
+        assert mock_pool_class.call_count == 2
+        assert len(aio._pools) == 1
+        aio._pools.clear()
+
+    def test_fork_forgets_pools(self):
+        """Testa que o processo filho não herda os pools do pai"""
+        aio._pools[("loop", "h1")] = (MagicMock(), MagicMock())
+
+        aio._reset_pools_after_fork()
+
+        assert aio._pools == {}
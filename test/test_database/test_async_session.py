@@ -0,0 +1,195 @@
+"""
+Testes para sessões SQLAlchemy assíncronas e AsyncCRUDBase
+Testa conversão de URL, manager assíncrono e operações do CRUD
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import SQLAlchemyError
+from automacoes_python_base_td.database.models.base import Base
+from automacoes_python_base_td.database import async_session
+from automacoes_python_base_td.database.async_session import async_database_url
+from automacoes_python_base_td.database.repositories.async_crud import AsyncCRUDBase
+from automacoes_python_base_td.core.exceptions import DatabaseQueryError, ModelNotFoundError
+
+
+class AsyncUser(Base):
+    """Model de teste para AsyncCRUDBase"""
+    __tablename__ = "test_async_users"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100))
+    ativo = Column(Boolean, default=True)
+
+
+def _session(first=None):
+    """AsyncSession falsa: scalars() devolve um resultado com first()/all()"""
+    session = MagicMock()
+    result = MagicMock()
+    result.first.return_value = first
+    result.all.return_value = [first] if first is not None else []
+    session.scalars = AsyncMock(return_value=result)
+    session.scalar = AsyncMock(return_value=3)
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+    session.refresh = AsyncMock()
+    return session
+
+
+class TestAsyncDatabaseUrl:
+    """Testes para async_database_url()"""
+
+    def test_converts_postgres_driver(self):
+        """Testa troca do driver para psycopg 3"""
+        assert async_database_url("postgresql://u:p@h:5432/tdax") == "postgresql+psycopg://u:p@h:5432/tdax"
+        assert async_database_url("postgresql+psycopg2://u:p@h/tdax") == "postgresql+psycopg://u:p@h/tdax"
+
+    def test_keeps_other_drivers(self):
+        """Testa que drivers assíncronos explícitos são mantidos"""
+        assert async_database_url("postgresql+asyncpg://u:p@h/tdax") == "postgresql+asyncpg://u:p@h/tdax"
+
+
+class TestAsyncDatabaseSessionManager:
+    """Testes para AsyncDatabaseSessionManager"""
+
+    @pytest.fixture(autouse=True)
+    def asyncio_extra(self):
+        pytest.importorskip("greenlet")
+
+    def test_creates_async_engine(self):
+        """Testa criação da engine assíncrona sem expirar objetos no commit"""
+        with patch.object(async_session, "create_async_engine") as mock_engine:
+            with patch.object(async_session, "async_sessionmaker") as mock_sessionmaker:
+                manager = async_session.AsyncDatabaseSessionManager(database_url="postgresql://u:p@h/tdax")
+
+        assert mock_engine.call_args.args[0] == "postgresql+psycopg://u:p@h/tdax"
+        assert mock_sessionmaker.call_args.kwargs["expire_on_commit"] is False
+        assert manager.engine is mock_engine.return_value
+
+    def test_session_scope_commits_or_rolls_back(self):
+        """Testa commit ao final e rollback em erro"""
+        session = _session()
+        session.close = AsyncMock()
+        with patch.object(async_session, "create_async_engine"):
+            with patch.object(async_session, "async_sessionmaker") as mock_sessionmaker:
+                mock_sessionmaker.return_value.return_value = session
+                manager = async_session.AsyncDatabaseSessionManager(database_url="postgresql://u:p@h/tdax")
+
+        async def run():
+            async with manager.session_scope():
+                pass
+            with pytest.raises(RuntimeError):
+                async with manager.session_scope():
+                    raise RuntimeError("falha")
+
+        asyncio.run(run())
+
+        session.commit.assert_awaited_once()
+        session.rollback.assert_awaited_once()
+        assert session.close.await_count == 2
+
+
+class TestAsyncCRUDBase:
+    """Testes para AsyncCRUDBase"""
+
+    def test_get_filters_active(self):
+        """Testa get com filtro de ativos"""
+        user = AsyncUser(id=1, name="João", ativo=True)
+        session = _session(user)
+
+        result = asyncio.run(AsyncCRUDBase(AsyncUser).get(session, 1))
+
+        assert result is user
+        query = str(session.scalars.call_args.args[0])
+        assert "test_async_users.ativo" in query
+        assert "test_async_users.id" in query
+
+    def test_filter_ignores_unknown_columns(self):
+        """Testa filtros de igualdade apenas com colunas do model"""
+        session = _session(AsyncUser(id=1, name="João"))
+
+        asyncio.run(AsyncCRUDBase(AsyncUser).filter(session, name="João", inexistente=1))
+
+        query = str(session.scalars.call_args.args[0])
+        assert "test_async_users.name" in query
+        assert "inexistente" not in query
+
+    def test_create_rolls_back_on_error(self):
+        """Testa rollback e DatabaseQueryError quando o commit falha"""
+        session = _session()
+        session.commit.side_effect = SQLAlchemyError("violação de constraint")
+
+        with pytest.raises(DatabaseQueryError):
+            asyncio.run(AsyncCRUDBase(AsyncUser).create(session, {"name": "João"}))
+
+        session.add.assert_called_once()
+        session.rollback.assert_awaited_once()
+
+    def test_create_many_wraps_error(self):
+        """Testa rollback e DatabaseQueryError quando um lote falha"""
+        session = _session()
+        session.scalars.side_effect = SQLAlchemyError("violação de constraint")
+
+        with pytest.raises(DatabaseQueryError) as exc_info:
+            asyncio.run(AsyncCRUDBase(AsyncUser).create_many(session, [{"name": "A"}, {"name": "B"}]))
+
+        assert exc_info.value.details["rows"] == 2
+        assert isinstance(exc_info.value.__cause__, SQLAlchemyError)
+        session.rollback.assert_awaited_once()
+        session.commit.assert_not_awaited()
+
+    def test_update_and_not_found(self):
+        """Testa update e ModelNotFoundError para registro inexistente"""
+        user = AsyncUser(id=1, name="Antigo", ativo=True)
+        crud = AsyncCRUDBase(AsyncUser)
+
+        result = asyncio.run(crud.update(_session(user), 1, {"name": "Novo"}))
+        assert result.name == "Novo"
+
+        with pytest.raises(ModelNotFoundError):
+            asyncio.run(crud.update(_session(None), 999, {"name": "Novo"}))
+
+    def test_delete_is_soft(self):
+        """Testa soft delete (ativo=False)"""
+        user = AsyncUser(id=1, name="João", ativo=True)
+        session = _session(user)
+
+        assert asyncio.run(AsyncCRUDBase(AsyncUser).delete(session, 1)) is True
+        assert user.ativo is False
+        session.commit.assert_awaited_once()
+
+    def test_upsert_with_conflict_columns_is_one_statement(self):
+        """Testa upsert atômico com INSERT ... ON CONFLICT, sem SELECT antes"""
+        user = AsyncUser(id=1, name="João", ativo=True)
+        session = _session(user)
+        session.get_bind.return_value.dialect.name = "postgresql"
+
+        result = asyncio.run(AsyncCRUDBase(AsyncUser).upsert(session, {"ativo": True}, conflict_columns=["name"], name="João"))
+
+        assert result is user
+        session.scalars.assert_awaited_once()
+        statement, rows = session.scalars.call_args.args
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (name) DO UPDATE SET ativo = excluded.ativo" in sql
+        assert rows == [{"name": "João", "ativo": True}]
+        session.commit.assert_awaited_once()
+
+    def test_upsert_with_conflict_columns_wraps_error(self):
+        """Testa rollback e DatabaseQueryError quando o ON CONFLICT falha"""
+        session = _session()
+        session.get_bind.return_value.dialect.name = "postgresql"
+        session.scalars.side_effect = SQLAlchemyError("sem índice único")
+
+        with pytest.raises(DatabaseQueryError):
+            asyncio.run(AsyncCRUDBase(AsyncUser).upsert(session, {"ativo": True}, conflict_columns=["name"], name="João"))
+
+        session.rollback.assert_awaited_once()
+
+    def test_count(self):
+        """Testa contagem com SELECT count(*)"""
+        session = _session()
+
+        assert asyncio.run(AsyncCRUDBase(AsyncUser).count(session)) == 3
+        assert "count(*)" in str(session.scalar.call_args.args[0])
@@ -0,0 +1,149 @@
+"""
+Testes para o cache de resultados
+Testa TTL, LRU, tags por tabela e integração com fetch_all/execute_query
+"""
+import pytest
+from unittest.mock import MagicMock, Mock, patch
+from automacoes_python_base_td.database.cache import (
+    QueryCache,
+    extract_read_tables,
+    extract_write_tables,
+    get_query_cache,
+)
+from automacoes_python_base_td.database.connection import (
+    fetch_all,
+    fetch_one,
+    execute_query,
+    transaction,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_query_cache():
+    """Limpa o cache global entre testes"""
+    get_query_cache().clear()
+    yield
+    get_query_cache().clear()
+
+
+@pytest.fixture
+def mock_cursor():
+    """Mocka get_connection e retorna o cursor"""
+    with patch('automacoes_python_base_td.database.connection.get_connection') as mock_get_connection:
+        mock_conn = MagicMock()
+        cursor = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = Mock(return_value=cursor)
+        mock_conn.cursor.return_value.__exit__ = Mock(return_value=False)
+        mock_get_connection.return_value.__enter__ = Mock(return_value=mock_conn)
+        mock_get_connection.return_value.__exit__ = Mock(return_value=False)
+        yield cursor
+
+
+class TestTableExtraction:
+    """Testes para extração de tabelas das queries"""
+    
+    def test_extract_read_tables(self):
+        """Testa tabelas de FROM e JOIN com schema e aspas"""
+        query = 'SELECT * FROM public.empresas e JOIN "Organizacoes" o ON o.empresa_id = e.id'
+        
+        assert extract_read_tables(query) == {"empresas", "organizacoes"}
+    
+    def test_extract_write_tables(self):
+        """Testa tabelas de INSERT, UPDATE e DELETE"""
+        assert extract_write_tables("INSERT INTO empresas (cnpj) VALUES (%s)") == {"empresas"}
+        assert extract_write_tables("update certificates set ativo = false") == {"certificates"}
+        assert extract_write_tables("DELETE FROM public.organizacoes WHERE id = 1") == {"organizacoes"}
+
+
+class TestQueryCache:
+    """Testes para classe QueryCache"""
+    
+    def test_ttl_expiration(self):
+        """Testa se entradas expiram após o TTL"""
+        cache = QueryCache(max_size=10, ttl=0)
+        cache.set("key", [1])
+        
+        hit, _ = cache.get("key")
+        
+        assert hit is False
+    
+    def test_lru_eviction(self):
+        """Testa se a entrada menos usada é removida"""
+        cache = QueryCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        
+        assert cache.get("b") == (False, None)
+        assert cache.get("a") == (True, 1)
+        assert cache.stats()["evictions"] == 1
+    
+    def test_invalidate_by_tag(self):
+        """Testa se invalidate remove só as entradas da tabela"""
+        cache = QueryCache(max_size=10, ttl=60)
+        cache.set("empresas", 1, tags={"empresas"})
+        cache.set("orgs", 2, tags={"organizacoes"})
+        
+        removed = cache.invalidate(["Empresas"])
+        
+        assert removed == 1
+        assert cache.get("empresas") == (False, None)
+        assert cache.get("orgs") == (True, 2)
+
+
+class TestHelperCache:
+    """Testes da integração com os helpers"""
+    
+    def test_fetch_all_cached_until_write(self, mock_cursor):
+        """Testa se fetch_all usa o cache e execute_query na tabela invalida"""
+        mock_cursor.fetchall.return_value = [{"id": 1}]
+        query = "SELECT * FROM empresas WHERE cnpj = %s"
+        
+        first = fetch_all(query, ("123",), cache=True)
+        second = fetch_all(query, ("123",), cache=True)
+        assert first == second == [{"id": 1}]
+        assert mock_cursor.execute.call_count == 1
+        
+        execute_query("UPDATE empresas SET ativo = false WHERE cnpj = %s", ("123",))
+        fetch_all(query, ("123",), cache=True)
+        
+        assert mock_cursor.execute.call_count == 3
+    
+    def test_fetch_one_caches_none(self, mock_cursor):
+        """Testa se resultado vazio também é cacheado"""
+        mock_cursor.fetchone.return_value = None
+        
+        fetch_one("SELECT * FROM organizacoes WHERE id = %s", (1,), cache=True)
+        result = fetch_one("SELECT * FROM organizacoes WHERE id = %s", (1,), cache=True)
+        
+        assert result is None
+        assert mock_cursor.execute.call_count == 1
+    
+    def test_mutating_returned_rows_does_not_change_cache(self, mock_cursor):
+        """Testa que o cache guarda e devolve cópias das linhas"""
+        mock_cursor.fetchall.return_value = [{"id": 1, "nome": "ACME"}]
+        mock_cursor.fetchone.return_value = {"id": 2}
+        query = "SELECT * FROM empresas"
+        
+        fetch_all(query, cache=True)[0]["nome"] = "alterado"
+        hit = fetch_all(query, cache=True)
+        hit[0]["nome"] = "alterado de novo"
+        assert fetch_all(query, cache=True) == [{"id": 1, "nome": "ACME"}]
+        
+        fetch_one("SELECT * FROM empresas WHERE id = 2", cache=True)["id"] = 99
+        fetch_one("SELECT * FROM empresas WHERE id = 2", cache=True)["id"] = 98
+        assert fetch_one("SELECT * FROM empresas WHERE id = 2", cache=True) == {"id": 2}
+        assert mock_cursor.execute.call_count == 2
+    
+    def test_cache_bypassed_inside_transaction(self, mock_cursor):
+        """Testa se dentro de transaction() o cache não é usado"""
+        mock_cursor.fetchall.return_value = []
+        
+        with patch('psycopg2.connect'):
+            with transaction(use_pool=False):
+                fetch_all("SELECT * FROM empresas", cache=True)
+                fetch_all("SELECT * FROM empresas", cache=True)
+        
+        assert mock_cursor.execute.call_count == 2
+        assert get_query_cache().stats()["size"] == 0
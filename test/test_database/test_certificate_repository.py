@@ -0,0 +1,58 @@
+"""
+Testes para o repository de certificados
+Testa a busca do certificado da organização em uma única query (SQLite real)
+"""
+import pytest
+from contextlib import contextmanager
+from datetime import date, datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from automacoes_python_base_td.database.models.tdax import Certificates, Organizacoes
+from automacoes_python_base_td.database.repositories import certificate_repository
+from automacoes_python_base_td.database.snapshot import Snapshot
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    """Banco SQLite com uma organização e seu certificado; retorna os SQL executados"""
+    engine = create_engine("sqlite://")
+    Certificates.__table__.create(engine)
+    Organizacoes.__table__.create(engine)
+    with Session(engine) as session:
+        session.add(Certificates(id=1, cnpj="12345678000199", name="ACME", file_name="acme.pfx", description="b'pfx'", password="segredo", valid_start_date=date(2024, 1, 1), valid_end_date=date(2025, 1, 1), imported_at=datetime(2024, 1, 1)))
+        session.add(Organizacoes(id=10, cnpj="12345678000199", nome="ACME", apelido="acme", certificate_id=1, created_at=datetime(2024, 1, 1), ativo=True))
+        session.commit()
+    
+    @contextmanager
+    def fake_get_session(db_type="tdax"):
+        with Session(engine) as session:
+            yield session
+            session.commit()
+    
+    monkeypatch.setattr(certificate_repository, "get_session", fake_get_session)
+    executed = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: executed.append(statement))
+    yield executed
+    engine.dispose()
+
+
+class TestCertificateRepository:
+    """Testes para get_certificate_info/get_certificate_from_org_id"""
+    
+    def test_get_certificate_info_single_query(self, statements):
+        """Testa snapshot do certificado sem lazy load da organização"""
+        certificate = certificate_repository.get_certificate_info(10)
+        
+        assert isinstance(certificate, Snapshot)
+        assert (certificate.id, certificate.password) == (1, "segredo")
+        assert len([statement for statement in statements if statement.startswith("SELECT")]) == 1
+        assert certificate_repository.get_certificate_info(999) is None
+    
+    def test_get_certificate_from_org_id_single_query(self, statements, monkeypatch):
+        """Testa caminho e senha do certificado com uma única query"""
+        monkeypatch.setattr(certificate_repository, "_save_certificate_file", lambda certificate, cert_dir: f"{cert_dir}/{certificate.file_name}")
+        
+        path, password = certificate_repository.get_certificate_from_org_id(10, cert_dir="certs")
+        
+        assert (path, password) == ("certs/acme.pfx", "segredo")
+        assert len([statement for statement in statements if statement.startswith("SELECT")]) == 1
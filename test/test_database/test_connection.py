@@ -8,11 +8,21 @@ import psycopg2
 from automacoes_python_base_td.database.connection import (
     DatabaseConnection,
     get_connection,
+    transaction,
     execute_query,
+    execute_batch_values,
+    fetch_iter,
+    fetch_columns,
+    fetch_one,
+    fetch_all,
+    copy_rows,
+    export_query,
+    _CopyRowStream,
 )
 from automacoes_python_base_td.core.exceptions import (
     DatabaseConnectionError,
     DatabaseQueryError,
+    DatabaseTimeoutError,
 )
 
 
@@ -173,3 +183,447 @@ class TestExecuteQuery:
         assert any("DatabaseQueryError" in record.message or "[DB_QUERY]" in record.message 
                    for record in loguru_caplog.records)
 
+
+class TestFetchIter:
+    """Testes para função fetch_iter (cursor no servidor)"""
+    
+    def _mock_connection(self, mock_get_connection, batches):
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.fetchmany.side_effect = batches + [[]]
+        mock_conn.cursor.return_value.__enter__ = Mock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = Mock(return_value=False)
+        mock_get_connection.return_value.__enter__ = Mock(return_value=mock_conn)
+        mock_get_connection.return_value.__exit__ = Mock(return_value=False)
+        return mock_conn, mock_cursor
+    
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_fetch_iter_yields_rows_from_named_cursor(self, mock_get_connection):
+        """Testa se fetch_iter usa named cursor com itersize e retorna linha a linha"""
+        mock_conn, mock_cursor = self._mock_connection(mock_get_connection, [[1, 2], [3]])
+        
+        rows = list(fetch_iter("SELECT * FROM speds_retificados", batch_size=2))
+        
+        assert rows == [1, 2, 3]
+        assert mock_conn.cursor.call_args.kwargs["name"].startswith("fetch_iter_")
+        assert mock_cursor.itersize == 2
+        mock_cursor.fetchmany.assert_called_with(2)
+    
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_fetch_iter_batches(self, mock_get_connection):
+        """Testa se fetch_iter com batches=True retorna listas"""
+        self._mock_connection(mock_get_connection, [[1, 2], [3]])
+        
+        result = list(fetch_iter("SELECT 1", batch_size=2, batches=True))
+        
+        assert result == [[1, 2], [3]]
+    
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_fetch_iter_is_lazy_and_releases_connection(self, mock_get_connection):
+        """Testa se a conexão só é aberta no consumo e liberada ao interromper"""
+        self._mock_connection(mock_get_connection, [[1, 2], [3]])
+        
+        iterator = fetch_iter("SELECT 1")
+        assert not mock_get_connection.called
+        
+        assert next(iterator) == 1
+        iterator.close()
+        
+        mock_get_connection.return_value.__exit__.assert_called_once()
+
+
+class TestCopyRows:
+    """Testes para carga em massa com COPY"""
+    
+    def test_stream_serializes_csv_on_demand(self):
+        """Testa serialização CSV com NULL, aspas e leitura em blocos"""
+        consumed = []
+        
+        def rows():
+            for row in [(1, None, 'a,"b"'), (2, "", "x")]:
+                consumed.append(row)
+                yield row
+        
+        stream = _CopyRowStream(rows(), format="csv")
+        first = stream.read(4)
+        
+        assert first == b"1,,\""
+        assert len(consumed) == 1
+        assert first + stream.read(-1) == b'1,,"a,""b"""\n2,"",x\n'
+        assert stream.rows == 2
+    
+    def test_stream_serializes_text_format(self):
+        """Testa serialização no formato texto (\\N e escapes)"""
+        stream = _CopyRowStream([(None, "a\tb")], format="text")
+        
+        assert stream.read() == b"\\N\ta\\tb\n"
+    
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_copy_rows_streams_through_copy_expert(self, mock_get_connection):
+        """Testa se copy_rows usa copy_expert e retorna estatísticas"""
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        received = []
+        mock_cursor.copy_expert.side_effect = lambda query, file, size: received.append(file.read(-1))
+        mock_conn.cursor.return_value.__enter__ = Mock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = Mock(return_value=False)
+        mock_get_connection.return_value.__enter__ = Mock(return_value=mock_conn)
+        mock_get_connection.return_value.__exit__ = Mock(return_value=False)
+        
+        stats = copy_rows("public.pagamentos", ["cnpj", "valor"], ((str(i), i) for i in range(3)))
+        
+        assert received == [b"0,0\n1,1\n2,2\n"]
+        assert mock_cursor.copy_expert.call_args.kwargs["size"] == 65536
+        assert stats["rows"] == 3
+        assert "rows_per_second" in stats
+    
+    def test_copy_rows_invalid_format(self):
+        """Testa se formato inválido é rejeitado"""
+        with pytest.raises(ValueError):
+            copy_rows("pagamentos", ["cnpj"], [], format="binary")
+
+
+class TestExecuteBatchValues:
+    """Testes para função execute_batch_values"""
+    
+    def _mock_connection(self, mock_get_connection):
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = Mock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = Mock(return_value=False)
+        mock_get_connection.return_value.__enter__ = Mock(return_value=mock_conn)
+        mock_get_connection.return_value.__exit__ = Mock(return_value=False)
+        return mock_conn, mock_cursor
+    
+    @patch('automacoes_python_base_td.database.connection.execute_values')
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_returns_total_rowcount_across_pages(self, mock_get_connection, mock_execute_values):
+        """Testa se o total soma o rowcount de todas as páginas"""
+        _, mock_cursor = self._mock_connection(mock_get_connection)
+        pages = []
+        
+        def fake_execute_values(cursor, query, page, **kwargs):
+            pages.append(page)
+            cursor.rowcount = len(page)
+        
+        mock_execute_values.side_effect = fake_execute_values
+        
+        total = execute_batch_values(
+            "INSERT INTO pagamentos (id) VALUES %s",
+            ((i,) for i in range(5)),
+            page_size=2,
+        )
+        
+        assert total == 5
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert mock_execute_values.call_args.kwargs["page_size"] == 1
+    
+    @patch('automacoes_python_base_td.database.connection.execute_values')
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_returning_collects_rows_from_all_pages(self, mock_get_connection, mock_execute_values):
+        """Testa se returning=True junta as linhas do RETURNING de todas as páginas"""
+        self._mock_connection(mock_get_connection)
+        mock_execute_values.side_effect = lambda cursor, query, page, **kwargs: [
+            {"id": row[0]} for row in page
+        ]
+        
+        ids = execute_batch_values(
+            "INSERT INTO pagamentos (id) VALUES %s RETURNING id",
+            [(1,), (2,), (3,)],
+            page_size=2,
+            returning=True,
+        )
+        
+        assert ids == [{"id": 1}, {"id": 2}, {"id": 3}]
+        assert mock_execute_values.call_args.kwargs["fetch"] is True
+
+
+class TestTransaction:
+    """Testes para o escopo de transação transaction()"""
+    
+    @patch('psycopg2.connect')
+    def test_helpers_share_connection_and_commit_once(self, mock_connect):
+        """Testa se os helpers reutilizam a conexão e o commit ocorre uma vez"""
+        mock_conn = MagicMock()
+        mock_connect.return_value = mock_conn
+        
+        with transaction(use_pool=False) as conn:
+            execute_query("UPDATE empresas SET ativo = true WHERE id = %s", (1,))
+            fetch_one("SELECT id FROM empresas WHERE id = %s", (1,))
+            assert conn is mock_conn
+        
+        assert mock_connect.call_count == 1
+        mock_conn.commit.assert_called_once()
+    
+    @patch('psycopg2.connect')
+    def test_error_rolls_back_whole_transaction(self, mock_connect):
+        """Testa se uma exceção no bloco desfaz a transação sem commit"""
+        mock_conn = MagicMock()
+        mock_connect.return_value = mock_conn
+        
+        with pytest.raises(ValueError):
+            with transaction(use_pool=False):
+                execute_query("UPDATE empresas SET ativo = true")
+                raise ValueError("falha no meio")
+        
+        mock_conn.commit.assert_not_called()
+        mock_conn.rollback.assert_called()
+    
+    @patch('psycopg2.connect')
+    def test_nested_transaction_uses_savepoint(self, mock_connect):
+        """Testa se transaction() aninhado usa SAVEPOINT na mesma conexão"""
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = Mock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = Mock(return_value=False)
+        mock_connect.return_value = mock_conn
+        
+        with transaction(use_pool=False):
+            with pytest.raises(ValueError):
+                with transaction():
+                    raise ValueError("desfaz só o savepoint")
+        
+        executed = [call.args[0] for call in mock_cursor.execute.call_args_list]
+        assert executed == ["SAVEPOINT sp_1", "ROLLBACK TO SAVEPOINT sp_1"]
+        assert mock_connect.call_count == 1
+        mock_conn.commit.assert_called_once()
+    
+    @patch('psycopg2.connect')
+    def test_other_target_uses_own_connection(self, mock_connect):
+        """Testa se helpers para outro destino não usam a conexão da transação"""
+        mock_connect.side_effect = lambda **kwargs: MagicMock()
+        
+        with transaction(use_pool=False) as conn:
+            with get_connection(database="outro_banco", use_pool=False) as other:
+                assert other is not conn
+
+
+class TestFetchColumns:
+    """Testes para função fetch_columns (resultado por coluna)"""
+    
+    def _mock_connection(self, mock_get_connection, batches, description):
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.fetchmany.side_effect = batches + [[]]
+        mock_cursor.description = description
+        mock_conn.cursor.return_value.__enter__ = Mock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = Mock(return_value=False)
+        mock_get_connection.return_value.__enter__ = Mock(return_value=mock_conn)
+        mock_get_connection.return_value.__exit__ = Mock(return_value=False)
+        return mock_conn, mock_cursor
+    
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_fetch_columns_transposes_batches(self, mock_get_connection):
+        """Testa se as linhas em tupla viram listas por coluna"""
+        mock_conn, _ = self._mock_connection(
+            mock_get_connection,
+            [[("1", 10), ("2", 20)], [("3", None)]],
+            [("cnpj",), ("valor",)],
+        )
+        
+        columns = fetch_columns("SELECT cnpj, valor FROM pagamentos", batch_size=2)
+        
+        assert columns == {"cnpj": ["1", "2", "3"], "valor": [10, 20, None]}
+        assert mock_conn.cursor.call_args.kwargs["cursor_factory"] is None
+    
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_fetch_columns_empty_result_keeps_names(self, mock_get_connection):
+        """Testa se resultado vazio retorna as colunas sem valores"""
+        self._mock_connection(mock_get_connection, [], [("cnpj",)])
+        
+        assert fetch_columns("SELECT cnpj FROM pagamentos") == {"cnpj": []}
+    
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_fetch_columns_numpy_dtypes(self, mock_get_connection):
+        """Testa inferência de dtype dos arrays NumPy"""
+        np = pytest.importorskip("numpy")
+        from datetime import date
+        from decimal import Decimal
+        self._mock_connection(
+            mock_get_connection,
+            [[(1, Decimal("1.5"), date(2025, 1, 1), "a"), (2, None, date(2025, 1, 2), "b")]],
+            [("id",), ("valor",), ("data",), ("nome",)],
+        )
+        
+        columns = fetch_columns("SELECT * FROM pagamentos", as_numpy=True)
+        
+        assert columns["id"].dtype == np.int64
+        assert columns["valor"].dtype == np.float64
+        assert np.isnan(columns["valor"][1])
+        assert columns["data"].dtype == np.dtype("datetime64[D]")
+        assert columns["nome"].dtype == object
+
+
+class TestStatementTimeout:
+    """Testes para timeout= (SET LOCAL statement_timeout) e métricas dos helpers"""
+    
+    def _mock_connect(self, mock_connect):
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.rowcount = 1
+        mock_conn.cursor.return_value.__enter__ = Mock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = Mock(return_value=False)
+        mock_connect.return_value = mock_conn
+        return mock_conn, mock_cursor
+    
+    @patch('psycopg2.connect')
+    def test_timeout_sets_local_statement_timeout(self, mock_connect):
+        """Testa se timeout= aplica SET LOCAL antes da query"""
+        _, mock_cursor = self._mock_connect(mock_connect)
+        
+        execute_query("UPDATE empresas SET ativo = true", timeout=2.5)
+        
+        calls = mock_cursor.execute.call_args_list
+        assert calls[0].args == ("SET LOCAL statement_timeout = %s", (2500,))
+        assert calls[1].args[0] == "UPDATE empresas SET ativo = true"
+        assert len(calls) == 2
+    
+    @patch('psycopg2.connect')
+    def test_no_timeout_by_default(self, mock_connect):
+        """Testa que sem timeout nenhum SET extra é enviado"""
+        _, mock_cursor = self._mock_connect(mock_connect)
+        
+        fetch_one("SELECT 1")
+        
+        assert mock_cursor.execute.call_count == 1
+    
+    @patch('psycopg2.connect')
+    def test_timeout_is_reset_inside_transaction(self, mock_connect):
+        """Testa se dentro de transaction() o timeout é desfeito após a query"""
+        _, mock_cursor = self._mock_connect(mock_connect)
+        
+        with transaction(use_pool=False):
+            execute_query("UPDATE empresas SET ativo = true", timeout=1)
+            execute_query("UPDATE empresas SET ativo = false")
+        
+        executed = [call.args[0] for call in mock_cursor.execute.call_args_list]
+        assert executed == [
+            "SET LOCAL statement_timeout = %s",
+            "UPDATE empresas SET ativo = true",
+            "SET LOCAL statement_timeout = DEFAULT",
+            "UPDATE empresas SET ativo = false",
+        ]
+    
+    @patch('psycopg2.connect')
+    def test_query_canceled_raises_timeout_error(self, mock_connect):
+        """Testa se query cancelada pelo servidor vira DatabaseTimeoutError"""
+        mock_conn, mock_cursor = self._mock_connect(mock_connect)
+        mock_cursor.execute.side_effect = [
+            None,
+            psycopg2.extensions.QueryCanceledError("canceling statement due to statement timeout"),
+        ]
+        
+        with pytest.raises(DatabaseTimeoutError) as exc_info:
+            fetch_all("SELECT pg_sleep(10)", timeout=1)
+        
+        assert isinstance(exc_info.value, DatabaseQueryError)
+        assert exc_info.value.code == "DB_TIMEOUT"
+        mock_conn.rollback.assert_called()
+    
+    @patch('psycopg2.connect')
+    def test_helpers_record_query_stats(self, mock_connect):
+        """Testa se os helpers alimentam o histograma por fingerprint"""
+        from automacoes_python_base_td.database.metrics import get_query_stats, reset_query_stats
+        self._mock_connect(mock_connect)
+        reset_query_stats()
+        
+        execute_query("UPDATE empresas SET ativo = true WHERE id = %s", (1,))
+        execute_query("UPDATE empresas SET ativo = true WHERE id = %s", (2,))
+        
+        stats = get_query_stats()["UPDATE empresas SET ativo = true WHERE id = ?"]
+        assert stats["count"] == 2
+        assert stats["rows"] == 2
+        reset_query_stats()
+
+
+class TestExportQuery:
+    """Testes para export_query (COPY TO em streaming)"""
+    
+    def _mock_connection(self, mock_get_connection, chunks=(b"id,nome\n", b"1,a\n", b"2,b\n"), error=None):
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.rowcount = 2
+        mock_cursor.mogrify.return_value = b"SELECT * FROM empresas WHERE ativo = true"
+        
+        def copy_expert(copy_sql, file):
+            for chunk in chunks:
+                file.write(chunk)
+            if error is not None:
+                raise error
+        
+        mock_cursor.copy_expert.side_effect = copy_expert
+        mock_conn.cursor.return_value.__enter__ = Mock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = Mock(return_value=False)
+        mock_get_connection.return_value.__enter__.return_value = mock_conn
+        return mock_cursor
+    
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_export_to_local_csv(self, mock_get_connection, tmp_path):
+        """Testa exportação CSV com cabeçalho para arquivo local"""
+        mock_cursor = self._mock_connection(mock_get_connection)
+        destination = tmp_path / "empresas.csv"
+        
+        stats = export_query("SELECT * FROM empresas WHERE ativo = %s", destination, params=(True,))
+        
+        assert destination.read_bytes() == b"id,nome\n1,a\n2,b\n"
+        assert stats["rows"] == 2
+        assert stats["bytes"] == len(b"id,nome\n1,a\n2,b\n")
+        copy_sql = mock_cursor.copy_expert.call_args.args[0]
+        assert copy_sql == (
+            "COPY (SELECT * FROM empresas WHERE ativo = true) TO STDOUT WITH (FORMAT csv, HEADER true)"
+        )
+    
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_export_gzip_inferred_from_extension(self, mock_get_connection, tmp_path):
+        """Testa compactação gzip automática para destino .gz"""
+        import gzip
+        self._mock_connection(mock_get_connection)
+        destination = tmp_path / "empresas.csv.gz"
+        
+        export_query("SELECT * FROM empresas", str(destination))
+        
+        assert gzip.decompress(destination.read_bytes()) == b"id,nome\n1,a\n2,b\n"
+    
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_export_binary_without_header(self, mock_get_connection):
+        """Testa formato binário (sem HEADER) para arquivo já aberto"""
+        import io
+        mock_cursor = self._mock_connection(mock_get_connection, chunks=(b"PGCOPY\n\xff",))
+        buffer = io.BytesIO()
+        
+        export_query("SELECT * FROM empresas", buffer, format="binary")
+        
+        assert buffer.getvalue() == b"PGCOPY\n\xff"
+        assert mock_cursor.copy_expert.call_args.args[0].endswith("WITH (FORMAT binary)")
+    
+    @patch('automacoes_python_base_td.aws.s3.S3Client')
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_export_to_s3(self, mock_get_connection, mock_s3_client):
+        """Testa streaming para o S3 via multipart writer"""
+        import io
+        self._mock_connection(mock_get_connection)
+        writer = io.BytesIO()
+        mock_s3_client.return_value.open_multipart_writer.return_value.__enter__.return_value = writer
+        
+        export_query("SELECT * FROM empresas", "s3://analytics/exports/empresas.csv")
+        
+        mock_s3_client.return_value.open_multipart_writer.assert_called_once_with(
+            "analytics", "exports/empresas.csv", part_size=None
+        )
+        assert writer.getvalue() == b"id,nome\n1,a\n2,b\n"
+    
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_failure_removes_partial_file(self, mock_get_connection, tmp_path):
+        """Testa se falha no meio da exportação remove o arquivo parcial"""
+        self._mock_connection(mock_get_connection, error=RuntimeError("conexão perdida"))
+        destination = tmp_path / "parcial.csv"
+        
+        with pytest.raises(RuntimeError):
+            export_query("SELECT * FROM empresas", destination)
+        
+        assert not destination.exists()
+    
+    def test_invalid_format(self):
+        """Testa validação do formato"""
+        with pytest.raises(ValueError):
+            export_query("SELECT 1", "/tmp/x.parquet", format="parquet")
@@ -214,3 +214,351 @@ class TestCRUDBase:
         
         assert result is True
 
+
+
+class TestSnapshotReads:
+    """Testes para leituras com snapshot=True (SQLite real)"""
+    
+    @pytest.fixture
+    def session(self):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import Session
+        engine = create_engine("sqlite://")
+        TestUser.__table__.create(engine)
+        with Session(engine) as session:
+            session.add_all([
+                TestUser(id=1, name="Ana", email="ana@example.com", ativo=True),
+                TestUser(id=2, name="Bia", email="bia@example.com", ativo=False),
+            ])
+            session.commit()
+            yield session
+        engine.dispose()
+    
+    def test_get_returns_detached_immutable_snapshot(self, session):
+        """Testa snapshot utilizável após fechar a sessão e imutável"""
+        import dataclasses
+        from automacoes_python_base_td.database.snapshot import Snapshot
+        crud = CRUDBase(TestUser)
+        
+        user = crud.get(session, 1, snapshot=True)
+        session.close()
+        
+        assert isinstance(user, Snapshot)
+        assert user.model is TestUser
+        assert user.as_dict() == {"id": 1, "name": "Ana", "email": "ana@example.com", "ativo": True}
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            user.name = "Outra"
+    
+    def test_filter_and_get_all_snapshots(self, session):
+        """Testa snapshots em filter/get_all respeitando o filtro de ativos"""
+        crud = CRUDBase(TestUser)
+        
+        assert [user.name for user in crud.get_all(session, snapshot=True)] == ["Ana"]
+        assert crud.filter(session, snapshot=True, name="Bia") == []
+        assert crud.filter(session, include_inactive=True, snapshot=True, name="Bia")[0].id == 2
+        assert crud.get(session, 2, snapshot=True) is None
+    
+    def test_snapshot_does_not_load_instances(self, session):
+        """Testa que snapshots não entram no identity map da sessão"""
+        session.expunge_all()
+        crud = CRUDBase(TestUser)
+        
+        crud.filter(session, snapshot=True)
+        
+        assert len(session.identity_map) == 0
+    
+    def test_to_snapshot_from_instance(self, session):
+        """Testa to_snapshot a partir de uma instância carregada"""
+        from automacoes_python_base_td.database.snapshot import snapshot_class, to_snapshot
+        
+        user = to_snapshot(session.get(TestUser, 1))
+        
+        assert type(user) is snapshot_class(TestUser)
+        assert type(user).__name__ == "TestUserSnapshot"
+        assert user == CRUDBase(TestUser).get(session, 1, snapshot=True)
+
+
+class TestCreateManyBulk:
+    """Testes para create_many com INSERT ... RETURNING em lotes (SQLite real)"""
+    
+    @pytest.fixture
+    def engine(self):
+        from sqlalchemy import create_engine
+        engine = create_engine("sqlite://")
+        TestUser.__table__.create(engine)
+        yield engine
+        engine.dispose()
+    
+    def test_chunked_insert_without_refresh(self, engine):
+        """Testa ids e defaults vindos do RETURNING, na ordem, sem SELECT extra"""
+        from sqlalchemy import event
+        from sqlalchemy.orm import Session
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+        data = [{"name": f"user{i}", "email": f"u{i}@example.com"} for i in range(5)]
+        
+        with Session(engine) as session:
+            users = CRUDBase(TestUser).create_many(session, data, chunk_size=2)
+            names = [user.name for user in users]
+            ids = [user.id for user in users]
+            defaults = {user.ativo for user in users}
+        
+        assert names == [f"user{i}" for i in range(5)]
+        assert ids == [1, 2, 3, 4, 5]
+        assert defaults == {True}
+        assert not any(statement.startswith("SELECT") for statement in statements)
+    
+    def test_one_statement_per_chunk(self):
+        """Testa divisão em lotes de chunk_size e um único commit"""
+        mock_session = MagicMock()
+        mock_session.scalars.return_value.all.side_effect = lambda: ["obj"]
+        data = [{"name": f"user{i}"} for i in range(5)]
+        
+        result = CRUDBase(TestUser).create_many(mock_session, data, chunk_size=2)
+        
+        chunks = [call.args[1] for call in mock_session.scalars.call_args_list]
+        assert chunks == [data[0:2], data[2:4], data[4:5]]
+        assert result == ["obj"] * 3
+        mock_session.commit.assert_called_once()
+        mock_session.refresh.assert_not_called()
+    
+    def test_rollback_on_error(self):
+        """Testa rollback e repasse do erro"""
+        mock_session = MagicMock()
+        mock_session.scalars.side_effect = SQLAlchemyError("falha")
+        
+        with pytest.raises(SQLAlchemyError):
+            CRUDBase(TestUser).create_many(mock_session, [{"name": "x"}])
+        
+        mock_session.rollback.assert_called_once()
+        mock_session.commit.assert_not_called()
+
+
+class TestNativeUpsert:
+    """Testes para upsert/bulk_upsert com ON CONFLICT (SQLite real, índice único em email)"""
+    
+    @pytest.fixture
+    def session(self):
+        from sqlalchemy import create_engine, event, text
+        from sqlalchemy.orm import Session
+        engine = create_engine("sqlite://")
+        TestUser.__table__.create(engine)
+        with engine.begin() as connection:
+            connection.execute(text("CREATE UNIQUE INDEX uq_test_users_email ON test_users (email)"))
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+        with Session(engine) as session:
+            session.statements = statements
+            yield session
+        engine.dispose()
+    
+    def test_upsert_inserts_then_updates_in_one_statement(self, session):
+        """Testa INSERT e depois UPDATE pela chave, um statement cada"""
+        crud = CRUDBase(TestUser)
+        
+        created = crud.upsert(session, {"name": "Ana"}, conflict_columns=["email"], email="ana@example.com")
+        updated = crud.upsert(session, {"name": "Ana Maria"}, conflict_columns=["email"], email="ana@example.com")
+        
+        assert created.id == updated.id
+        assert updated.name == "Ana Maria"
+        assert crud.count(session) == 1
+        inserts = [statement for statement in session.statements if statement.startswith("INSERT")]
+        assert len(inserts) == 2
+        assert all("ON CONFLICT (email) DO UPDATE" in statement for statement in inserts)
+        assert not any(statement.startswith("SELECT") for statement in session.statements[:2])
+    
+    def test_bulk_upsert_with_duplicates_in_chunk(self, session):
+        """Testa upsert em lote com chaves repetidas no mesmo lote"""
+        crud = CRUDBase(TestUser)
+        crud.upsert(session, {"name": "Antigo"}, conflict_columns=["email"], email="a@example.com")
+        
+        rows = [
+            {"email": "a@example.com", "name": "A1"},
+            {"email": "b@example.com", "name": "B"},
+            {"email": "a@example.com", "name": "A2"},
+        ]
+        objects = crud.bulk_upsert(session, rows, conflict_columns=["email"])
+        
+        assert sorted(obj.name for obj in objects) == ["A2", "B"]
+        assert {user.email: user.name for user in crud.get_all(session)} == {"a@example.com": "A2", "b@example.com": "B"}
+    
+    def test_bulk_upsert_update_columns(self, session):
+        """Testa que apenas update_columns são atualizadas no conflito"""
+        crud = CRUDBase(TestUser)
+        crud.upsert(session, {"name": "Nome", "ativo": True}, conflict_columns=["email"], email="c@example.com")
+        
+        crud.bulk_upsert(
+            session,
+            [{"email": "c@example.com", "name": "Outro", "ativo": False}],
+            conflict_columns=["email"],
+            update_columns=["ativo"],
+        )
+        
+        user = crud.get(session, 1, include_inactive=True, snapshot=True)
+        assert (user.name, user.ativo) == ("Nome", False)
+
+    def test_bulk_upsert_heterogeneous_rows_keep_missing_columns(self, session):
+        """Testa que uma coluna ausente na linha não apaga o valor existente"""
+        crud = CRUDBase(TestUser)
+        crud.upsert(session, {"name": "Manter", "ativo": True}, conflict_columns=["email"], email="c1@example.com")
+
+        crud.bulk_upsert(
+            session,
+            [
+                {"email": "c1@example.com", "ativo": False},
+                {"email": "c2@example.com", "name": "N2", "ativo": True},
+            ],
+            conflict_columns=["email"],
+        )
+
+        users = {user.email: user for user in crud.get_all(session, include_inactive=True, snapshot=True)}
+        assert (users["c1@example.com"].name, users["c1@example.com"].ativo) == ("Manter", False)
+        assert users["c2@example.com"].name == "N2"
+
+    def test_legacy_upsert_without_conflict_columns(self):
+        """Testa que sem conflict_columns o upsert continua buscando antes"""
+        mock_session = MagicMock()
+        mock_query = MagicMock()
+        mock_session.query.return_value = mock_query
+        mock_query.filter.return_value = mock_query
+        mock_query.offset.return_value = mock_query
+        mock_query.limit.return_value = mock_query
+        mock_query.all.return_value = []
+        
+        CRUDBase(TestUser).upsert(mock_session, {"name": "Novo"}, email="n@example.com")
+        
+        mock_session.add.assert_called_once()
+        mock_session.scalars.assert_not_called()
+    
+    def test_unsupported_dialect(self):
+        """Testa erro claro em bancos sem ON CONFLICT"""
+        mock_session = MagicMock()
+        mock_session.get_bind.return_value.dialect.name = "mssql"
+        
+        with pytest.raises(DatabaseQueryError) as exc_info:
+            CRUDBase(TestUser).bulk_upsert(mock_session, [{"email": "x"}], conflict_columns=["email"])
+        
+        assert "mssql" in str(exc_info.value)
+    
+    def test_upsert_with_id_keeps_existing_primary_key(self, session):
+        """Testa que id= não sobrescreve a chave primária do registro existente"""
+        crud = CRUDBase(TestUser)
+        existing = crud.upsert(session, {"name": "Ana"}, conflict_columns=["email"], email="ana@example.com")
+        
+        updated = crud.upsert(session, {"name": "Ana Maria"}, id=99, conflict_columns=["email"], email="ana@example.com")
+        
+        assert updated.id == existing.id
+        assert crud.get(session, 99, snapshot=True) is None
+        assert "SET id" not in [statement for statement in session.statements if statement.startswith("INSERT")][-1]
+    
+    def test_bulk_upsert_rejects_rows_without_conflict_column(self, session):
+        """Testa erro (em vez de descarte silencioso) para linhas sem a coluna de conflito"""
+        crud = CRUDBase(TestUser)
+        
+        with pytest.raises(ValueError) as exc_info:
+            crud.bulk_upsert(session, [{"name": "A"}, {"email": "b@example.com", "name": "B"}, {"name": "C"}], conflict_columns=["email"])
+        
+        assert "posições [0, 2]" in str(exc_info.value)
+        assert crud.count(session) == 0
+    
+    def test_bulk_upsert_unknown_update_columns(self, session):
+        """Testa DatabaseQueryError com os nomes de colunas inexistentes"""
+        crud = CRUDBase(TestUser)
+        
+        with pytest.raises(DatabaseQueryError) as exc_info:
+            crud.bulk_upsert(session, [{"email": "a@example.com"}], conflict_columns=["email"], update_columns=["nome", "name"])
+        
+        assert exc_info.value.details["columns"] == ["nome"]
+
+class TestKeysetPagination:
+    """Testes para iter_pages/get_page (SQLite real)"""
+    
+    @pytest.fixture
+    def session(self):
+        from sqlalchemy import create_engine, event
+        from sqlalchemy.orm import Session
+        engine = create_engine("sqlite://")
+        TestUser.__table__.create(engine)
+        statements = []
+        with Session(engine) as session:
+            session.add_all([
+                TestUser(id=i, name=f"user{i % 3}", email=f"u{i}@example.com", ativo=i != 4)
+                for i in range(1, 11)
+            ])
+            session.commit()
+            event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+            session.statements = statements
+            yield session
+        engine.dispose()
+    
+    def test_iter_pages_by_primary_key(self, session):
+        """Testa páginas até esgotar, por WHERE chave > última, pulando inativos"""
+        crud = CRUDBase(TestUser)
+        
+        pages = [[user.id for user in page] for page in crud.iter_pages(session, page_size=4)]
+        
+        assert pages == [[1, 2, 3, 5], [6, 7, 8, 9], [10]]
+        assert len(session.statements) == 3
+        assert "(test_users.id) > (?)" in session.statements[1]
+    
+    def test_iter_pages_order_by_with_tiebreak_and_filters(self, session):
+        """Testa ordenação por coluna repetida com desempate pela chave primária"""
+        crud = CRUDBase(TestUser)
+        
+        ids = [user.id for page in crud.iter_pages(session, page_size=2, order_by="name", snapshot=True) for user in page]
+        
+        assert ids == [3, 6, 9, 1, 7, 10, 2, 5, 8]
+        filtered = list(crud.iter_pages(session, page_size=2, descending=True, name="user1"))
+        assert [[user.id for user in page] for page in filtered] == [[10, 7], [1]]
+    
+    def test_get_page_cursor_roundtrip(self, session):
+        """Testa cursor da próxima página e fim da paginação"""
+        crud = CRUDBase(TestUser)
+        
+        first, cursor = crud.get_page(session, page_size=5, order_by="name")
+        second, end = crud.get_page(session, page_size=5, cursor=cursor, order_by="name")
+        
+        assert [user.id for user in first] == [3, 6, 9, 1, 7]
+        assert [user.id for user in second] == [10, 2, 5, 8]
+        assert end is None
+    
+    def test_pages_match_filter(self, session):
+        """Testa que iter_pages/get_page filtram como filter (ativos, colunas desconhecidas ignoradas)"""
+        crud = CRUDBase(TestUser)
+        filters = {"name": "user1", "inexistente": 1}
+
+        expected = sorted(user.id for user in crud.filter(session, **filters))
+        paged = [user.id for page in crud.iter_pages(session, page_size=2, **filters) for user in page]
+        page, _ = crud.get_page(session, page_size=10, **filters)
+
+        assert expected == [1, 7, 10]
+        assert paged == expected
+        assert [user.id for user in page] == expected
+        assert crud.count(session, **filters) == 3
+
+    def test_get_page_rejects_foreign_cursor(self, session):
+        """Testa cursor inválido ou de outra ordenação"""
+        from automacoes_python_base_td.core.exceptions import ValidationError
+        crud = CRUDBase(TestUser)
+        _, cursor = crud.get_page(session, page_size=2, order_by="name")
+        
+        with pytest.raises(ValidationError):
+            crud.get_page(session, page_size=2, cursor=cursor)
+        with pytest.raises(ValidationError):
+            crud.get_page(session, page_size=2, cursor="nao-e-um-cursor")
+
+
+class TestCursorTokens:
+    """Testes para encode_cursor/decode_cursor"""
+    
+    def test_typed_values_roundtrip(self):
+        """Testa datas e Decimal convertidos de volta pelo tipo da coluna"""
+        from datetime import date
+        from decimal import Decimal
+        from sqlalchemy import Date, Numeric, column
+        from automacoes_python_base_td.database.pagination import decode_cursor, encode_cursor
+        
+        token = encode_cursor(["periodo", "valor", "id"], [date(2024, 3, 1), Decimal("10.50"), 7])
+        values = decode_cursor(token, ["periodo", "valor", "id"], [column("periodo", Date), column("valor", Numeric), column("id", Integer)])
+        
+        assert values == [date(2024, 3, 1), Decimal("10.50"), 7]
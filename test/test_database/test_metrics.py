@@ -0,0 +1,149 @@
+"""
+Testes para métricas de queries
+Testa fingerprint, formato dos parâmetros, histograma e log de queries lentas
+"""
+import pytest
+from loguru import logger
+from automacoes_python_base_td.database.metrics import (
+    OTHER_FINGERPRINT,
+    QueryHistogram,
+    fingerprint,
+    get_query_stats,
+    observe_query,
+    params_shape,
+    record_query,
+    reset_query_stats,
+)
+from automacoes_python_base_td.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    """Zera o histograma global entre os testes"""
+    reset_query_stats()
+    yield
+    reset_query_stats()
+
+
+@pytest.fixture
+def warnings_log():
+    """Captura mensagens WARNING do loguru"""
+    messages = []
+    handler_id = logger.add(messages.append, format="{message}", level="WARNING")
+    yield messages
+    logger.remove(handler_id)
+
+
+class TestFingerprint:
+    """Testes para fingerprint()"""
+
+    def test_replaces_literals_and_placeholders(self):
+        """Testa que valores diferentes geram o mesmo fingerprint"""
+        first = fingerprint("SELECT * FROM empresas WHERE id = 1 AND cnpj = '123'")
+        second = fingerprint("SELECT * FROM empresas WHERE id = 42 AND cnpj = 'x''y'")
+        third = fingerprint("SELECT * FROM empresas WHERE id = %s AND cnpj = %(cnpj)s")
+
+        assert first == second == third == "SELECT * FROM empresas WHERE id = ? AND cnpj = ?"
+
+    def test_collapses_lists_and_values(self):
+        """Testa que listas IN e VALUES de tamanhos diferentes são agrupadas"""
+        assert fingerprint("SELECT 1 FROM t WHERE id IN (1, 2, 3)") == "SELECT ? FROM t WHERE id IN (?)"
+        assert (
+            fingerprint("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y')")
+            == fingerprint("INSERT INTO t (a, b) VALUES (%s, %s)")
+        )
+
+    def test_keeps_identifiers_and_strips_comments(self):
+        """Testa que números em identificadores e comentários não afetam o fingerprint"""
+        result = fingerprint("SELECT col1 FROM t2 -- comentário\n WHERE  x = 1 /* fim */")
+
+        assert result == "SELECT col1 FROM t2 WHERE x = ?"
+
+
+class TestParamsShape:
+    """Testes para params_shape()"""
+
+    def test_shapes(self):
+        """Testa descrição dos parâmetros sem valores"""
+        assert params_shape(None) == "-"
+        assert params_shape(("123", 10, None)) == "(str, int, None)"
+        assert params_shape({"cnpj": "123"}) == "{cnpj: str}"
+        assert params_shape([(1, "a"), (2, "b")]) == "2 x (int, str)"
+
+
+class TestQueryHistogram:
+    """Testes para QueryHistogram"""
+
+    def test_record_and_snapshot(self):
+        """Testa contagem, linhas, buckets e percentis"""
+        histogram = QueryHistogram(buckets=(0.01, 0.1, 1.0), max_fingerprints=10)
+        for _ in range(9):
+            histogram.record("q", 0.005, rows=2)
+        histogram.record("q", 0.5, rows=1, error=True)
+
+        stats = histogram.snapshot()["q"]
+
+        assert stats["count"] == 10
+        assert stats["errors"] == 1
+        assert stats["rows"] == 19
+        assert stats["buckets"] == {"0.01": 9, "0.1": 0, "1.0": 1, "+Inf": 0}
+        assert stats["p50_ms"] == 10.0
+        assert stats["p99_ms"] == 500.0
+        assert stats["max_ms"] == 500.0
+
+    def test_overflow_goes_to_other(self):
+        """Testa que fingerprints acima do limite são agrupados"""
+        histogram = QueryHistogram(max_fingerprints=2)
+        for key in ("a", "b", "c", "d"):
+            histogram.record(key, 0.001)
+
+        snapshot = histogram.snapshot()
+
+        assert set(snapshot) == {"a", "b", OTHER_FINGERPRINT}
+        assert snapshot[OTHER_FINGERPRINT]["count"] == 2
+
+
+class TestRecordQuery:
+    """Testes para record_query() e observe_query()"""
+
+    def test_slow_query_is_logged_without_values(self, monkeypatch, warnings_log):
+        """Testa log de query lenta com formato dos parâmetros (sem valores)"""
+        monkeypatch.setattr(settings, "db_slow_query_threshold", 0.5)
+
+        record_query("SELECT * FROM empresas WHERE cnpj = %s", ("12345678000199",), 0.8, rows=3)
+        record_query("SELECT 1", None, 0.1, rows=1)
+
+        assert len(warnings_log) == 1
+        assert "800 ms" in warnings_log[0]
+        assert "3 linhas" in warnings_log[0]
+        assert "(str)" in warnings_log[0]
+        assert "12345678000199" not in warnings_log[0]
+
+    def test_threshold_none_disables_log(self, monkeypatch, warnings_log):
+        """Testa que db_slow_query_threshold=None desliga o log"""
+        monkeypatch.setattr(settings, "db_slow_query_threshold", None)
+
+        record_query("SELECT 1", None, 100.0)
+
+        assert warnings_log == []
+
+    def test_observe_query_records_errors(self):
+        """Testa que observe_query registra a execução mesmo com erro"""
+        with pytest.raises(RuntimeError):
+            with observe_query("UPDATE t SET a = 1"):
+                raise RuntimeError("falha")
+
+        with observe_query("UPDATE t SET a = 2") as observation:
+            observation.rows = 5
+
+        stats = get_query_stats()["UPDATE t SET a = ?"]
+        assert stats["count"] == 2
+        assert stats["errors"] == 1
+        assert stats["rows"] == 5
+
+    def test_get_query_stats_top(self):
+        """Testa ordenação e limite de get_query_stats"""
+        record_query("SELECT 1 FROM a", None, 0.001)
+        record_query("SELECT 1 FROM b", None, 0.2)
+
+        assert list(get_query_stats(top=1)) == ["SELECT ? FROM b"]
@@ -0,0 +1,186 @@
+"""
+Testes para LISTEN/NOTIFY (database.notify)
+Testa despacho, assinaturas, reconexão, envio e instalação de triggers
+"""
+import json
+import pytest
+from unittest.mock import MagicMock, Mock, patch
+import psycopg2
+from automacoes_python_base_td.database.notify import (
+    MAX_PAYLOAD_SIZE,
+    Notification,
+    NotificationListener,
+    default_channel,
+    install_notify_trigger,
+    notify,
+    remove_notify_trigger,
+)
+
+
+def _mock_connection():
+    conn = MagicMock()
+    conn.closed = 0
+    conn.close.side_effect = lambda: setattr(conn, "closed", 1)
+    conn.notifies = []
+    cursor = MagicMock()
+    conn.cursor.return_value.__enter__ = Mock(return_value=cursor)
+    conn.cursor.return_value.__exit__ = Mock(return_value=False)
+    return conn, cursor
+
+
+class TestNotification:
+    """Testes para Notification"""
+
+    def test_data_decodes_json(self):
+        """Testa decodificação do payload JSON"""
+        assert Notification("c", '{"id": 1}', 10).data == {"id": 1}
+        assert Notification("c", "texto", 10).data == "texto"
+
+
+class TestNotificationListener:
+    """Testes para NotificationListener"""
+
+    def test_dispatch_to_callback_or_queue(self):
+        """Testa que canais com callback não vão para a fila"""
+        received = []
+        listener = NotificationListener(["fila"])
+        listener.subscribe("eventos", received.append)
+
+        listener._dispatch(Notification("eventos", "1", 1))
+        listener._dispatch(Notification("fila", "2", 1))
+
+        assert [n.payload for n in received] == ["1"]
+        assert listener.get(timeout=0).payload == "2"
+        assert listener.get(timeout=0) is None
+
+    def test_callback_error_does_not_stop_dispatch(self):
+        """Testa que erro em um callback não impede os demais"""
+        received = []
+        listener = NotificationListener()
+        listener.subscribe("eventos", Mock(side_effect=RuntimeError("falha")))
+        listener.subscribe("eventos", received.append)
+
+        listener._dispatch(Notification("eventos", "1", 1))
+
+        assert len(received) == 1
+
+    @patch('psycopg2.connect')
+    def test_sync_channels_listens_and_unlistens(self, mock_connect):
+        """Testa LISTEN/UNLISTEN conforme as assinaturas em conexão autocommit"""
+        conn, cursor = _mock_connection()
+        mock_connect.return_value = conn
+        listener = NotificationListener(["a"])
+        listener.subscribe("b")
+
+        listener._ensure_connection()
+        listener._sync_channels()
+        listener.unsubscribe("a")
+        listener._sync_channels()
+
+        assert conn.autocommit is True
+        executed = [repr(call.args[0]) for call in cursor.execute.call_args_list]
+        assert len(executed) == 3
+        assert "LISTEN" in executed[0] and "Identifier('a')" in executed[0]
+        assert "LISTEN" in executed[1] and "Identifier('b')" in executed[1]
+        assert "UNLISTEN" in executed[2] and "Identifier('a')" in executed[2]
+
+    @patch('select.select')
+    def test_poll_dispatches_notifies(self, mock_select):
+        """Testa leitura das notificações recebidas após poll()"""
+        conn, _ = _mock_connection()
+        mock_select.return_value = ([conn], [], [])
+        conn.poll.side_effect = lambda: conn.notifies.append(Mock(channel="c", payload="p", pid=7))
+        listener = NotificationListener(["c"])
+        listener._conn = conn
+
+        listener._poll(0.1)
+
+        assert listener.get(timeout=0) == Notification("c", "p", 7)
+
+    @patch('psycopg2.connect')
+    def test_reconnect_relistens_and_calls_on_reconnect(self, mock_connect):
+        """Testa reconexão com backoff, novo LISTEN e on_reconnect"""
+        first, _ = _mock_connection()
+        second, second_cursor = _mock_connection()
+        mock_connect.side_effect = [first, second]
+        on_reconnect = Mock()
+        listener = NotificationListener(["c"], on_reconnect=on_reconnect, reconnect_delay=0)
+
+        listener._ensure_connection()
+        listener._sync_channels()
+        listener._handle_disconnect(psycopg2.OperationalError("server closed the connection"))
+        listener._ensure_connection()
+        listener._sync_channels()
+
+        first.close.assert_called_once()
+        on_reconnect.assert_called_once()
+        assert listener.reconnects == 1
+        assert "LISTEN" in repr(second_cursor.execute.call_args.args[0])
+
+    def test_backoff_grows_and_is_capped(self):
+        """Testa que a espera dobra a cada falha até o máximo"""
+        listener = NotificationListener(reconnect_delay=1, max_reconnect_delay=4)
+        waits = []
+        listener._stop.wait = waits.append
+
+        for _ in range(5):
+            listener._handle_disconnect(RuntimeError("queda"))
+
+        assert waits[0] <= 1 and waits[2] <= 4
+        assert all(wait <= 4 for wait in waits)
+        assert waits[4] >= 2  # 4s com jitter de 50% a 100%
+
+
+class TestNotify:
+    """Testes para notify()"""
+
+    @patch('automacoes_python_base_td.database.notify.execute_query')
+    def test_notify_serializes_payload(self, mock_execute):
+        """Testa envio com pg_notify e payload JSON"""
+        notify("canal", {"id": 1, "status": "ok"})
+
+        query, params, _ = mock_execute.call_args.args
+        assert query == "SELECT pg_notify(%s, %s)"
+        assert params[0] == "canal"
+        assert json.loads(params[1]) == {"id": 1, "status": "ok"}
+
+    def test_notify_rejects_large_payload(self):
+        """Testa limite de tamanho do payload"""
+        with pytest.raises(ValueError):
+            notify("canal", "x" * (MAX_PAYLOAD_SIZE + 1))
+
+
+class TestTriggers:
+    """Testes para install_notify_trigger / remove_notify_trigger"""
+
+    @patch('automacoes_python_base_td.database.notify.get_connection')
+    def test_install_trigger(self, mock_get_connection):
+        """Testa criação da função e do trigger com o canal padrão"""
+        conn, cursor = _mock_connection()
+        mock_get_connection.return_value.__enter__.return_value = conn
+
+        channel = install_notify_trigger("public.dctf_download_unit")
+
+        assert channel == "dctf_download_unit_changes" == default_channel("public.dctf_download_unit")
+        function_sql, drop_sql, trigger_sql = [repr(call.args[0]) for call in cursor.execute.call_args_list]
+        assert "CREATE OR REPLACE FUNCTION" in function_sql
+        assert "Literal('dctf_download_unit_changes')" in function_sql
+        assert "Identifier('status')" in function_sql
+        assert "DROP TRIGGER IF EXISTS" in drop_sql
+        assert "INSERT" in trigger_sql and "UPDATE" in trigger_sql
+        assert "Identifier('public')" in trigger_sql
+
+    def test_install_trigger_validates_events(self):
+        """Testa validação dos eventos"""
+        with pytest.raises(ValueError):
+            install_notify_trigger("t", events=("TRUNCATE",))
+
+    @patch('automacoes_python_base_td.database.notify.get_connection')
+    def test_remove_trigger(self, mock_get_connection):
+        """Testa remoção do trigger e da função"""
+        conn, cursor = _mock_connection()
+        mock_get_connection.return_value.__enter__.return_value = conn
+
+        remove_notify_trigger("dctf_retificacoes")
+
+        assert cursor.execute.call_count == 2
@@ -0,0 +1,73 @@
+"""
+Testes para o repository de organizações
+Testa leituras em uma única query e snapshots utilizáveis após a sessão (SQLite real)
+"""
+import pytest
+from contextlib import contextmanager
+from datetime import date, datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from automacoes_python_base_td.database.models.tdax import Certificates, Organizacoes
+from automacoes_python_base_td.database.repositories import organization_repository
+from automacoes_python_base_td.database.snapshot import Snapshot
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    """Banco SQLite com duas organizações e seus certificados; retorna os SQL executados"""
+    engine = create_engine("sqlite://")
+    Certificates.__table__.create(engine)
+    Organizacoes.__table__.create(engine)
+    with Session(engine) as session:
+        for index in (1, 2):
+            session.add(Certificates(id=index, cnpj=f"1234567800019{index}", name=f"ACME {index}", file_name=f"acme{index}.pfx", description="b'pfx'", password=f"segredo{index}", valid_start_date=date(2024, 1, 1), valid_end_date=date(2025, 1, 1), imported_at=datetime(2024, 1, 1)))
+            session.add(Organizacoes(id=10 + index, cnpj=f"1234567800019{index}", nome=f"ACME {index}", apelido=f"acme{index}", certificate_id=index, created_at=datetime(2024, 1, 1), ativo=True))
+        session.commit()
+
+    @contextmanager
+    def fake_get_session(db_type="tdax"):
+        with Session(engine) as session:
+            yield session
+            session.commit()
+
+    monkeypatch.setattr(organization_repository, "get_session", fake_get_session)
+    executed = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: executed.append(statement))
+    yield executed
+    engine.dispose()
+
+
+def selects(statements):
+    return [statement for statement in statements if statement.startswith("SELECT")]
+
+
+class TestOrganizationRepository:
+    """Testes para as leituras de organizações"""
+
+    def test_get_certificate_organizations_single_query(self, statements):
+        """Testa organizações e certificados em uma query, sem um SELECT por organização"""
+        results = organization_repository.get_certificate_organizations()
+
+        assert sorted((org.id, certificate.password) for org, certificate in results) == [(11, "segredo1"), (12, "segredo2")]
+        assert all(isinstance(item, Snapshot) for pair in results for item in pair)
+        assert len(selects(statements)) == 1
+
+    def test_get_organization_by_id_returns_snapshot(self, statements):
+        """Testa snapshot da organização, legível depois que a sessão fecha"""
+        org = organization_repository.get_organization_by_id(11)
+
+        assert isinstance(org, Snapshot)
+        assert (org.id, org.nome) == (11, "ACME 1")
+        assert organization_repository.get_organization_by_id(999) is None
+
+    def test_get_organizations_by_filters_returns_snapshots(self, statements):
+        """Testa filtros retornando snapshots"""
+        orgs = organization_repository.get_organizations_by_filters(apelido="acme2")
+
+        assert [(org.id, org.cnpj) for org in orgs] == [(12, "12345678000192")]
+        assert isinstance(orgs[0], Snapshot)
+
+    def test_get_organization_certificate_single_query(self, statements):
+        """Testa nome do arquivo e senha do certificado com uma única query"""
+        assert organization_repository.get_organization_certificate(12) == ("acme2.pfx", "segredo2")
+        assert len(selects(statements)) == 1
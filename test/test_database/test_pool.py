@@ -0,0 +1,150 @@
+"""
+Testes para o pool de conexões psycopg2
+Testa reaproveitamento, limites, expiração e health check
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+from automacoes_python_base_td.database.pool import ConnectionPool, get_pool, close_all_pools
+from automacoes_python_base_td.database.connection import DatabaseConnection, get_connection
+
+
+def make_conn():
+    """Cria um mock de conexão ociosa"""
+    conn = MagicMock()
+    conn.closed = 0
+    conn.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_IDLE
+    return conn
+
+
+class TestConnectionPool:
+    """Testes para classe ConnectionPool"""
+    
+    def test_reuses_returned_connection(self):
+        """Testa se a conexão devolvida é reaproveitada sem novo connect"""
+        connect = MagicMock(side_effect=lambda: make_conn())
+        pool = ConnectionPool(connect, max_size=2, ping_interval=60)
+        
+        conn1 = pool.getconn()
+        pool.putconn(conn1)
+        conn2 = pool.getconn()
+        
+        assert conn1 is conn2
+        assert connect.call_count == 1
+    
+    def test_exhausted_pool_raises_after_timeout(self):
+        """Testa se o pool esgotado lança PoolError após o timeout"""
+        pool = ConnectionPool(make_conn, max_size=1, timeout=0.01)
+        pool.getconn()
+        
+        with pytest.raises(PoolError):
+            pool.getconn()
+    
+    def test_putconn_rolls_back_open_transaction(self):
+        """Testa se transações abertas são desfeitas na devolução"""
+        pool = ConnectionPool(make_conn, max_size=1)
+        conn = pool.getconn()
+        conn.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_INTRANS
+        
+        pool.putconn(conn)
+        
+        conn.rollback.assert_called_once()
+        assert pool.stats()["idle"] == 1
+    
+    def test_expired_connection_is_discarded(self):
+        """Testa se conexões acima do max_lifetime são fechadas"""
+        pool = ConnectionPool(make_conn, max_size=1, max_lifetime=0.001)
+        conn = pool.getconn()
+        
+        with patch("automacoes_python_base_td.database.pool.time.monotonic", return_value=1e12):
+            pool.putconn(conn)
+        
+        conn.close.assert_called_once()
+        assert pool.size == 0
+    
+    def test_failed_health_check_opens_new_connection(self):
+        """Testa se conexão que falha no SELECT 1 é trocada por uma nova"""
+        broken = make_conn()
+        broken.cursor.return_value.__enter__.return_value.execute.side_effect = Exception("gone")
+        healthy = make_conn()
+        connect = MagicMock(side_effect=[broken, healthy])
+        pool = ConnectionPool(connect, max_size=1, ping_interval=0)
+        
+        pool.putconn(pool.getconn())
+        conn = pool.getconn()
+        
+        assert conn is healthy
+        broken.close.assert_called_once()
+    
+    def test_idle_connections_pruned_above_min_size(self):
+        """Testa se conexões ociosas além do min_size são fechadas"""
+        pool = ConnectionPool(make_conn, min_size=1, max_size=3, idle_timeout=0.001)
+        conns = [pool.getconn() for _ in range(3)]
+        for conn in conns:
+            pool.putconn(conn)
+        
+        with patch("automacoes_python_base_td.database.pool.time.monotonic", return_value=1e12):
+            pool._acquire(deadline=1e12 + 1)
+        
+        assert sum(conn.close.called for conn in conns) == 2
+
+
+class TestPoolRegistry:
+    """Testes para o registro global de pools"""
+    
+    def test_get_pool_caches_by_key(self):
+        """Testa se o mesmo destino retorna o mesmo pool"""
+        pool1 = get_pool(("host", 5432, "db", "user", "pass"), make_conn)
+        pool2 = get_pool(("host", 5432, "db", "user", "pass"), make_conn)
+        
+        assert pool1 is pool2
+        close_all_pools()
+        assert get_pool(("host", 5432, "db", "user", "pass"), make_conn) is not pool1
+    
+    @patch('psycopg2.connect')
+    def test_get_connection_uses_pool(self, mock_connect):
+        """Testa se get_connection reaproveita a conexão entre chamadas"""
+        mock_connect.side_effect = lambda **kwargs: make_conn()
+        
+        with get_connection(host="localhost") as conn1:
+            pass
+        with get_connection(host="localhost") as conn2:
+            pass
+        
+        assert conn1 is conn2
+        assert mock_connect.call_count == 1
+        conn1.close.assert_not_called()
+    
+    @patch('psycopg2.connect')
+    def test_database_connection_returns_to_pool(self, mock_connect):
+        """Testa se DatabaseConnection com use_pool devolve a conexão em close()"""
+        mock_connect.side_effect = lambda **kwargs: make_conn()
+        
+        db = DatabaseConnection(host="localhost", use_pool=True)
+        conn = db.connect()
+        db.close()
+        
+        conn.close.assert_not_called()
+        assert db._pool.stats()["idle"] == 1
+
+
+class TestForkSafety:
+    """Testes para o comportamento do pool após fork"""
+    
+    def test_child_does_not_reuse_or_close_inherited_connections(self):
+        """Testa que o filho abre conexões próprias e não fecha as do pai"""
+        pool = ConnectionPool(lambda: make_conn(), max_size=2, ping_interval=60)
+        parent_idle = pool.getconn()
+        parent_in_use = pool.getconn()
+        pool.putconn(parent_idle)
+        
+        with patch('automacoes_python_base_td.database.pool.os.getpid', return_value=-1):
+            child_conn = pool.getconn()
+            pool.putconn(parent_in_use)
+            
+            assert child_conn is not parent_idle
+            assert pool.stats() == {"size": 1, "idle": 0, "in_use": 1, "max_size": 2}
+        
+        parent_idle.close.assert_not_called()
+        parent_in_use.close.assert_not_called()
@@ -0,0 +1,151 @@
+"""
+Testes para métricas do pool das engines SQLAlchemy
+Testa contadores, espera no checkout, timeouts, avisos e recriação do pool
+"""
+import pytest
+from loguru import logger
+from sqlalchemy import create_engine, exc, text
+from unittest.mock import patch
+from automacoes_python_base_td.database.pool_metrics import InstrumentedNullPool, InstrumentedQueuePool
+from automacoes_python_base_td.database.session import DatabaseSessionManager
+from automacoes_python_base_td.settings import settings
+
+
+@pytest.fixture
+def engine():
+    """Engine SQLite real com o pool instrumentado"""
+    engine = create_engine(
+        "sqlite://",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def log_messages():
+    """Captura mensagens INFO+ do loguru"""
+    messages = []
+    handler_id = logger.add(messages.append, format="{level} {message}", level="INFO")
+    yield messages
+    logger.remove(handler_id)
+
+
+class TestInstrumentedQueuePool:
+    """Testes para InstrumentedQueuePool / PoolMetrics"""
+
+    def test_counts_checkouts_overflow_and_connects(self, engine):
+        """Testa conexões em uso, overflow e contadores de eventos"""
+        first = engine.connect()
+        second = engine.connect()
+
+        stats = engine.pool.stats()
+        assert stats["checked_out"] == 2
+        assert stats["overflow"] == 1
+        assert stats["connects"] == 2
+        assert stats["checkouts"] == 2
+        assert stats["connection_age_max_s"] >= 0
+
+        first.close()
+        second.close()
+        stats = engine.pool.stats()
+        assert stats["checked_out"] == 0
+        assert stats["checkins"] == 2
+
+    def test_timeout_is_counted(self, engine, monkeypatch):
+        """Testa que pool esgotado conta timeout e registra a espera"""
+        monkeypatch.setattr(settings, "db_engine_pool_wait_warning", None)
+        connections = [engine.connect(), engine.connect()]
+
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+        stats = engine.pool.stats()
+        assert stats["timeouts"] == 1
+        assert stats["wait_max_ms"] >= 50
+        for connection in connections:
+            connection.close()
+
+    def test_invalidation_is_counted(self, engine):
+        """Testa contagem de invalidações e remoção da idade da conexão fechada"""
+        with engine.connect() as connection:
+            connection.invalidate()
+
+        stats = engine.pool.stats()
+        assert stats["invalidations"] == 1
+        assert stats["connection_age_max_s"] == 0.0
+
+    def test_slow_checkout_warning(self, engine, monkeypatch, log_messages):
+        """Testa aviso quando a espera passa do limite"""
+        monkeypatch.setattr(settings, "db_engine_pool_wait_warning", 0.0)
+
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+        warnings = [message for message in log_messages if message.startswith("WARNING")]
+        assert len(warnings) == 1
+        assert "checkout esperou" in warnings[0]
+        assert "em uso 1/2" in warnings[0]
+
+    def test_periodic_status_log(self, engine, monkeypatch, log_messages):
+        """Testa linha de status limitada pelo intervalo"""
+        monkeypatch.setattr(settings, "db_engine_pool_wait_warning", None)
+        monkeypatch.setattr(settings, "db_engine_pool_log_interval", 3600)
+        engine.pool.metrics._last_log -= 3600
+
+        for _ in range(3):
+            with engine.connect():
+                pass
+
+        status = [message for message in log_messages if "checkouts" in message]
+        assert len(status) == 1
+
+    def test_metrics_survive_dispose(self, engine):
+        """Testa que engine.dispose() mantém métricas e listeners"""
+        with engine.connect():
+            pass
+        metrics = engine.pool.metrics
+
+        engine.dispose()
+        with engine.connect():
+            pass
+
+        assert engine.pool.metrics is metrics
+        assert engine.pool.stats()["checkouts"] == 2
+
+
+class TestInstrumentedNullPool:
+    """Testes para InstrumentedNullPool (modo PgBouncer transaction)"""
+    
+    def test_counts_open_connections(self):
+        """Testa conexões em uso e abertura a cada checkout"""
+        engine = create_engine("sqlite://", poolclass=InstrumentedNullPool)
+        
+        connection = engine.connect()
+        assert engine.pool.stats()["checked_out"] == 1
+        connection.close()
+        with engine.connect():
+            pass
+        
+        stats = engine.pool.stats()
+        assert stats["checked_out"] == 0
+        assert stats["connects"] == 2
+        assert stats["size"] == 0
+        engine.dispose()
+
+
+class TestManagerPoolStats:
+    """Testes para DatabaseSessionManager.pool_stats()"""
+
+    def test_manager_uses_instrumented_pool(self):
+        """Testa que o manager cria a engine com o pool instrumentado e nomeado"""
+        with patch("automacoes_python_base_td.database.session.create_engine") as mock_engine:
+            with patch("automacoes_python_base_td.database.session.sessionmaker"):
+                manager = DatabaseSessionManager(db_type="tdax", database_url="postgresql://test/test")
+
+        assert mock_engine.call_args.kwargs["poolclass"] is InstrumentedQueuePool
+        assert mock_engine.return_value.pool.metrics.name == "tdax"
+        assert manager.pool_stats() is mock_engine.return_value.pool.stats.return_value
@@ -0,0 +1,90 @@
+"""
+Testes para a configuração de pool das engines e o modo PgBouncer
+Testa opções de create_engine vindas de settings e o modo transaction
+"""
+from unittest.mock import patch
+from sqlalchemy.pool import NullPool
+from automacoes_python_base_td.database.pool_metrics import InstrumentedNullPool, InstrumentedQueuePool
+from automacoes_python_base_td.database.pooler import (
+    engine_pool_options,
+    pooler_connect_args,
+    transaction_pooler,
+)
+from automacoes_python_base_td.database.session import DatabaseSessionManager
+from automacoes_python_base_td.settings import settings
+
+
+class TestEnginePoolOptions:
+    """Testes para engine_pool_options()"""
+    
+    def test_session_mode_uses_settings(self, monkeypatch):
+        """Testa pool de settings no modo padrão (session)"""
+        monkeypatch.setattr(settings, "db_pooler_mode", "session")
+        monkeypatch.setattr(settings, "db_engine_pool_size", 20)
+        monkeypatch.setattr(settings, "db_engine_pool_recycle", 1800)
+        monkeypatch.setattr(settings, "db_engine_pool_pre_ping", False)
+        monkeypatch.setattr(settings, "db_engine_pool_use_lifo", True)
+        
+        options = engine_pool_options(max_overflow=0)
+        
+        assert options["poolclass"] is InstrumentedQueuePool
+        assert options["pool_size"] == 20
+        assert options["max_overflow"] == 0
+        assert options["pool_recycle"] == 1800
+        assert options["pool_pre_ping"] is False
+        assert options["pool_use_lifo"] is True
+        assert options["pool_timeout"] == settings.db_engine_pool_timeout
+    
+    def test_recycle_disabled_by_default(self, monkeypatch):
+        """Testa que recycle None vira -1 (sem limite no SQLAlchemy)"""
+        monkeypatch.setattr(settings, "db_pooler_mode", "session")
+        monkeypatch.setattr(settings, "db_engine_pool_recycle", None)
+        
+        assert engine_pool_options()["pool_recycle"] == -1
+    
+    def test_transaction_mode_uses_null_pool(self, monkeypatch):
+        """Testa NullPool sem pre-ping atrás de PgBouncer"""
+        monkeypatch.setattr(settings, "db_pooler_mode", "transaction")
+        
+        assert transaction_pooler()
+        assert engine_pool_options(pool_size=50) == {"poolclass": InstrumentedNullPool, "pool_pre_ping": False}
+        assert engine_pool_options(instrumented=False)["poolclass"] is NullPool
+    
+    def test_psycopg3_prepare_disabled_in_transaction_mode(self, monkeypatch):
+        """Testa prepare_threshold=None apenas para psycopg 3 em modo transaction"""
+        monkeypatch.setattr(settings, "db_pooler_mode", "transaction")
+        assert pooler_connect_args("postgresql+psycopg://u:p@h/tdax") == {"prepare_threshold": None}
+        assert pooler_connect_args("postgresql+psycopg2://u:p@h/tdax") == {}
+        
+        monkeypatch.setattr(settings, "db_pooler_mode", "session")
+        assert pooler_connect_args("postgresql+psycopg://u:p@h/tdax") == {}
+
+
+class TestManagerPoolSettings:
+    """Testes para o DatabaseSessionManager com o pool de settings"""
+    
+    def test_manager_defaults_from_settings(self, monkeypatch):
+        """Testa tamanho do pool vindo de settings quando não informado"""
+        monkeypatch.setattr(settings, "db_pooler_mode", "session")
+        monkeypatch.setattr(settings, "db_engine_pool_size", 12)
+        monkeypatch.setattr(settings, "db_engine_max_overflow", 3)
+        
+        with patch("automacoes_python_base_td.database.session.create_engine") as mock_engine:
+            with patch("automacoes_python_base_td.database.session.sessionmaker"):
+                manager = DatabaseSessionManager(database_url="postgresql://test/test")
+        
+        kwargs = mock_engine.call_args.kwargs
+        assert (manager.pool_size, manager.max_overflow) == (12, 3)
+        assert (kwargs["pool_size"], kwargs["max_overflow"]) == (12, 3)
+    
+    def test_manager_in_transaction_mode(self, monkeypatch):
+        """Testa engine sem pool local em modo transaction"""
+        monkeypatch.setattr(settings, "db_pooler_mode", "transaction")
+        
+        with patch("automacoes_python_base_td.database.session.create_engine") as mock_engine:
+            with patch("automacoes_python_base_td.database.session.sessionmaker"):
+                DatabaseSessionManager(database_url="postgresql://test/test")
+        
+        kwargs = mock_engine.call_args.kwargs
+        assert kwargs["poolclass"] is InstrumentedNullPool
+        assert "pool_size" not in kwargs
@@ -0,0 +1,298 @@
+"""
+Testes para o cache de prepared statements
+Testa conversão de placeholders, LRU por conexão e estatísticas
+"""
+import pytest
+from unittest.mock import MagicMock, Mock, patch
+import psycopg2
+from psycopg2 import extensions
+from automacoes_python_base_td.database.prepared import (
+    StatementCache,
+    to_prepared_sql,
+    execute_prepared,
+    get_prepared_statement_stats,
+    reset_prepared_statement_stats,
+)
+from automacoes_python_base_td.database import connection as connection_module
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    """Zera as estatísticas antes de cada teste"""
+    reset_prepared_statement_stats()
+
+
+def executed(cursor):
+    """Lista de SQL executados no cursor mock"""
+    return [call.args[0] for call in cursor.execute.call_args_list]
+
+
+class FakeConnection:
+    """
+    Conexão falsa que simula o servidor: statements preparados (que não são
+    desfeitos no rollback), SAVEPOINT e transação abortada após erro.
+    """
+    
+    def __init__(self):
+        self.autocommit = False
+        self.prepared = set()
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.executed = []
+        self.fail_execute = None
+        self.fail_prepare = None
+    
+    def get_transaction_status(self):
+        return self.status
+    
+    def rollback(self):
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+    
+    def run(self, statement):
+        self.executed.append(statement)
+        if statement.startswith("ROLLBACK TO SAVEPOINT"):
+            self.status = extensions.TRANSACTION_STATUS_INTRANS
+            return
+        if self.status == extensions.TRANSACTION_STATUS_INERROR:
+            raise psycopg2.errors.InFailedSqlTransaction("current transaction is aborted")
+        self.status = extensions.TRANSACTION_STATUS_INTRANS
+        name = statement.split()[1] if " " in statement else ""
+        error = None
+        if statement.startswith("PREPARE") and name in self.prepared:
+            error = psycopg2.errors.DuplicatePreparedStatement(f"prepared statement \"{name}\" already exists")
+        elif statement.startswith(("EXECUTE", "DEALLOCATE")) and name not in self.prepared:
+            error = psycopg2.errors.InvalidSqlStatementName(f"prepared statement \"{name}\" does not exist")
+        elif statement.startswith("PREPARE") and self.fail_prepare is not None:
+            error = self.fail_prepare
+        elif statement.startswith("EXECUTE") and self.fail_execute is not None:
+            error, self.fail_execute = self.fail_execute, None
+        if error is not None:
+            self.status = extensions.TRANSACTION_STATUS_INERROR
+            raise error
+        if statement.startswith("PREPARE"):
+            self.prepared.add(name)
+        elif statement.startswith("DEALLOCATE"):
+            self.prepared.discard(name)
+
+
+class FakeCursor:
+    """Cursor que envia cada statement (separado por ';') à FakeConnection"""
+    
+    def __init__(self, connection):
+        self.connection = connection
+    
+    def execute(self, query, params=None):
+        for statement in query.split("; "):
+            self.connection.run(statement)
+
+
+class TestToPreparedSql:
+    """Testes para conversão de placeholders"""
+    
+    def test_converts_positional_placeholders(self):
+        """Testa conversão de %s em $n e de %% em %"""
+        query, count = to_prepared_sql("SELECT * FROM empresas WHERE cnpj = %s AND nome LIKE 'A%%' AND id = %s")
+        
+        assert query == "SELECT * FROM empresas WHERE cnpj = $1 AND nome LIKE 'A%' AND id = $2"
+        assert count == 2
+
+
+class TestStatementCache:
+    """Testes para o LRU de statements"""
+    
+    def test_evicts_least_recently_used(self):
+        """Testa se o statement menos usado é removido ao passar do limite"""
+        cache = StatementCache(max_size=2)
+        cache.put("a", "stmt_a")
+        cache.put("b", "stmt_b")
+        cache.get("a")
+        
+        evicted = cache.put("c", "stmt_c")
+        
+        assert evicted == "stmt_b"
+        assert len(cache) == 2
+
+
+class TestExecutePrepared:
+    """Testes para execute_prepared"""
+    
+    def test_prepares_once_then_executes(self):
+        """Testa se o PREPARE acontece só na primeira chamada da conexão"""
+        cursor = MagicMock()
+        query = "SELECT * FROM empresas WHERE cnpj = %s"
+        
+        execute_prepared(cursor, query, ("123",))
+        execute_prepared(cursor, query, ("456",))
+        
+        statements = executed(cursor)
+        assert statements[0].startswith("PREPARE td_")
+        assert statements[0].endswith("AS SELECT * FROM empresas WHERE cnpj = $1")
+        assert statements[1].startswith("EXECUTE td_")
+        assert statements[2] == statements[1]
+        assert cursor.execute.call_args.args[1] == ("456",)
+        
+        stats = get_prepared_statement_stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+        assert stats["hit_ratio"] == 0.5
+    
+    def test_named_params_fall_back_to_plain_execute(self):
+        """Testa se parâmetros nomeados não usam PREPARE"""
+        cursor = MagicMock()
+        
+        execute_prepared(cursor, "SELECT * FROM empresas WHERE cnpj = %(cnpj)s", {"cnpj": "1"})
+        
+        cursor.execute.assert_called_once_with("SELECT * FROM empresas WHERE cnpj = %(cnpj)s", {"cnpj": "1"})
+    
+    def test_execute_error_keeps_statement(self):
+        """Testa que erro da query no EXECUTE mantém o statement (PREPARE não é transacional)"""
+        conn = FakeConnection()
+        cursor = FakeCursor(conn)
+        query = "SELECT * FROM empresas WHERE id = %s"
+        conn.fail_execute = psycopg2.errors.DivisionByZero("division by zero")
+        
+        with pytest.raises(psycopg2.errors.DivisionByZero):
+            execute_prepared(cursor, query, (1,))
+        conn.rollback()
+        execute_prepared(cursor, query, (1,))
+        
+        assert sum(statement.startswith("PREPARE") for statement in conn.executed) == 1
+        assert conn.executed[-1].startswith("EXECUTE")
+        assert get_prepared_statement_stats()["errors"] == 1
+    
+    def test_missing_statement_is_prepared_again(self):
+        """Testa PREPARE de novo quando o statement sumiu do servidor (ex: DISCARD ALL)"""
+        conn = FakeConnection()
+        cursor = FakeCursor(conn)
+        query = "SELECT * FROM empresas WHERE id = %s"
+        execute_prepared(cursor, query, (1,))
+        conn.prepared.clear()
+        
+        with pytest.raises(psycopg2.errors.InvalidSqlStatementName):
+            execute_prepared(cursor, query, (1,))
+        conn.rollback()
+        execute_prepared(cursor, query, (1,))
+        
+        assert sum(statement.startswith("PREPARE") for statement in conn.executed) == 2
+        assert len(conn.prepared) == 1
+    
+    def test_existing_statement_on_server_is_reused(self):
+        """Testa que PREPARE de statement já existente não aborta a transação"""
+        conn = FakeConnection()
+        query = "SELECT * FROM empresas WHERE id = %s"
+        execute_prepared(FakeCursor(conn), query, (1,))
+        
+        # Outro cache (ex: entrada perdida) para a mesma conexão do servidor
+        other = FakeConnection()
+        other.prepared = conn.prepared
+        execute_prepared(FakeCursor(other), query, (2,))
+        
+        assert other.status == extensions.TRANSACTION_STATUS_INTRANS
+        assert other.executed[-1].startswith("EXECUTE")
+        assert any(statement.startswith("ROLLBACK TO SAVEPOINT") for statement in other.executed)
+    
+    def test_composite_params_skip_prepare(self):
+        """Testa que IN %s com tuple executa sem PREPARE (psycopg2 gera (1, 2))"""
+        conn = FakeConnection()
+        cursor = FakeCursor(conn)
+        query = "SELECT * FROM t1 WHERE id IN %s"
+        
+        execute_prepared(cursor, query, ((1, 2),))
+        
+        assert conn.executed == [query]
+        assert not conn.prepared
+    
+    def test_unpreparable_query_falls_back_to_plain_execute(self):
+        """Testa fallback sem PREPARE quando o servidor recusa o PREPARE"""
+        conn = FakeConnection()
+        cursor = FakeCursor(conn)
+        query = "SELECT * FROM t1 WHERE id = ANY(%s::int[]) OR id = %s"
+        conn.fail_prepare = psycopg2.errors.SyntaxError('syntax error at or near "$1"')
+        
+        execute_prepared(cursor, query, (1, 2))
+        execute_prepared(cursor, query, (1, 2))
+        
+        assert conn.status == extensions.TRANSACTION_STATUS_INTRANS
+        assert sum(statement.startswith("PREPARE") for statement in conn.executed) == 1
+        assert conn.executed[-2:] == [query, query]
+        assert "ROLLBACK TO SAVEPOINT td_prepared" in conn.executed
+    
+    def test_other_prepare_errors_are_raised_and_not_remembered(self):
+        """Testa que tabela inexistente no PREPARE sobe sem marcar a query como não preparável"""
+        conn = FakeConnection()
+        cursor = FakeCursor(conn)
+        query = "SELECT * FROM nova_tabela WHERE id = %s"
+        conn.fail_prepare = psycopg2.errors.UndefinedTable('relation "nova_tabela" does not exist')
+
+        with pytest.raises(psycopg2.errors.UndefinedTable):
+            execute_prepared(cursor, query, (1,))
+        assert query not in conn.executed
+
+        conn.rollback()
+        conn.fail_prepare = None
+        execute_prepared(cursor, query, (1,))
+
+        assert sum(statement.startswith("PREPARE") for statement in conn.executed) == 2
+        assert conn.executed[-1].startswith("EXECUTE td_")
+        assert get_prepared_statement_stats()["errors"] == 1
+
+    def test_invalid_plan_is_deallocated_after_rollback(self):
+        """Testa DEALLOCATE e novo PREPARE após plano inválido, fora da transação abortada"""
+        conn = FakeConnection()
+        cursor = FakeCursor(conn)
+        query = "SELECT * FROM empresas WHERE id = %s"
+        execute_prepared(cursor, query, (1,))
+        conn.fail_execute = psycopg2.errors.FeatureNotSupported("cached plan must not change result type")
+        
+        with pytest.raises(psycopg2.errors.FeatureNotSupported):
+            execute_prepared(cursor, query, (1,))
+        conn.rollback()
+        execute_prepared(cursor, query, (1,))
+        
+        statements = [statement for statement in conn.executed if not statement.startswith(("SAVEPOINT", "RELEASE"))]
+        assert statements[-3].startswith("DEALLOCATE td_")
+        assert statements[-2].startswith("PREPARE td_")
+        assert statements[-1].startswith("EXECUTE td_")
+
+
+class TestHelperIntegration:
+    """Testes da integração com fetch_one"""
+    
+    def _mock_connection(self, mock_get_connection):
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = Mock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = Mock(return_value=False)
+        mock_get_connection.return_value.__enter__ = Mock(return_value=mock_conn)
+        mock_get_connection.return_value.__exit__ = Mock(return_value=False)
+        return mock_cursor
+    
+    @patch('automacoes_python_base_td.database.connection.is_pooled', return_value=True)
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_fetch_one_prepared_on_pooled_connection(self, mock_get_connection, mock_is_pooled):
+        """Testa se fetch_one(prepared=True) usa PREPARE em conexão do pool"""
+        cursor = self._mock_connection(mock_get_connection)
+        
+        connection_module.fetch_one("SELECT * FROM empresas WHERE id = %s", (1,), prepared=True)
+        
+        assert executed(cursor)[0].startswith("PREPARE")
+    
+    @patch('automacoes_python_base_td.database.connection.is_pooled', return_value=False)
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_fetch_one_plain_on_unpooled_connection(self, mock_get_connection, mock_is_pooled):
+        """Testa se conexões fora do pool executam a query diretamente"""
+        cursor = self._mock_connection(mock_get_connection)
+        
+        connection_module.fetch_one("SELECT * FROM empresas WHERE id = %s", (1,), prepared=True)
+        
+        cursor.execute.assert_called_once_with("SELECT * FROM empresas WHERE id = %s", (1,))
+    
+    @patch('automacoes_python_base_td.database.connection.is_pooled', return_value=True)
+    @patch('automacoes_python_base_td.database.connection.get_connection')
+    def test_fetch_one_plain_behind_transaction_pooler(self, mock_get_connection, mock_is_pooled, monkeypatch):
+        """Testa que PgBouncer em modo transaction desliga o PREPARE"""
+        monkeypatch.setattr(connection_module.settings, "db_pooler_mode", "transaction")
+        cursor = self._mock_connection(mock_get_connection)
+        
+        connection_module.fetch_one("SELECT * FROM empresas WHERE id = %s", (1,), prepared=True)
+        
+        cursor.execute.assert_called_once_with("SELECT * FROM empresas WHERE id = %s", (1,))
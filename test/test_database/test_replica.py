@@ -0,0 +1,184 @@
+"""
+Testes para roteamento de leituras na réplica
+Testa verificação de atraso, fallback para o primário e sessões somente leitura
+"""
+import pytest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+from sqlalchemy.exc import OperationalError
+from automacoes_python_base_td.database import connection
+from automacoes_python_base_td.database.connection import fetch_all, transaction
+from automacoes_python_base_td.database.replica import ReplicaRouter
+from automacoes_python_base_td.database.session import DatabaseSessionManager
+from automacoes_python_base_td.core.exceptions import DatabaseConnectionError
+from automacoes_python_base_td.settings import settings
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """Configura uma réplica e zera o roteador global"""
+    monkeypatch.setattr(settings, "db_read_host", "replica-host")
+    monkeypatch.setattr(settings, "db_read_port", 6432)
+    monkeypatch.setattr(settings, "db_read_max_lag", None)
+    monkeypatch.setattr(connection, "_replica_router", None)
+    yield
+
+
+def _fake_get_connection(calls, fail_hosts=()):
+    """get_connection falso que registra os destinos usados"""
+    @contextmanager
+    def fake(**params):
+        calls.append(params.get("host"))
+        if params.get("host") in fail_hosts:
+            raise DatabaseConnectionError("sem conexão")
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [{"id": 1}]
+        yield conn
+    return fake
+
+
+class TestReplicaRouter:
+    """Testes para ReplicaRouter"""
+
+    def test_available_without_lag_check(self, monkeypatch):
+        """Testa que sem db_read_max_lag o atraso não é consultado"""
+        monkeypatch.setattr(settings, "db_read_max_lag", None)
+        check_lag = MagicMock()
+
+        assert ReplicaRouter(check_lag).is_available() is True
+        check_lag.assert_not_called()
+
+    def test_unavailable_when_lag_exceeds_max(self, monkeypatch):
+        """Testa que a réplica atrasada é evitada"""
+        monkeypatch.setattr(settings, "db_read_max_lag", 5.0)
+
+        assert ReplicaRouter(lambda: 30.0).is_available() is False
+        assert ReplicaRouter(lambda: 1.0).is_available() is True
+
+    def test_unavailable_when_check_fails(self, monkeypatch):
+        """Testa que falha na verificação desvia para o primário"""
+        monkeypatch.setattr(settings, "db_read_max_lag", 5.0)
+
+        def check_lag():
+            raise RuntimeError("timeout")
+
+        assert ReplicaRouter(check_lag).is_available() is False
+
+    def test_result_is_cached_for_check_interval(self, monkeypatch):
+        """Testa que a verificação não é repetida dentro do intervalo"""
+        monkeypatch.setattr(settings, "db_read_max_lag", 5.0)
+        monkeypatch.setattr(settings, "db_read_check_interval", 60.0)
+        check_lag = MagicMock(return_value=0.0)
+        router = ReplicaRouter(check_lag)
+
+        router.is_available()
+        router.is_available()
+
+        assert check_lag.call_count == 1
+
+    def test_mark_down(self, monkeypatch):
+        """Testa que mark_down desvia leituras até a próxima verificação"""
+        monkeypatch.setattr(settings, "db_read_check_interval", 60.0)
+        router = ReplicaRouter(lambda: 0.0)
+
+        router.mark_down(RuntimeError("queda"))
+
+        assert router.is_available() is False
+
+
+class TestFetchRouting:
+    """Testes para roteamento de fetch_all/fetch_one"""
+
+    def test_reads_go_to_replica(self, replica):
+        """Testa que leituras usam a réplica configurada"""
+        calls = []
+        with patch.object(connection, "get_connection", _fake_get_connection(calls)):
+            result = fetch_all("SELECT * FROM empresas")
+
+        assert result == [{"id": 1}]
+        assert calls == ["replica-host"]
+
+    def test_fallback_to_primary_on_connection_error(self, replica):
+        """Testa fallback para o primário quando a réplica cai"""
+        calls = []
+        fake = _fake_get_connection(calls, fail_hosts=("replica-host",))
+        with patch.object(connection, "get_connection", fake):
+            assert fetch_all("SELECT * FROM empresas") == [{"id": 1}]
+            fetch_all("SELECT * FROM empresas")
+
+        # Segunda leitura já vai direto para o primário
+        assert calls == ["replica-host", None, None]
+
+    def test_use_replica_false(self, replica):
+        """Testa que use_replica=False lê do primário"""
+        calls = []
+        with patch.object(connection, "get_connection", _fake_get_connection(calls)):
+            fetch_all("SELECT * FROM empresas", use_replica=False)
+
+        assert calls == [None]
+
+    def test_explicit_connection_params_skip_replica(self, replica):
+        """Testa que connection_params explícitos não são redirecionados"""
+        calls = []
+        with patch.object(connection, "get_connection", _fake_get_connection(calls)):
+            fetch_all("SELECT * FROM empresas", connection_params={"host": "outro-host"})
+
+        assert calls == ["outro-host"]
+
+    def test_inside_transaction_reads_primary(self, replica):
+        """Testa que leituras em transaction() enxergam as próprias escritas"""
+        with patch("automacoes_python_base_td.database.connection.psycopg2.connect") as mock_connect:
+            conn = mock_connect.return_value
+            conn.cursor.return_value.__enter__.return_value.fetchall.return_value = []
+            with transaction():
+                fetch_all("SELECT * FROM empresas")
+
+        assert mock_connect.call_count == 1
+        assert mock_connect.call_args.kwargs["host"] == settings.db_host
+
+
+class TestReadOnlySession:
+    """Testes para session_scope(read_only=True)"""
+
+    def _manager(self):
+        with patch("automacoes_python_base_td.database.session.create_engine") as mock_engine:
+            with patch("automacoes_python_base_td.database.session.sessionmaker") as mock_sessionmaker:
+                mock_sessionmaker.side_effect = lambda **kwargs: MagicMock(name=str(kwargs["bind"]))
+                manager = DatabaseSessionManager(database_url="postgresql://u:p@primary:5432/tdax")
+                mock_engine.reset_mock()
+                with manager.session_scope(read_only=True) as session:
+                    pass
+                return manager, mock_engine, session
+
+    def test_without_replica_uses_primary(self, monkeypatch):
+        """Testa que sem réplica a sessão somente leitura usa o primário sem commit"""
+        monkeypatch.setattr(settings, "db_read_host", None)
+        manager, mock_engine, session = self._manager()
+
+        mock_engine.assert_not_called()
+        assert manager.SessionLocal.called
+        session.commit.assert_not_called()
+        session.close.assert_called_once()
+
+    def test_with_replica_uses_read_engine(self, replica):
+        """Testa que a sessão somente leitura usa a engine da réplica"""
+        manager, mock_engine, session = self._manager()
+
+        assert mock_engine.call_args[0][0] == "postgresql://u:p@replica-host:6432/tdax"
+        assert manager.ReadSessionLocal.called
+        assert not manager.SessionLocal.called
+        session.commit.assert_not_called()
+
+    def test_operational_error_marks_replica_down(self, replica, monkeypatch):
+        """Testa que erro de conexão na réplica desvia os próximos escopos"""
+        monkeypatch.setattr(settings, "db_read_check_interval", 60.0)
+        manager, _, _ = self._manager()
+
+        with pytest.raises(OperationalError):
+            with manager.session_scope(read_only=True):
+                raise OperationalError("SELECT 1", {}, Exception("conexão perdida"))
+
+        with manager.session_scope(read_only=True):
+            pass
+        assert manager.SessionLocal.called
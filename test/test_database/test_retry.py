@@ -0,0 +1,184 @@
+"""
+Testes para resiliência de conexão (database.retry)
+Testa backoff, keepalives, repetição de conexão e de leituras após queda
+"""
+import pytest
+from unittest.mock import MagicMock, Mock, patch
+import psycopg2
+from psycopg2 import extensions
+from automacoes_python_base_td.database.connection import DatabaseConnection, fetch_all, transaction
+from automacoes_python_base_td.database.retry import (
+    backoff_delays,
+    connect_options,
+    get_connection_stats,
+    is_connection_lost,
+    is_retryable_connect_error,
+    reset_connection_stats,
+)
+from automacoes_python_base_td.core.exceptions import DatabaseConnectionError, DatabaseQueryError
+from automacoes_python_base_td.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    """Zera os contadores de conexão entre os testes"""
+    reset_connection_stats()
+    yield
+    reset_connection_stats()
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    """Evita esperas reais do backoff"""
+    with patch("automacoes_python_base_td.database.connection.time.sleep") as mock_sleep:
+        yield mock_sleep
+
+
+def _mock_connection(cursor=None):
+    conn = MagicMock()
+    conn.closed = 0
+    cursor = cursor or MagicMock()
+    conn.cursor.return_value.__enter__ = Mock(return_value=cursor)
+    conn.cursor.return_value.__exit__ = Mock(return_value=False)
+    return conn, cursor
+
+
+class TestBackoff:
+    """Testes para backoff_delays() e connect_options()"""
+
+    def test_delays_grow_and_are_capped(self):
+        """Testa crescimento exponencial com jitter e limite máximo"""
+        with patch("automacoes_python_base_td.database.retry.random.uniform", side_effect=lambda a, b: b):
+            delays = list(backoff_delays(5, base=0.5, maximum=3.0))
+
+        assert delays == [0.5, 1.0, 2.0, 3.0, 3.0]
+
+    def test_jitter_stays_within_limit(self):
+        """Testa que o jitter nunca passa do limite da tentativa"""
+        delays = list(backoff_delays(4, base=1.0, maximum=10.0))
+
+        assert len(delays) == 4
+        assert all(0 <= delay <= 2 ** attempt for attempt, delay in enumerate(delays))
+
+    def test_connect_options(self, monkeypatch):
+        """Testa parâmetros de timeout e keepalive da libpq"""
+        monkeypatch.setattr(settings, "db_connect_timeout", 5)
+        monkeypatch.setattr(settings, "db_keepalives_idle", 20)
+
+        options = connect_options()
+
+        assert options["connect_timeout"] == 5
+        assert options["keepalives"] == 1
+        assert options["keepalives_idle"] == 20
+
+        monkeypatch.setattr(settings, "db_keepalives_idle", 0)
+        assert "keepalives" not in connect_options()
+
+
+class TestErrorClassification:
+    """Testes para is_retryable_connect_error() e is_connection_lost()"""
+
+    def test_retryable_connect_errors(self):
+        """Testa que falhas de autenticação não são repetidas"""
+        assert is_retryable_connect_error(psycopg2.OperationalError("Connection refused"))
+        assert not is_retryable_connect_error(
+            psycopg2.OperationalError('FATAL:  password authentication failed for user "u"')
+        )
+        assert not is_retryable_connect_error(ValueError("x"))
+
+    def test_connection_lost(self):
+        """Testa distinção entre queda de conexão e erro da query"""
+        assert is_connection_lost(psycopg2.OperationalError("server closed the connection unexpectedly"))
+        assert is_connection_lost(psycopg2.InterfaceError("connection already closed"))
+        assert not is_connection_lost(extensions.QueryCanceledError("canceling statement"))
+        assert not is_connection_lost(psycopg2.ProgrammingError("syntax error"))
+
+
+class TestConnectRetry:
+    """Testes para repetição em DatabaseConnection.connect()"""
+
+    @patch("psycopg2.connect")
+    def test_transient_failure_is_retried(self, mock_connect, no_sleep):
+        """Testa nova tentativa com backoff após falha transitória"""
+        conn, _ = _mock_connection()
+        mock_connect.side_effect = [psycopg2.OperationalError("Connection refused"), conn]
+
+        result = DatabaseConnection(host="h", connect_retries=2).connect()
+
+        assert result is conn
+        assert no_sleep.call_count == 1
+        assert "keepalives" in mock_connect.call_args.kwargs
+        stats = get_connection_stats()
+        assert stats["connect_attempts"] == 2
+        assert stats["connect_failures"] == 1
+        assert stats["connect_retries"] == 1
+
+    @patch("psycopg2.connect")
+    def test_gives_up_after_retries(self, mock_connect, no_sleep):
+        """Testa que esgotadas as tentativas lança DatabaseConnectionError"""
+        mock_connect.side_effect = psycopg2.OperationalError("timeout expired")
+
+        with pytest.raises(DatabaseConnectionError):
+            DatabaseConnection(host="h", connect_retries=2).connect()
+
+        assert mock_connect.call_count == 3
+        assert no_sleep.call_count == 2
+
+    @patch("psycopg2.connect")
+    def test_authentication_failure_is_not_retried(self, mock_connect, no_sleep):
+        """Testa que erro de autenticação falha na primeira tentativa"""
+        mock_connect.side_effect = psycopg2.OperationalError("password authentication failed")
+
+        with pytest.raises(DatabaseConnectionError):
+            DatabaseConnection(host="h", connect_retries=3).connect()
+
+        assert mock_connect.call_count == 1
+        no_sleep.assert_not_called()
+
+
+class TestReadRetry:
+    """Testes para repetição de leituras após queda de conexão"""
+
+    @patch("psycopg2.connect")
+    def test_read_is_retried_on_connection_lost(self, mock_connect, monkeypatch):
+        """Testa que fetch_all repete a leitura em uma conexão nova"""
+        monkeypatch.setattr(settings, "db_read_retries", 1)
+        broken, broken_cursor = _mock_connection()
+        broken_cursor.execute.side_effect = psycopg2.OperationalError("server closed the connection unexpectedly")
+        healthy, healthy_cursor = _mock_connection()
+        healthy_cursor.fetchall.return_value = [{"id": 1}]
+        mock_connect.side_effect = [broken, healthy]
+
+        rows = fetch_all("SELECT id FROM empresas", connection_params={"host": "h", "use_pool": False})
+
+        assert rows == [{"id": 1}]
+        stats = get_connection_stats()
+        assert stats["connections_lost"] == 1
+        assert stats["reads_retried"] == 1
+
+    @patch("psycopg2.connect")
+    def test_query_errors_are_not_retried(self, mock_connect):
+        """Testa que erros da própria query não são repetidos"""
+        conn, cursor = _mock_connection()
+        cursor.execute.side_effect = psycopg2.ProgrammingError("syntax error")
+        mock_connect.return_value = conn
+
+        with pytest.raises(DatabaseQueryError):
+            fetch_all("SELEC 1", connection_params={"host": "h", "use_pool": False})
+
+        assert mock_connect.call_count == 1
+        assert get_connection_stats()["reads_retried"] == 0
+
+    @patch("psycopg2.connect")
+    def test_no_retry_inside_transaction(self, mock_connect):
+        """Testa que dentro de transaction() a leitura não é repetida"""
+        conn, cursor = _mock_connection()
+        cursor.execute.side_effect = psycopg2.OperationalError("server closed the connection unexpectedly")
+        mock_connect.return_value = conn
+
+        with pytest.raises(DatabaseQueryError):
+            with transaction(host="h", use_pool=False):
+                fetch_all("SELECT 1", connection_params={"host": "h"})
+
+        assert mock_connect.call_count == 1
+        assert get_connection_stats()["reads_retried"] == 0
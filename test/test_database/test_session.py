@@ -240,3 +240,245 @@ class TestDatabaseType:
         assert "tdax" in allowed_values
         assert "automations" in allowed_values
 
+
+
+class TestForkSafety:
+    """Testes para o reset do pool do engine após fork"""
+    
+    def test_engine_pool_is_replaced_in_child(self):
+        """Testa dispose(close=False) no filho, mantendo o pool herdado vivo"""
+        with patch('automacoes_python_base_td.database.session.create_engine') as mock_engine:
+            with patch('automacoes_python_base_td.database.session.sessionmaker'):
+                manager = DatabaseSessionManager(database_url="postgresql://test/test")
+                engine = mock_engine.return_value
+                inherited_pool = engine.pool
+                
+                assert manager.engine is engine
+                engine.dispose.assert_not_called()
+                
+                with patch('automacoes_python_base_td.database.session.os.getpid', return_value=-1):
+                    assert manager.engine is engine
+                    manager.get_session()
+                
+                engine.dispose.assert_called_once_with(close=False)
+                assert manager._inherited_pools == [inherited_pool]
+    
+    def test_at_fork_hook_resets_live_managers(self):
+        """Testa que o hook pós-fork reseta os managers vivos"""
+        from automacoes_python_base_td.database import session
+        
+        with patch('automacoes_python_base_td.database.session.create_engine') as mock_engine:
+            with patch('automacoes_python_base_td.database.session.sessionmaker'):
+                manager = DatabaseSessionManager(database_url="postgresql://test/test")
+                
+                with patch('automacoes_python_base_td.database.session.os.getpid', return_value=-1):
+                    session._reset_managers_after_fork()
+                    assert manager._pid == -1
+                
+                mock_engine.return_value.dispose.assert_called_with(close=False)
+
+
+class TestScopedSession:
+    """Testes para sessões por thread/task (scoped_session)"""
+    
+    @pytest.fixture
+    def manager(self):
+        with patch('automacoes_python_base_td.database.session.create_engine'):
+            with patch('automacoes_python_base_td.database.session.sessionmaker') as mock_sessionmaker:
+                mock_sessionmaker.return_value.side_effect = lambda: MagicMock()
+                yield DatabaseSessionManager(database_url="postgresql://test/test")
+    
+    def test_same_scope_reuses_session(self, manager):
+        """Testa que chamadas no mesmo escopo devolvem a mesma sessão"""
+        first = manager.scoped_session()
+        
+        assert manager.scoped_session() is first
+        
+        manager.remove_scoped_session()
+        first.close.assert_called_once()
+        assert manager.scoped_session() is not first
+        manager.remove_scoped_session()
+    
+    def test_each_thread_gets_its_own_session(self, manager):
+        """Testa sessões distintas por thread"""
+        import threading
+        sessions = []
+        
+        def worker():
+            sessions.append(manager.scoped_session())
+            sessions.append(manager.scoped_session())
+            manager.remove_scoped_session()
+        
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len({id(session) for session in sessions}) == 3
+        assert all(session.close.call_count == 1 for session in sessions)
+    
+    def test_each_task_gets_its_own_session(self, manager):
+        """Testa sessões distintas por task, sem herdar a sessão da task pai"""
+        import asyncio
+        
+        async def child():
+            session = manager.scoped_session()
+            manager.remove_scoped_session()
+            return session
+        
+        async def main():
+            parent = manager.scoped_session()
+            children = await asyncio.gather(child(), child())
+            # A task pai continua com a própria sessão, que não foi fechada pelas filhas
+            assert manager.scoped_session() is parent
+            manager.remove_scoped_session()
+            return parent, children
+        
+        parent, children = asyncio.run(main())
+        
+        assert parent not in children
+        assert children[0] is not children[1]
+        parent.close.assert_called_once()
+
+
+class TestManagerRegistryThreadSafety:
+    """Testes para o registro de managers com lock"""
+    
+    def test_concurrent_get_manager_creates_one_instance(self, monkeypatch):
+        """Testa que threads concorrentes criam um único manager"""
+        import threading
+        import time
+        from automacoes_python_base_td.database import session
+        monkeypatch.setenv("DATABASE_URL_TDAX", "postgresql://test/tdax")
+        session._managers.clear()
+        
+        def slow_engine(*args, **kwargs):
+            time.sleep(0.01)
+            return MagicMock()
+        
+        results = []
+        with patch('automacoes_python_base_td.database.session.create_engine', side_effect=slow_engine) as mock_engine:
+            with patch('automacoes_python_base_td.database.session.sessionmaker'):
+                threads = [threading.Thread(target=lambda: results.append(get_manager("tdax"))) for _ in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        
+        session._managers.clear()
+        assert len({id(manager) for manager in results}) == 1
+        assert mock_engine.call_count == 1
+
+
+class TestUnitOfWork:
+    """Testes para unit_of_work (sessão e transação compartilhadas)"""
+    
+    @pytest.fixture
+    def manager(self, tmp_path):
+        """Manager com SQLite real em arquivo e uma tabela de teste"""
+        from sqlalchemy import event, text
+        manager = DatabaseSessionManager(database_url=f"sqlite:///{tmp_path / 'uow.db'}")
+        
+        # pysqlite não emite BEGIN sozinho; sem isso a transação externa não existe
+        @event.listens_for(manager.engine, "connect")
+        def _connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+        
+        @event.listens_for(manager.engine, "begin")
+        def _begin(connection):
+            connection.exec_driver_sql("BEGIN")
+        
+        with manager.engine.begin() as connection:
+            connection.execute(text("CREATE TABLE itens (valor INTEGER)"))
+        yield manager
+        manager.engine.dispose()
+    
+    @staticmethod
+    def _valores(manager):
+        from sqlalchemy import text
+        with manager.session_scope() as session:
+            return [row[0] for row in session.execute(text("SELECT valor FROM itens ORDER BY valor"))]
+    
+    def test_scopes_share_session_and_commit_once(self, manager):
+        """Testa reaproveitamento da sessão e commit apenas ao final"""
+        from sqlalchemy import event, text
+        statements = []
+        event.listen(manager.engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+        
+        with manager.unit_of_work() as uow_session:
+            with manager.session_scope() as first:
+                first.execute(text("INSERT INTO itens VALUES (1)"))
+            with manager.session_scope(read_only=True) as second:
+                assert second.execute(text("SELECT COUNT(*) FROM itens")).scalar() == 1
+        
+        assert first is second is uow_session
+        assert statements[:2] == ["BEGIN", "SAVEPOINT sa_savepoint_1"]
+        assert "RELEASE SAVEPOINT sa_savepoint_1" in statements
+        assert self._valores(manager) == [1]
+    
+    def test_inner_error_rolls_back_only_its_scope(self, manager):
+        """Testa que erro em um escopo interno desfaz só o SAVEPOINT dele"""
+        from sqlalchemy import text
+        with manager.unit_of_work():
+            with manager.session_scope() as session:
+                session.execute(text("INSERT INTO itens VALUES (1)"))
+            with pytest.raises(ValueError):
+                with manager.session_scope() as session:
+                    session.execute(text("INSERT INTO itens VALUES (2)"))
+                    raise ValueError("falha")
+        
+        assert self._valores(manager) == [1]
+    
+    def test_error_leaving_unit_rolls_back_everything(self, manager):
+        """Testa rollback de toda a unidade quando a exceção escapa do bloco"""
+        from sqlalchemy import text
+        with pytest.raises(ValueError):
+            with manager.unit_of_work():
+                with manager.session_scope() as session:
+                    session.execute(text("INSERT INTO itens VALUES (1)"))
+                raise ValueError("falha")
+        
+        assert self._valores(manager) == []
+    
+    def test_nested_unit_reuses_outer(self, manager):
+        """Testa que unidades aninhadas reaproveitam a externa"""
+        with manager.unit_of_work() as outer:
+            with manager.unit_of_work() as inner:
+                assert inner is outer
+            assert manager._active_unit_of_work() is outer
+        
+        assert manager._active_unit_of_work() is None
+    
+    def test_other_thread_does_not_join_unit(self, manager):
+        """Testa que threads criadas dentro da unidade usam sessões próprias"""
+        import contextvars
+        import threading
+        seen = []
+        
+        def worker():
+            with manager.session_scope() as session:
+                seen.append(session)
+        
+        with manager.unit_of_work() as uow_session:
+            context = contextvars.copy_context()
+            thread = threading.Thread(target=context.run, args=(worker,))
+            thread.start()
+            thread.join()
+        
+        assert seen[0] is not uow_session
+    
+    def test_get_session_uses_active_unit(self, monkeypatch):
+        """Testa que get_session e unit_of_work do módulo usam o manager do db_type"""
+        from automacoes_python_base_td.database import session as session_module
+        from automacoes_python_base_td.database.session import unit_of_work
+        manager = DatabaseSessionManager(database_url="sqlite://")
+        monkeypatch.setitem(session_module._managers, "tdax", manager)
+        
+        with unit_of_work("tdax") as uow_session:
+            with get_session("tdax") as session:
+                assert session is uow_session
+        
+        with get_session("tdax") as session:
+            assert session is not uow_session
+        manager.engine.dispose()
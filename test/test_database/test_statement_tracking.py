@@ -0,0 +1,155 @@
+"""
+Testes para instrumentação de statements SQLAlchemy
+Testa registro no histograma, contagem por escopo, N+1 e orçamento
+"""
+import pytest
+from loguru import logger
+from unittest.mock import patch
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from automacoes_python_base_td.database.metrics import get_query_stats, reset_query_stats
+from automacoes_python_base_td.database.session import DatabaseSessionManager
+from automacoes_python_base_td.database.statement_tracking import (
+    PLUGIN_NAME,
+    StatementScope,
+    current_scope,
+    statement_scope,
+)
+from automacoes_python_base_td.settings import settings
+
+
+@pytest.fixture
+def engine():
+    """Engine SQLite real instrumentada pelo plugin"""
+    engine = create_engine("sqlite://", plugins=[PLUGIN_NAME])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    reset_query_stats()
+    yield
+    reset_query_stats()
+
+
+@pytest.fixture
+def warnings_log():
+    """Captura mensagens WARNING do loguru"""
+    messages = []
+    handler_id = logger.add(messages.append, format="{message}", level="WARNING")
+    yield messages
+    logger.remove(handler_id)
+
+
+class TestEngineEvents:
+    """Testes para os eventos before/after_cursor_execute"""
+
+    def test_statements_go_to_query_histogram(self, engine):
+        """Testa registro da duração por fingerprint"""
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1 WHERE 2 = :x"), {"x": 2})
+            conn.execute(text("SELECT 1 WHERE 2 = :x"), {"x": 3})
+
+        stats = get_query_stats()
+        assert stats["SELECT ? WHERE ? = ?"]["count"] == 2
+
+    def test_errors_are_recorded(self, engine):
+        """Testa que statements com erro são registrados"""
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM tabela_inexistente"))
+
+        assert get_query_stats()["SELECT * FROM tabela_inexistente"]["errors"] == 1
+
+
+class TestStatementScope:
+    """Testes para statement_scope() e StatementScope"""
+
+    def test_counts_statements_in_scope(self, engine):
+        """Testa contagem por escopo e resumo"""
+        with statement_scope("importacao") as scope:
+            with engine.connect() as conn:
+                for value in range(3):
+                    conn.execute(text("SELECT :v"), {"v": value})
+
+        summary = scope.summary()
+        assert summary["statements"] == 3
+        assert summary["top"][0] == {"statement": "SELECT ?", "count": 3, "seconds": summary["top"][0]["seconds"]}
+        assert current_scope() is None
+
+    def test_n_plus_one_warning(self, engine, monkeypatch, warnings_log):
+        """Testa aviso de N+1 para o mesmo SELECT repetido"""
+        monkeypatch.setattr(settings, "db_n_plus_one_threshold", 5)
+        monkeypatch.setattr(settings, "db_scope_statement_budget", None)
+
+        with statement_scope("listar_certificados"):
+            with engine.connect() as conn:
+                for org_id in range(6):
+                    conn.execute(text("SELECT :id AS organization_id"), {"id": org_id})
+                conn.execute(text("SELECT 1"))
+
+        assert len(warnings_log) == 1
+        assert "Possível N+1 em listar_certificados: 6x SELECT ? AS organization_id" in warnings_log[0]
+
+    def test_budget_summary(self, engine, monkeypatch, warnings_log):
+        """Testa resumo quando o orçamento de statements é excedido"""
+        monkeypatch.setattr(settings, "db_n_plus_one_threshold", None)
+        monkeypatch.setattr(settings, "db_scope_statement_budget", 2)
+
+        with statement_scope("passo"):
+            with engine.connect() as conn:
+                for value in range(3):
+                    conn.execute(text(f"SELECT {value} AS v{value}"))
+
+        assert len(warnings_log) == 1
+        assert "acima do orçamento: 3 statements" in warnings_log[0]
+
+    def test_nested_scope_merges_into_parent(self):
+        """Testa que escopos aninhados somam no escopo externo"""
+        with statement_scope("externo") as outer:
+            with statement_scope("interno") as inner:
+                inner.record("SELECT ?", 0.01)
+            assert current_scope() is outer
+
+        assert outer.statements == 1
+        assert outer.by_fingerprint["SELECT ?"] == 1
+
+    def test_nested_scope_warns_once(self, engine, monkeypatch, warnings_log):
+        """Testa que o N+1 de um escopo aninhado é avisado uma única vez, pelo externo"""
+        monkeypatch.setattr(settings, "db_n_plus_one_threshold", 5)
+        monkeypatch.setattr(settings, "db_scope_statement_budget", None)
+
+        with statement_scope("listar_certificados"):
+            with statement_scope("session_scope"):
+                with engine.connect() as conn:
+                    for org_id in range(6):
+                        conn.execute(text("SELECT :id AS organization_id"), {"id": org_id})
+
+        assert len(warnings_log) == 1
+        assert "Possível N+1 em listar_certificados: 6x" in warnings_log[0]
+
+    def test_repeated_only_selects(self):
+        """Testa que apenas SELECTs repetidos contam como N+1"""
+        scope = StatementScope("s")
+        for _ in range(3):
+            scope.record("INSERT INTO t (a) VALUES (?)", 0.001)
+            scope.record("SELECT * FROM t WHERE id = ?", 0.001)
+
+        assert scope.repeated(3) == {"SELECT * FROM t WHERE id = ?": 3}
+
+
+class TestManagerIntegration:
+    """Testes para a integração com DatabaseSessionManager"""
+
+    def test_engine_uses_plugin_and_scope_is_tracked(self):
+        """Testa plugin na engine e escopo ativo dentro de session_scope"""
+        with patch("automacoes_python_base_td.database.session.create_engine") as mock_engine:
+            with patch("automacoes_python_base_td.database.session.sessionmaker"):
+                manager = DatabaseSessionManager(db_type="tdax", database_url="postgresql://test/test")
+
+                with manager.session_scope():
+                    scope = current_scope()
+
+        assert mock_engine.call_args.kwargs["plugins"] == [PLUGIN_NAME]
+        assert scope.name == "session_scope(tdax)"